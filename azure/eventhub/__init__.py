@@ -5,10 +5,12 @@
 
 __version__ = "1.1.1"
 
-from azure.eventhub.common import EventData, EventHubError, Offset
+from azure.eventhub.common import EventData, EventHubError, Offset, RetryPolicy
+from azure.eventhub.metrics import MetricsHook
 from azure.eventhub.client import EventHubClient
 from azure.eventhub.sender import Sender
 from azure.eventhub.receiver import Receiver
+from azure.eventhub.receive_pump import ReceivePump
 
 try:
     from azure.eventhub.async_ops import (
@@ -6,7 +6,6 @@
 import logging
 import asyncio
 import time
-import datetime
 try:
     from urllib import urlparse, unquote_plus, urlencode, quote_plus
 except ImportError:
@@ -26,6 +25,7 @@ from azure.eventhub import (
     EventHubClient,
     EventData,
     EventHubError)
+from azure.eventhub.client import _parse_eventhub_info, _parse_partition_info
 
 from .sender_async import AsyncSender
 from .receiver_async import AsyncReceiver
@@ -40,6 +40,51 @@ class EventHubClientAsync(EventHubClient):
     sending events to and receiving events from the Azure Event Hubs service.
     """
 
+    def __init__(
+            self, address, username=None, password=None, debug=False,
+            http_proxy=None, auth_timeout=60, metrics=None, mgmt_cache_ttl=0, shared_connection=False):
+        """
+        Constructs a new EventHubClientAsync with the given address URL.
+
+        :param address: The full URI string of the Event Hub. This can optionally
+         include URL-encoded access name and key.
+        :type address: str
+        :param username: The name of the shared access policy. This must be supplied
+         if not encoded into the address.
+        :type username: str
+        :param password: The shared access key. This must be supplied if not encoded
+         into the address.
+        :type password: str
+        :param debug: Whether to output network trace logs to the logger. Default
+         is `False`.
+        :type debug: bool
+        :param http_proxy: HTTP proxy settings. This must be a dictionary with the following
+         keys: 'proxy_hostname' (str value) and 'proxy_port' (int value).
+         Additionally the following keys may also be present: 'username', 'password'.
+        :type http_proxy: dict[str, Any]
+        :param auth_timeout: The time in seconds to wait for a token to be authorized by the service.
+         The default value is 60 seconds. If set to 0, no timeout will be enforced from the client.
+        :type auth_timeout: int
+        :param metrics: A hook to receive throughput, latency and reconnect metrics from the
+         Sender/Receiver clients. Default is `None`, i.e. no metrics are recorded.
+        :type metrics: ~azure.eventhub.metrics.MetricsHook
+        :param mgmt_cache_ttl: The time in seconds for which the results of `get_eventhub_info`
+         and `get_partition_info` are cached. Default is 0, i.e. every call queries the service.
+        :type mgmt_cache_ttl: float
+        :param shared_connection: Whether all the AsyncSender/AsyncReceiver clients share a single
+         connection and authentication session, rather than each opening their own. Clients can
+         then be added and removed without tearing down the connection. Redirects, as used by
+         IoT Hub, are not supported on a shared connection. Default is `False`.
+        :type shared_connection: bool
+        """
+        super(EventHubClientAsync, self).__init__(
+            address, username=username, password=password, debug=debug, http_proxy=http_proxy,
+            auth_timeout=auth_timeout, metrics=metrics, mgmt_cache_ttl=mgmt_cache_ttl)
+        self.shared_connection = shared_connection
+        self.connection = None
+        self._mgmt_client_async = None
+        self._mgmt_lock_async = asyncio.Lock()
+
     def _create_auth(self, username=None, password=None):  # pylint: disable=no-self-use
         """
         Create an ~uamqp.authentication.cbs_auth_async.SASTokenAuthAsync instance to authenticate
@@ -60,6 +105,35 @@ class EventHubClientAsync(EventHubClient):
         return authentication.SASTokenAsync.from_shared_access_key(
             self.auth_uri, username, password, timeout=self.auth_timeout, http_proxy=self.http_proxy)
 
+    async def get_connection_async(self):
+        """
+        Return the connection shared by all AsyncSender/AsyncReceiver clients, opening
+        a new connection if there is none or the previous one has failed. If the client
+        was not created with `shared_connection` this returns `None`, and each client
+        opens its own connection.
+
+        :rtype: ~uamqp.async_ops.connection_async.ConnectionAsync
+        """
+        # pylint: disable=protected-access
+        if not self.shared_connection:
+            return None
+        if self.connection and (self.connection._error or self.connection._closing):
+            log.info("%r: Replacing failed shared connection.", self.container_id)
+            await self._close_connection_async()
+        if not self.connection:
+            self.connection = ConnectionAsync(
+                self.address.hostname,
+                self.get_auth(),
+                container_id=self.container_id,
+                properties=self.create_properties(),
+                debug=self.debug)
+        return self.connection
+
+    async def _close_connection_async(self):
+        if self.connection:
+            connection, self.connection = self.connection, None
+            await connection.destroy_async()
+
     async def _close_clients_async(self):
         """
         Close all open AsyncSender/AsyncReceiver clients.
@@ -92,6 +166,7 @@ class EventHubClientAsync(EventHubClient):
         if not all(r.hostname == redirects[0].hostname for r in redirects):
             raise EventHubError("Multiple clients attempting to redirect to different hosts.")
         self._process_redirect_uri(redirects[0])
+        await self._close_mgmt_client_async()
         await asyncio.gather(*[c.open_async() for c in self.clients])
 
     async def run_async(self):
@@ -134,42 +209,96 @@ class EventHubClientAsync(EventHubClient):
         log.info("%r: Stopping %r clients", self.container_id, len(self.clients))
         self.stopped = True
         await self._close_clients_async()
+        await self._close_connection_async()
+        await self._close_mgmt_client_async()
+
+    def _create_mgmt_client_async(self):
+        alt_creds = {
+            "username": self._auth_config.get("iot_username"),
+            "password":self._auth_config.get("iot_password")}
+        mgmt_auth = self._create_auth(**alt_creds)
+        return AMQPClientAsync(self.mgmt_target, auth=mgmt_auth, debug=self.debug)
+
+    async def _close_mgmt_client_async(self):
+        async with self._mgmt_lock_async:
+            if self._mgmt_client_async:
+                await self._mgmt_client_async.close_async()
+                self._mgmt_client_async = None
+        # The sync management client is used by get_eventhub_info and get_partition_info.
+        self._close_mgmt_client()
+
+    async def _mgmt_request_async(self, op_type, application_properties):
+        """
+        Send a request on the management link of the Event Hub async. The underlying
+        connection and link are opened on the first request and reused for
+        subsequent requests until the client is stopped. If a request fails the
+        connection is discarded and the request retried once on a new connection.
+
+        :param op_type: The type of the management operation.
+        :type op_type: bytes
+        :param application_properties: The properties identifying the entity to query.
+        :type application_properties: dict
+        :rtype: dict
+        """
+        async with self._mgmt_lock_async:
+            for retry in (True, False):
+                try:
+                    if not self._mgmt_client_async:
+                        self._mgmt_client_async = self._create_mgmt_client_async()
+                        await self._mgmt_client_async.open_async()
+                    response = await self._mgmt_client_async.mgmt_request_async(
+                        Message(application_properties=application_properties),
+                        constants.READ_OPERATION,
+                        op_type=op_type,
+                        status_code_field=b'status-code',
+                        description_fields=b'status-description')
+                    return response.get_data()
+                except Exception as exp:  # pylint: disable=broad-except
+                    log.info("%r: Management request failed: %r", self.container_id, exp)
+                    if self._mgmt_client_async:
+                        await self._mgmt_client_async.close_async()
+                        self._mgmt_client_async = None
+                    if not retry:
+                        raise
+        return None
 
     async def get_eventhub_info_async(self):
         """
         Get details on the specified EventHub async.
 
+        The management connection is opened on the first request and kept open
+        until the client is stopped with `stop_async()`.
+
         :rtype: dict
         """
-        alt_creds = {
-            "username": self._auth_config.get("iot_username"),
-            "password":self._auth_config.get("iot_password")}
-        try:
-            mgmt_auth = self._create_auth(**alt_creds)
-            mgmt_client = AMQPClientAsync(self.mgmt_target, auth=mgmt_auth, debug=self.debug)
-            await mgmt_client.open_async()
-            mgmt_msg = Message(application_properties={'name': self.eh_name})
-            response = await mgmt_client.mgmt_request_async(
-                mgmt_msg,
-                constants.READ_OPERATION,
-                op_type=b'com.microsoft:eventhub',
-                status_code_field=b'status-code',
-                description_fields=b'status-description')
-            eh_info = response.get_data()
-            output = {}
-            if eh_info:
-                output['name'] = eh_info[b'name'].decode('utf-8')
-                output['type'] = eh_info[b'type'].decode('utf-8')
-                output['created_at'] = datetime.datetime.fromtimestamp(float(eh_info[b'created_at'])/1000)
-                output['partition_count'] = eh_info[b'partition_count']
-                output['partition_ids'] = [p.decode('utf-8') for p in eh_info[b'partition_ids']]
-            return output
-        finally:
-            await mgmt_client.close_async()
+        cached = self._cached_mgmt_result(None)
+        if cached is not None:
+            return cached
+        eh_info = await self._mgmt_request_async(b'com.microsoft:eventhub', {'name': self.eh_name})
+        return self._cache_mgmt_result(None, _parse_eventhub_info(eh_info))
+
+    async def get_partition_info_async(self, partition_id):
+        """
+        Get runtime details on the specified partition of the EventHub async.
+
+        The management connection is opened on the first request and kept open
+        until the client is stopped with `stop_async()`.
+
+        :param partition_id: The ID of the partition.
+        :type partition_id: str
+        :rtype: dict
+        """
+        cached = self._cached_mgmt_result(partition_id)
+        if cached is not None:
+            return cached
+        partition_info = await self._mgmt_request_async(
+            b'com.microsoft:partition', {'name': self.eh_name, 'partition': partition_id})
+        return self._cache_mgmt_result(partition_id, _parse_partition_info(partition_info))
 
     def add_async_receiver(
             self, consumer_group, partition, offset=None, prefetch=300,
-            operation=None, keep_alive=30, auto_reconnect=True, loop=None):
+            operation=None, keep_alive=30, auto_reconnect=True, loop=None, runtime_metrics=False,
+            retry_policy=None, codec=None):
         """
         Add an async receiver to the client for a particular consumer group and partition.
 
@@ -184,20 +313,32 @@ class EventHubClientAsync(EventHubClient):
         :operation: An optional operation to be appended to the hostname in the source URL.
          The value must start with `/` character.
         :type operation: str
+        :param runtime_metrics: Whether to request the last enqueued sequence number, offset
+         and time of the partition with each delivery. These are exposed by the receiver's
+         `runtime_info`. Default is `False`.
+        :type runtime_metrics: bool
+        :param retry_policy: The policy used to retry reconnects. Default is a RetryPolicy
+         with 3 retries.
+        :type retry_policy: ~azure.eventhub.common.RetryPolicy
+        :param codec: The codec with which `decode` decodes events. Default is `None`, in which
+         case each event is decoded by the codec registered for its content type.
+        :type codec: ~azure.eventhub.codecs.Codec
         :rtype: ~azure.eventhub.async_ops.receiver_async.ReceiverAsync
         """
         path = self.address.path + operation if operation else self.address.path
         source_url = "amqps://{}{}/ConsumerGroups/{}/Partitions/{}".format(
             self.address.hostname, path, consumer_group, partition)
         handler = AsyncReceiver(
-            self, source_url, offset=offset, prefetch=prefetch,
-            keep_alive=keep_alive, auto_reconnect=auto_reconnect, loop=loop)
+            self, source_url, offset=offset, prefetch=prefetch, keep_alive=keep_alive,
+            auto_reconnect=auto_reconnect, runtime_metrics=runtime_metrics,
+            retry_policy=retry_policy, codec=codec, loop=loop)
         self.clients.append(handler)
         return handler
 
     def add_async_epoch_receiver(
             self, consumer_group, partition, epoch, prefetch=300,
-            operation=None, keep_alive=30, auto_reconnect=True, loop=None):
+            operation=None, keep_alive=30, auto_reconnect=True, loop=None, runtime_metrics=False,
+            offset=None, retry_policy=None, codec=None):
         """
         Add an async receiver to the client with an epoch value. Only a single epoch receiver
         can connect to a partition at any given time - additional epoch receivers must have
@@ -215,20 +356,35 @@ class EventHubClientAsync(EventHubClient):
         :operation: An optional operation to be appended to the hostname in the source URL.
          The value must start with `/` character.
         :type operation: str
+        :param runtime_metrics: Whether to request the last enqueued sequence number, offset
+         and time of the partition with each delivery. These are exposed by the receiver's
+         `runtime_info`. Default is `False`.
+        :type runtime_metrics: bool
+        :param offset: The offset from which to start receiving. Default is `None`, i.e. from
+         the start of the partition.
+        :type offset: ~azure.eventhub.common.Offset
+        :param retry_policy: The policy used to retry reconnects. Default is a RetryPolicy
+         with 3 retries.
+        :type retry_policy: ~azure.eventhub.common.RetryPolicy
+        :param codec: The codec with which `decode` decodes events. Default is `None`, in which
+         case each event is decoded by the codec registered for its content type.
+        :type codec: ~azure.eventhub.codecs.Codec
         :rtype: ~azure.eventhub.async_ops.receiver_async.ReceiverAsync
         """
         path = self.address.path + operation if operation else self.address.path
         source_url = "amqps://{}{}/ConsumerGroups/{}/Partitions/{}".format(
             self.address.hostname, path, consumer_group, partition)
         handler = AsyncReceiver(
-            self, source_url, prefetch=prefetch, epoch=epoch,
-            keep_alive=keep_alive, auto_reconnect=auto_reconnect, loop=loop)
+            self, source_url, offset=offset, prefetch=prefetch, epoch=epoch, keep_alive=keep_alive,
+            auto_reconnect=auto_reconnect, runtime_metrics=runtime_metrics,
+            retry_policy=retry_policy, codec=codec, loop=loop)
         self.clients.append(handler)
         return handler
 
     def add_async_sender(
             self, partition=None, operation=None, send_timeout=60,
-            keep_alive=30, auto_reconnect=True, loop=None):
+            keep_alive=30, auto_reconnect=True, loop=None, retry_policy=None, max_in_flight=None,
+            codec=None, compression=None):
         """
         Add an async sender to the client to send ~azure.eventhub.common.EventData object
         to an EventHub.
@@ -250,6 +406,20 @@ class EventHubClientAsync(EventHubClient):
         :param auto_reconnect: Whether to automatically reconnect the sender if a retryable error occurs.
          Default value is `True`.
         :type auto_reconnect: bool
+        :param retry_policy: The policy used to retry failed sends and reconnects. Default is a
+         RetryPolicy with 3 retries.
+        :type retry_policy: ~azure.eventhub.common.RetryPolicy
+        :param max_in_flight: The maximum number of transferred events that have not yet been
+         acknowledged by the service. These events are replayed in order if the sender reconnects.
+         Default is `None`, i.e. no limit.
+        :type max_in_flight: int
+        :param codec: The codec with which `encode` encodes values. Default is a JsonCodec.
+        :type codec: ~azure.eventhub.codecs.Codec
+        :param compression: Compress the body of each event, or each message of a batched event,
+         before it is sent. Either a Compressor or the name of a content encoding: 'deflate', or 'lz4' or
+         'zstd' if the package is installed. Receivers decompress the events transparently.
+         Default is `None`, i.e. no compression.
+        :type compression: str or ~azure.eventhub.compression.Compressor
         :rtype: ~azure.eventhub.async_ops.sender_async.SenderAsync
         """
         target = "amqps://{}{}".format(self.address.hostname, self.address.path)
@@ -257,6 +427,7 @@ class EventHubClientAsync(EventHubClient):
             target = target + operation
         handler = AsyncSender(
             self, target, partition=partition, send_timeout=send_timeout, keep_alive=keep_alive,
-            auto_reconnect=auto_reconnect, loop=loop)
+            auto_reconnect=auto_reconnect, retry_policy=retry_policy, max_in_flight=max_in_flight,
+            codec=codec, compression=compression, loop=loop)
         self.clients.append(handler)
         return handler
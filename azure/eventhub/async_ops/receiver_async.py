@@ -5,14 +5,15 @@
 
 import asyncio
 import uuid
+import time
 import logging
 
-from uamqp import errors, types
+from uamqp import errors, types, utils
 from uamqp import ReceiveClientAsync, Source
 
-from azure.eventhub import EventHubError, EventData
+from azure.eventhub import EventHubError, EventData, metrics, compression
 from azure.eventhub.receiver import Receiver
-from azure.eventhub.common import _error_handler
+from azure.eventhub.common import RetryPolicy, _EventHubErrorPolicy
 
 log = logging.getLogger(__name__)
 
@@ -24,7 +25,8 @@ class AsyncReceiver(Receiver):
 
     def __init__(  # pylint: disable=super-init-not-called
             self, client, source, offset=None, prefetch=300, epoch=None,
-            keep_alive=None, auto_reconnect=True, loop=None):
+            keep_alive=None, auto_reconnect=True, loop=None, runtime_metrics=False, retry_policy=None,
+            codec=None):
         """
         Instantiate an async receiver.
 
@@ -38,6 +40,16 @@ class AsyncReceiver(Receiver):
         :param epoch: An optional epoch value.
         :type epoch: int
         :param loop: An event loop.
+        :param runtime_metrics: Whether to request the last enqueued sequence number, offset
+         and time of the partition with each delivery. These are exposed by `runtime_info`.
+         Default is `False`.
+        :type runtime_metrics: bool
+        :param retry_policy: The policy used to retry reconnects. Default is a RetryPolicy
+         with 3 retries.
+        :type retry_policy: ~azure.eventhub.common.RetryPolicy
+        :param codec: The codec with which `decode` decodes events. Default is `None`, in which
+         case each event is decoded by the codec registered for its content type.
+        :type codec: ~azure.eventhub.codecs.Codec
         """
         self.loop = loop or asyncio.get_event_loop()
         self.running = False
@@ -48,25 +60,35 @@ class AsyncReceiver(Receiver):
         self.epoch = epoch
         self.keep_alive = keep_alive
         self.auto_reconnect = auto_reconnect
-        self.retry_policy = errors.ErrorPolicy(max_retries=3, on_error=_error_handler)
+        self.runtime_metrics = runtime_metrics
+        self.runtime_info = None
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=3)
+        self.error_policy = _EventHubErrorPolicy(max_retries=self.retry_policy.max_retries)
         self.redirected = None
         self.error = None
         self.properties = None
         partition = self.source.split('/')[-1]
         self.name = "EHReceiver-{}-partition{}".format(uuid.uuid4(), partition)
+        self.codec = codec
+        self.metrics = self.client.metrics
+        self._metric_tags = {"eventhub": self.client.eh_name, "partition": partition}
         source = Source(self.source)
         if self.offset is not None:
             source.set_filter(self.offset.selector())
         if epoch:
             self.properties = {types.AMQPSymbol(self._epoch): types.AMQPLong(int(epoch))}
+        self._capabilities = None
+        if runtime_metrics:
+            self._capabilities = utils.data_factory(types.AMQPArray([types.AMQPSymbol(self._runtime_metric)]))
         self._handler = ReceiveClientAsync(
             source,
             auth=self.client.get_auth(),
             debug=self.client.debug,
             prefetch=self.prefetch,
             link_properties=self.properties,
+            desired_capabilities=self._capabilities,
             timeout=self.timeout,
-            error_policy=self.retry_policy,
+            error_policy=self.error_policy,
             keep_alive_interval=self.keep_alive,
             client_name=self.name,
             properties=self.client.create_properties(),
@@ -77,9 +99,8 @@ class AsyncReceiver(Receiver):
         Open the Receiver using the supplied conneciton.
         If the handler has previously been redirected, the redirect
         context will be used to create a new handler before opening it.
-
-        :param connection: The underlying client shared connection.
-        :type: connection: ~uamqp.async_ops.connection_async.ConnectionAsync
+        If the client was created with `shared_connection`, the handler is opened
+        on the client's shared connection.
         """
         # pylint: disable=protected-access
         self.running = True
@@ -97,66 +118,78 @@ class AsyncReceiver(Receiver):
                 debug=self.client.debug,
                 prefetch=self.prefetch,
                 link_properties=self.properties,
+                desired_capabilities=self._capabilities,
                 timeout=self.timeout,
-                error_policy=self.retry_policy,
+                error_policy=self.error_policy,
                 keep_alive_interval=self.keep_alive,
                 client_name=self.name,
                 properties=self.client.create_properties(),
                 loop=self.loop)
-        await self._handler.open_async()
+        await self._handler.open_async(connection=await self.client.get_connection_async())
         while not await self.has_started():
             await self._handler._connection.work_async()
 
-    async def reconnect_async(self):
+    async def reconnect_async(self, error=None):
         """If the Receiver was disconnected from the service with
-        a retryable error - attempt to reconnect."""
+        a retryable error - attempt to reconnect. Attempts are spaced
+        out and limited according to the retry policy.
+
+        :param error: The error that disconnected the Receiver.
+        :type error: Exception
+        """
         # pylint: disable=protected-access
         alt_creds = {
             "username": self.client._auth_config.get("iot_username"),
             "password":self.client._auth_config.get("iot_password")}
-        await self._handler.close_async()
-        source = Source(self.source)
-        if self.offset is not None:
-            source.set_filter(self.offset.selector())
-        self._handler = ReceiveClientAsync(
-            source,
-            auth=self.client.get_auth(**alt_creds),
-            debug=self.client.debug,
-            prefetch=self.prefetch,
-            link_properties=self.properties,
-            timeout=self.timeout,
-            error_policy=self.retry_policy,
-            keep_alive_interval=self.keep_alive,
-            client_name=self.name,
-            properties=self.client.create_properties(),
-            loop=self.loop)
-        try:
-            await self._handler.open_async()
-            while not await self.has_started():
-                await self._handler._connection.work_async()
-        except (errors.LinkDetach, errors.ConnectionClose) as shutdown:
-            if shutdown.action.retry and self.auto_reconnect:
-                log.info("AsyncReceiver detached. Attempting reconnect.")
-                await self.reconnect_async()
-            else:
-                log.info("AsyncReceiver detached. Shutting down.")
-                error = EventHubError(str(shutdown), shutdown)
+        started = time.time()
+        retry_count = 0
+        while True:
+            backoff = self.retry_policy.next_backoff(retry_count, error, started)
+            if backoff is None:
+                log.info("AsyncReceiver reconnect failed. Shutting down.")
+                error = EventHubError(str(error), error)
                 await self.close_async(exception=error)
                 raise error
-        except errors.MessageHandlerError as shutdown:
-            if self.auto_reconnect:
+            log.info("AsyncReceiver attempting reconnect in %r seconds.", backoff)
+            await asyncio.sleep(backoff)
+            retry_count += 1
+            if self.metrics:
+                self.metrics.increment(metrics.RECONNECTS, tags=self._metric_tags)
+            await self._handler.close_async()
+            source = Source(self.source)
+            if self.offset is not None:
+                source.set_filter(self.offset.selector())
+            self._handler = ReceiveClientAsync(
+                source,
+                auth=self.client.get_auth(**alt_creds),
+                debug=self.client.debug,
+                prefetch=self.prefetch,
+                link_properties=self.properties,
+                desired_capabilities=self._capabilities,
+                timeout=self.timeout,
+                error_policy=self.error_policy,
+                keep_alive_interval=self.keep_alive,
+                client_name=self.name,
+                properties=self.client.create_properties(),
+                loop=self.loop)
+            try:
+                await self._handler.open_async(connection=await self.client.get_connection_async())
+                while not await self.has_started():
+                    await self._handler._connection.work_async()
+                return
+            except (errors.LinkDetach, errors.ConnectionClose, errors.MessageHandlerError) as shutdown:
+                if not self.auto_reconnect:
+                    log.info("AsyncReceiver detached. Shutting down.")
+                    error = EventHubError(str(shutdown), shutdown)
+                    await self.close_async(exception=error)
+                    raise error
                 log.info("AsyncReceiver detached. Attempting reconnect.")
-                await self.reconnect_async()
-            else:
-                log.info("AsyncReceiver detached. Shutting down.")
-                error = EventHubError(str(shutdown), shutdown)
+                error = shutdown
+            except Exception as e:
+                log.info("Unexpected error occurred (%r). Shutting down.", e)
+                error = EventHubError("Receiver reconnect failed: {}".format(e))
                 await self.close_async(exception=error)
                 raise error
-        except Exception as e:
-            log.info("Unexpected error occurred (%r). Shutting down.", e)
-            error = EventHubError("Receiver reconnect failed: {}".format(e))
-            await self.close_async(exception=error)
-            raise error
 
     async def has_started(self):
         """
@@ -226,15 +259,27 @@ class AsyncReceiver(Receiver):
             message_batch = await self._handler.receive_message_batch_async(
                 max_batch_size=max_batch_size,
                 timeout=timeout_ms)
+            compressed = []
             for message in message_batch:
                 event_data = EventData(message=message)
                 self.offset = event_data.offset
                 data_batch.append(event_data)
+                if event_data.content_encoding:
+                    compressed.append(event_data)
+            if compressed:
+                if compression.compressed_size(compressed) >= compression.EXECUTOR_THRESHOLD:
+                    await self.loop.run_in_executor(None, compression.decompress_events, compressed)
+                else:
+                    compression.decompress_events(compressed)
+            if self.runtime_metrics and message_batch:
+                self._update_runtime_info(message_batch[-1])
+            if self.metrics:
+                self._record_received(message_batch)
             return data_batch
         except (errors.LinkDetach, errors.ConnectionClose) as shutdown:
             if shutdown.action.retry and self.auto_reconnect:
                 log.info("AsyncReceiver detached. Attempting reconnect.")
-                await self.reconnect_async()
+                await self.reconnect_async(shutdown)
                 return data_batch
             log.info("AsyncReceiver detached. Shutting down.")
             error = EventHubError(str(shutdown), shutdown)
@@ -243,7 +288,7 @@ class AsyncReceiver(Receiver):
         except errors.MessageHandlerError as shutdown:
             if self.auto_reconnect:
                 log.info("AsyncReceiver detached. Attempting reconnect.")
-                await self.reconnect_async()
+                await self.reconnect_async(shutdown)
                 return data_batch
             log.info("AsyncReceiver detached. Shutting down.")
             error = EventHubError(str(shutdown), shutdown)
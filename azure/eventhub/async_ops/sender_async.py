@@ -4,15 +4,17 @@
 # --------------------------------------------------------------------------------------------
 
 import uuid
+import time
 import asyncio
 import logging
+from collections import OrderedDict
 
 from uamqp import constants, errors
 from uamqp import SendClientAsync
 
-from azure.eventhub import EventHubError
+from azure.eventhub import EventHubError, metrics, codecs, compression as compressors
 from azure.eventhub.sender import Sender
-from azure.eventhub.common import _error_handler
+from azure.eventhub.common import RetryPolicy, _EventHubErrorPolicy
 
 log = logging.getLogger(__name__)
 
@@ -24,7 +26,8 @@ class AsyncSender(Sender):
 
     def __init__(  # pylint: disable=super-init-not-called
             self, client, target, partition=None, send_timeout=60,
-            keep_alive=None, auto_reconnect=True, loop=None):
+            keep_alive=None, auto_reconnect=True, loop=None, retry_policy=None, max_in_flight=None,
+            codec=None, compression=None):
         """
         Instantiate an EventHub event SenderAsync handler.
 
@@ -45,6 +48,20 @@ class AsyncSender(Sender):
          Default value is `True`.
         :type auto_reconnect: bool
         :param loop: An event loop. If not specified the default event loop will be used.
+        :param retry_policy: The policy used to retry failed sends and reconnects. Default is a
+         RetryPolicy with 3 retries.
+        :type retry_policy: ~azure.eventhub.common.RetryPolicy
+        :param max_in_flight: The maximum number of transferred events that have not yet been
+         acknowledged by the service. These events are replayed in order if the sender reconnects.
+         Default is `None`, i.e. no limit.
+        :type max_in_flight: int
+        :param codec: The codec with which `encode` encodes values. Default is a JsonCodec.
+        :type codec: ~azure.eventhub.codecs.Codec
+        :param compression: Compress the body of each event, or each message of a batched event,
+         before it is sent. Either a Compressor or the name of a content encoding: 'deflate', or 'lz4' or
+         'zstd' if the package is installed. Receivers decompress the events transparently.
+         Default is `None`, i.e. no compression.
+        :type compression: str or ~azure.eventhub.compression.Compressor
         """
         self.loop = loop or asyncio.get_event_loop()
         self.running = False
@@ -54,19 +71,31 @@ class AsyncSender(Sender):
         self.keep_alive = keep_alive
         self.auto_reconnect = auto_reconnect
         self.timeout = send_timeout
-        self.retry_policy = errors.ErrorPolicy(max_retries=3, on_error=_error_handler)
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=3)
+        self.error_policy = _EventHubErrorPolicy(max_retries=self.retry_policy.max_retries)
+        self.max_in_flight = max_in_flight
+        self.replayed_events = 0
+        self.failed_events = 0
+        self._in_flight = OrderedDict()
         self.name = "EHSender-{}".format(uuid.uuid4())
         self.redirected = None
         self.error = None
+        self.codec = codec or codecs.JsonCodec()
+        if isinstance(compression, str):
+            compression = compressors.get_compressor(compression)
+        self.compression = compression
+        self.metrics = self.client.metrics
+        self._metric_tags = {"eventhub": self.client.eh_name}
         if partition:
             self.target += "/Partitions/" + partition
             self.name += "-partition{}".format(partition)
+            self._metric_tags["partition"] = partition
         self._handler = SendClientAsync(
             self.target,
             auth=self.client.get_auth(),
             debug=self.client.debug,
             msg_timeout=self.timeout,
-            error_policy=self.retry_policy,
+            error_policy=self.error_policy,
             keep_alive_interval=self.keep_alive,
             client_name=self.name,
             properties=self.client.create_properties(),
@@ -79,9 +108,8 @@ class AsyncSender(Sender):
         Open the Sender using the supplied conneciton.
         If the handler has previously been redirected, the redirect
         context will be used to create a new handler before opening it.
-
-        :param connection: The underlying client shared connection.
-        :type: connection: ~uamqp.async_ops.connection_async.ConnectionAsync
+        If the client was created with `shared_connection`, the handler is opened
+        on the client's shared connection.
         """
         self.running = True
         if self.redirected:
@@ -91,57 +119,72 @@ class AsyncSender(Sender):
                 auth=self.client.get_auth(),
                 debug=self.client.debug,
                 msg_timeout=self.timeout,
-                error_policy=self.retry_policy,
+                error_policy=self.error_policy,
                 keep_alive_interval=self.keep_alive,
                 client_name=self.name,
                 properties=self.client.create_properties(),
                 loop=self.loop)
-        await self._handler.open_async()
+        await self._handler.open_async(connection=await self.client.get_connection_async())
         while not await self.has_started():
             await self._handler._connection.work_async()  # pylint: disable=protected-access
 
-    async def reconnect_async(self):
-        """If the Receiver was disconnected from the service with
-        a retryable error - attempt to reconnect."""
-        await self._handler.close_async()
-        unsent_events = self._handler.pending_messages
-        self._handler = SendClientAsync(
-            self.target,
-            auth=self.client.get_auth(),
-            debug=self.client.debug,
-            msg_timeout=self.timeout,
-            error_policy=self.retry_policy,
-            keep_alive_interval=self.keep_alive,
-            client_name=self.name,
-            properties=self.client.create_properties(),
-            loop=self.loop)
-        try:
-            await self._handler.open_async()
-            self._handler.queue_message(*unsent_events)
-            await self._handler.wait_async()
-        except (errors.LinkDetach, errors.ConnectionClose) as shutdown:
-            if shutdown.action.retry and self.auto_reconnect:
-                log.info("AsyncSender detached. Attempting reconnect.")
-                await self.reconnect_async()
-            else:
+    async def reconnect_async(self, error=None):
+        """If the Sender was disconnected from the service with
+        a retryable error - attempt to reconnect. Attempts are spaced
+        out and limited according to the retry policy.
+
+        :param error: The error that disconnected the Sender.
+        :type error: Exception
+        """
+        unsent_events = self._unsent_events()
+        started = time.time()
+        retry_count = 0
+        while True:
+            backoff = self.retry_policy.next_backoff(retry_count, error, started)
+            if backoff is None:
                 log.info("AsyncSender reconnect failed. Shutting down.")
-                error = EventHubError(str(shutdown), shutdown)
+                error = EventHubError(str(error), error)
                 await self.close_async(exception=error)
                 raise error
-        except errors.MessageHandlerError as shutdown:
-            if self.auto_reconnect:
+            log.info("AsyncSender attempting reconnect in %r seconds.", backoff)
+            await asyncio.sleep(backoff)
+            retry_count += 1
+            if self.metrics:
+                self.metrics.increment(metrics.RECONNECTS, tags=self._metric_tags)
+            await self._handler.close_async()
+            self._handler = SendClientAsync(
+                self.target,
+                auth=self.client.get_auth(),
+                debug=self.client.debug,
+                msg_timeout=self.timeout,
+                error_policy=self.error_policy,
+                keep_alive_interval=self.keep_alive,
+                client_name=self.name,
+                properties=self.client.create_properties(),
+                loop=self.loop)
+            requeued = False
+            try:
+                await self._handler.open_async(connection=await self.client.get_connection_async())
+                self._handler.queue_message(*unsent_events)
+                self.replayed_events += len(unsent_events)
+                requeued = True
+                await self._handler.wait_async()
+                return
+            except (errors.LinkDetach, errors.ConnectionClose, errors.MessageHandlerError) as shutdown:
+                if not self.auto_reconnect:
+                    log.info("AsyncSender reconnect failed. Shutting down.")
+                    error = EventHubError(str(shutdown), shutdown)
+                    await self.close_async(exception=error)
+                    raise error
                 log.info("AsyncSender detached. Attempting reconnect.")
-                await self.reconnect_async()
-            else:
-                log.info("AsyncSender reconnect failed. Shutting down.")
-                error = EventHubError(str(shutdown), shutdown)
+                if requeued:
+                    unsent_events = self._unsent_events()
+                error = shutdown
+            except Exception as e:
+                log.info("Unexpected error occurred (%r). Shutting down.", e)
+                error = EventHubError("Sender reconnect failed: {}".format(e))
                 await self.close_async(exception=error)
                 raise error
-        except Exception as e:
-            log.info("Unexpected error occurred (%r). Shutting down.", e)
-            error = EventHubError("Sender reconnect failed: {}".format(e))
-            await self.close_async(exception=error)
-            raise error
 
     async def has_started(self):
         """
@@ -188,6 +231,59 @@ class AsyncSender(Sender):
         else:
             self.error = EventHubError("This send handler is now closed.")
         await self._handler.close_async()
+        self._fail_in_flight(self.error)
+
+    def _queue_message(self, message):
+        """
+        Add a message to the send queue of the handler, tracking each of the messages
+        it is sent as until the service has acknowledged them so that they can be
+        replayed if the sender reconnects.
+
+        :param message: The message to send.
+        :type message: ~uamqp.message.Message
+        """
+        if self.max_in_flight and len(self._in_flight) >= self.max_in_flight:
+            raise EventHubError(
+                "Too many events in flight ({}). Await wait_async() before transferring more.".format(
+                    len(self._in_flight)))
+        messages = self._gather(message)
+        for internal_message in messages:
+            internal_message.on_send_complete = self._track(internal_message, internal_message.on_send_complete)
+            self._in_flight[internal_message] = True
+        self._handler.queue_message(*messages)
+
+    def _track(self, message, on_send_complete):
+        def settled(outcome, condition):
+            if self._in_flight.pop(message, False) and outcome != constants.MessageSendResult.Ok:
+                self.failed_events += 1
+            if on_send_complete:
+                on_send_complete(outcome, condition)
+        return settled
+
+    def _unsent_events(self):
+        """
+        The messages to replay on a new handler: the tracked in-flight messages in the
+        order they were transferred, followed by any other messages still pending on the
+        current handler.
+
+        :rtype: list[~uamqp.message.Message]
+        """
+        unsent = list(self._in_flight)
+        unsent.extend(m for m in self._handler.pending_messages if m not in self._in_flight)
+        return unsent
+
+    def _fail_in_flight(self, error):
+        """
+        Complete all in-flight messages as failed once the sender has shut down.
+
+        :param error: The reason the sender shut down.
+        :type error: ~azure.eventhub.common.EventHubError
+        """
+        while self._in_flight:
+            message, _ = self._in_flight.popitem(last=False)
+            self.failed_events += 1
+            if message.on_send_complete:
+                message.on_send_complete(constants.MessageSendResult.Error, error)
 
     async def send(self, event_data):
         """
@@ -205,7 +301,9 @@ class AsyncSender(Sender):
             raise ValueError("Unable to send until client has been started.")
         if event_data.partition_key and self.partition:
             raise ValueError("EventData partition key cannot be used with a partition sender.")
-        event_data.message.on_send_complete = self._on_outcome
+        if self.compression:
+            compressors.compress_event(event_data, self.compression)
+        event_data.message.on_send_complete = self._measure(event_data, self._on_outcome)
         try:
             await self._handler.send_message_async(event_data.message)
             if self._outcome != constants.MessageSendResult.Ok:
@@ -213,7 +311,7 @@ class AsyncSender(Sender):
         except (errors.LinkDetach, errors.ConnectionClose) as shutdown:
             if shutdown.action.retry and self.auto_reconnect:
                 log.info("AsyncSender detached. Attempting reconnect.")
-                await self.reconnect_async()
+                await self.reconnect_async(shutdown)
             else:
                 log.info("AsyncSender detached. Shutting down.")
                 error = EventHubError(str(shutdown), shutdown)
@@ -222,7 +320,7 @@ class AsyncSender(Sender):
         except errors.MessageHandlerError as shutdown:
             if self.auto_reconnect:
                 log.info("AsyncSender detached. Attempting reconnect.")
-                await self.reconnect_async()
+                await self.reconnect_async(shutdown)
             else:
                 log.info("AsyncSender detached. Shutting down.")
                 error = EventHubError(str(shutdown), shutdown)
@@ -236,6 +334,36 @@ class AsyncSender(Sender):
         else:
             return self._outcome
 
+    def transfer(self, event_data, callback=None):
+        """
+        Transfers an event data without waiting for it to be sent. The returned future
+        completes once the service has acknowledged the event, so that many events can be
+        transferred and then awaited together, e.g. with `asyncio.gather`. The events are
+        sent while the sender is waited on with `wait_async`.
+
+        :param event_data: The event to be sent.
+        :type event_data: ~azure.eventhub.common.EventData
+        :param callback: An optional callback to be run once the message has been sent.
+         This must be a function that accepts two arguments.
+        :type callback: callable[~uamqp.constants.MessageSendResult, ~azure.eventhub.common.EventHubError]
+        :returns: A future with the result of the send. If the send failed the future
+         raises an ~azure.eventhub.common.EventHubError.
+        :rtype: ~asyncio.Future[~uamqp.constants.MessageSendResult]
+        """
+        future = self.loop.create_future()
+
+        def on_complete(outcome, error):
+            if callback:
+                callback(outcome, error)
+            if future.done():
+                return
+            if error:
+                future.set_exception(error)
+            else:
+                future.set_result(outcome)
+        super(AsyncSender, self).transfer(event_data, callback=on_complete)
+        return future
+
     async def wait_async(self):
         """
         Wait until all transferred events have been sent.
@@ -249,7 +377,7 @@ class AsyncSender(Sender):
         except (errors.LinkDetach, errors.ConnectionClose) as shutdown:
             if shutdown.action.retry and self.auto_reconnect:
                 log.info("AsyncSender detached. Attempting reconnect.")
-                await self.reconnect_async()
+                await self.reconnect_async(shutdown)
             else:
                 log.info("AsyncSender detached. Shutting down.")
                 error = EventHubError(str(shutdown), shutdown)
@@ -258,7 +386,7 @@ class AsyncSender(Sender):
         except errors.MessageHandlerError as shutdown:
             if self.auto_reconnect:
                 log.info("AsyncSender detached. Attempting reconnect.")
-                await self.reconnect_async()
+                await self.reconnect_async(shutdown)
             else:
                 log.info("AsyncSender detached. Shutting down.")
                 error = EventHubError(str(shutdown), shutdown)
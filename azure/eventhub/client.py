@@ -9,6 +9,7 @@ import sys
 import uuid
 import time
 import functools
+import threading
 try:
     from urllib import urlparse, unquote_plus, urlencode, quote_plus
 except ImportError:
@@ -22,6 +23,7 @@ from uamqp import constants
 from azure.eventhub import __version__
 from azure.eventhub.sender import Sender
 from azure.eventhub.receiver import Receiver
+from azure.eventhub.receive_pump import ReceivePump
 from azure.eventhub.common import EventHubError
 
 log = logging.getLogger(__name__)
@@ -72,6 +74,31 @@ def _generate_sas_token(uri, policy, key, expiry=None):
     return 'SharedAccessSignature ' + urlencode(result)
 
 
+def _parse_eventhub_info(eh_info):
+    output = {}
+    if eh_info:
+        output['name'] = eh_info[b'name'].decode('utf-8')
+        output['type'] = eh_info[b'type'].decode('utf-8')
+        output['created_at'] = datetime.datetime.fromtimestamp(float(eh_info[b'created_at'])/1000)
+        output['partition_count'] = eh_info[b'partition_count']
+        output['partition_ids'] = [p.decode('utf-8') for p in eh_info[b'partition_ids']]
+    return output
+
+
+def _parse_partition_info(partition_info):
+    output = {}
+    if partition_info:
+        output['name'] = partition_info[b'name'].decode('utf-8')
+        output['id'] = partition_info[b'partition'].decode('utf-8')
+        output['begin_sequence_number'] = partition_info[b'begin_sequence_number']
+        output['last_enqueued_sequence_number'] = partition_info[b'last_enqueued_sequence_number']
+        output['last_enqueued_offset'] = partition_info[b'last_enqueued_offset'].decode('utf-8')
+        output['last_enqueued_time_utc'] = datetime.datetime.utcfromtimestamp(
+            float(partition_info[b'last_enqueued_time_utc'])/1000)
+        output['is_empty'] = partition_info[b'is_partition_empty']
+    return output
+
+
 def _build_uri(address, entity):
     parsed = urlparse(address)
     if parsed.path:
@@ -88,7 +115,9 @@ class EventHubClient(object):
     events to and receiving events from the Azure Event Hubs service.
     """
 
-    def __init__(self, address, username=None, password=None, debug=False, http_proxy=None, auth_timeout=60):
+    def __init__(
+            self, address, username=None, password=None, debug=False,
+            http_proxy=None, auth_timeout=60, metrics=None, mgmt_cache_ttl=0):
         """
         Constructs a new EventHubClient with the given address URL.
 
@@ -111,6 +140,12 @@ class EventHubClient(object):
         :param auth_timeout: The time in seconds to wait for a token to be authorized by the service.
          The default value is 60 seconds. If set to 0, no timeout will be enforced from the client.
         :type auth_timeout: int
+        :param metrics: A hook to receive throughput, latency and reconnect metrics from the
+         Sender/Receiver clients. Default is `None`, i.e. no metrics are recorded.
+        :type metrics: ~azure.eventhub.metrics.MetricsHook
+        :param mgmt_cache_ttl: The time in seconds for which the results of `get_eventhub_info`
+         and `get_partition_info` are cached. Default is 0, i.e. every call queries the service.
+        :type mgmt_cache_ttl: float
         """
         self.container_id = "eventhub.pysdk-" + str(uuid.uuid4())[:8]
         self.address = urlparse(address)
@@ -128,8 +163,13 @@ class EventHubClient(object):
         self.get_auth = functools.partial(self._create_auth)
         self.debug = debug
         self.auth_timeout = auth_timeout
+        self.metrics = metrics
+        self.mgmt_cache_ttl = mgmt_cache_ttl
 
         self.clients = []
+        self._mgmt_client = None
+        self._mgmt_lock = threading.Lock()
+        self._mgmt_cache = {}
         self.stopped = False
         log.info("%r: Created the Event Hub client", self.container_id)
 
@@ -153,6 +193,12 @@ class EventHubClient(object):
         :param auth_timeout: The time in seconds to wait for a token to be authorized by the service.
          The default value is 60 seconds. If set to 0, no timeout will be enforced from the client.
         :type auth_timeout: int
+        :param metrics: A hook to receive throughput, latency and reconnect metrics from the
+         Sender/Receiver clients. Default is `None`, i.e. no metrics are recorded.
+        :type metrics: ~azure.eventhub.metrics.MetricsHook
+        :param mgmt_cache_ttl: The time in seconds for which the results of `get_eventhub_info`
+         and `get_partition_info` are cached. Default is 0, i.e. every call queries the service.
+        :type mgmt_cache_ttl: float
         """
         address, policy, key, entity = _parse_conn_str(conn_str)
         entity = eventhub or entity
@@ -176,6 +222,12 @@ class EventHubClient(object):
         :param auth_timeout: The time in seconds to wait for a token to be authorized by the service.
          The default value is 60 seconds. If set to 0, no timeout will be enforced from the client.
         :type auth_timeout: int
+        :param metrics: A hook to receive throughput, latency and reconnect metrics from the
+         Sender/Receiver clients. Default is `None`, i.e. no metrics are recorded.
+        :type metrics: ~azure.eventhub.metrics.MetricsHook
+        :param mgmt_cache_ttl: The time in seconds for which the results of `get_eventhub_info`
+         and `get_partition_info` are cached. Default is 0, i.e. every call queries the service.
+        :type mgmt_cache_ttl: float
         """
         address, policy, key, _ = _parse_conn_str(conn_str)
         hub_name = address.split('.')[0]
@@ -245,6 +297,7 @@ class EventHubClient(object):
         self.auth_uri = "sb://{}{}".format(self.address.hostname, self.address.path)
         self.eh_name = self.address.path.lstrip('/')
         self.mgmt_target = redirect_uri
+        self._mgmt_cache = {}
 
     def _handle_redirect(self, redirects):
         if len(redirects) != len(self.clients):
@@ -252,6 +305,7 @@ class EventHubClient(object):
         if not all(r.hostname == redirects[0].hostname for r in redirects):
             raise EventHubError("Multiple clients attempting to redirect to different hosts.")
         self._process_redirect_uri(redirects[0])
+        self._close_mgmt_client()
         for client in self.clients:
             client.open()
 
@@ -294,6 +348,69 @@ class EventHubClient(object):
         log.info("%r: Stopping %r clients", self.container_id, len(self.clients))
         self.stopped = True
         self._close_clients()
+        self._close_mgmt_client()
+
+    def _cached_mgmt_result(self, key):
+        """
+        Return a copy of a cached management result if it has not yet expired.
+        """
+        cached = self._mgmt_cache.get(key)
+        if cached and cached[0] > time.time():
+            return dict(cached[1])
+        return None
+
+    def _cache_mgmt_result(self, key, result):
+        if self.mgmt_cache_ttl:
+            self._mgmt_cache[key] = (time.time() + self.mgmt_cache_ttl, dict(result))
+        return result
+
+    def _create_mgmt_client(self):
+        alt_creds = {
+            "username": self._auth_config.get("iot_username"),
+            "password":self._auth_config.get("iot_password")}
+        mgmt_auth = self._create_auth(**alt_creds)
+        return uamqp.AMQPClient(self.mgmt_target, auth=mgmt_auth, debug=self.debug)
+
+    def _close_mgmt_client(self):
+        with self._mgmt_lock:
+            if self._mgmt_client:
+                self._mgmt_client.close()
+                self._mgmt_client = None
+
+    def _mgmt_request(self, op_type, application_properties):
+        """
+        Send a request on the management link of the Event Hub. The underlying
+        connection and link are opened on the first request and reused for
+        subsequent requests until the client is stopped. If a request fails the
+        connection is discarded and the request retried once on a new connection.
+
+        :param op_type: The type of the management operation.
+        :type op_type: bytes
+        :param application_properties: The properties identifying the entity to query.
+        :type application_properties: dict
+        :rtype: dict
+        """
+        with self._mgmt_lock:
+            for retry in (True, False):
+                try:
+                    if not self._mgmt_client:
+                        self._mgmt_client = self._create_mgmt_client()
+                        self._mgmt_client.open()
+                    response = self._mgmt_client.mgmt_request(
+                        Message(application_properties=application_properties),
+                        constants.READ_OPERATION,
+                        op_type=op_type,
+                        status_code_field=b'status-code',
+                        description_fields=b'status-description')
+                    return response.get_data()
+                except Exception as e:  # pylint: disable=broad-except
+                    log.info("%r: Management request failed: %r", self.container_id, e)
+                    if self._mgmt_client:
+                        self._mgmt_client.close()
+                        self._mgmt_client = None
+                    if not retry:
+                        raise
+        return None
 
     def get_eventhub_info(self):
         """
@@ -305,37 +422,47 @@ class EventHubClient(object):
             -'partition_count'
             -'partition_ids'
 
+        The management connection is opened on the first request and kept open
+        until the client is stopped with `stop()`.
+
         :rtype: dict
         """
-        alt_creds = {
-            "username": self._auth_config.get("iot_username"),
-            "password":self._auth_config.get("iot_password")}
-        try:
-            mgmt_auth = self._create_auth(**alt_creds)
-            mgmt_client = uamqp.AMQPClient(self.mgmt_target, auth=mgmt_auth, debug=self.debug)
-            mgmt_client.open()
-            mgmt_msg = Message(application_properties={'name': self.eh_name})
-            response = mgmt_client.mgmt_request(
-                mgmt_msg,
-                constants.READ_OPERATION,
-                op_type=b'com.microsoft:eventhub',
-                status_code_field=b'status-code',
-                description_fields=b'status-description')
-            eh_info = response.get_data()
-            output = {}
-            if eh_info:
-                output['name'] = eh_info[b'name'].decode('utf-8')
-                output['type'] = eh_info[b'type'].decode('utf-8')
-                output['created_at'] = datetime.datetime.fromtimestamp(float(eh_info[b'created_at'])/1000)
-                output['partition_count'] = eh_info[b'partition_count']
-                output['partition_ids'] = [p.decode('utf-8') for p in eh_info[b'partition_ids']]
-            return output
-        finally:
-            mgmt_client.close()
+        cached = self._cached_mgmt_result(None)
+        if cached is not None:
+            return cached
+        eh_info = self._mgmt_request(b'com.microsoft:eventhub', {'name': self.eh_name})
+        return self._cache_mgmt_result(None, _parse_eventhub_info(eh_info))
+
+    def get_partition_info(self, partition_id):
+        """
+        Get runtime details on the specified partition of the EventHub.
+        Keys in the details dictionary include:
+            -'name'
+            -'id'
+            -'begin_sequence_number'
+            -'last_enqueued_sequence_number'
+            -'last_enqueued_offset'
+            -'last_enqueued_time_utc'
+            -'is_empty'
+
+        The management connection is opened on the first request and kept open
+        until the client is stopped with `stop()`.
+
+        :param partition_id: The ID of the partition.
+        :type partition_id: str
+        :rtype: dict
+        """
+        cached = self._cached_mgmt_result(partition_id)
+        if cached is not None:
+            return cached
+        partition_info = self._mgmt_request(
+            b'com.microsoft:partition', {'name': self.eh_name, 'partition': partition_id})
+        return self._cache_mgmt_result(partition_id, _parse_partition_info(partition_info))
 
     def add_receiver(
             self, consumer_group, partition, offset=None, prefetch=300,
-            operation=None, keep_alive=30, auto_reconnect=True):
+            operation=None, keep_alive=30, auto_reconnect=True, runtime_metrics=False, retry_policy=None,
+            codec=None):
         """
         Add a receiver to the client for a particular consumer group and partition.
 
@@ -350,6 +477,16 @@ class EventHubClient(object):
         :operation: An optional operation to be appended to the hostname in the source URL.
          The value must start with `/` character.
         :type operation: str
+        :param runtime_metrics: Whether to request the last enqueued sequence number, offset
+         and time of the partition with each delivery. These are exposed by the receiver's
+         `runtime_info`. Default is `False`.
+        :type runtime_metrics: bool
+        :param retry_policy: The policy used to retry reconnects. Default is a RetryPolicy
+         with 3 retries.
+        :type retry_policy: ~azure.eventhub.common.RetryPolicy
+        :param codec: The codec with which `decode` decodes events. Default is `None`, in which
+         case each event is decoded by the codec registered for its content type.
+        :type codec: ~azure.eventhub.codecs.Codec
         :rtype: ~azure.eventhub.receiver.Receiver
         """
         path = self.address.path + operation if operation else self.address.path
@@ -357,13 +494,15 @@ class EventHubClient(object):
             self.address.hostname, path, consumer_group, partition)
         handler = Receiver(
             self, source_url, offset=offset, prefetch=prefetch,
-            keep_alive=keep_alive, auto_reconnect=auto_reconnect)
+            keep_alive=keep_alive, auto_reconnect=auto_reconnect, runtime_metrics=runtime_metrics,
+            retry_policy=retry_policy, codec=codec)
         self.clients.append(handler)
         return handler
 
     def add_epoch_receiver(
             self, consumer_group, partition, epoch, prefetch=300,
-            operation=None, keep_alive=30, auto_reconnect=True):
+            operation=None, keep_alive=30, auto_reconnect=True, runtime_metrics=False, offset=None,
+            retry_policy=None, codec=None):
         """
         Add a receiver to the client with an epoch value. Only a single epoch receiver
         can connect to a partition at any given time - additional epoch receivers must have
@@ -381,18 +520,72 @@ class EventHubClient(object):
         :operation: An optional operation to be appended to the hostname in the source URL.
          The value must start with `/` character.
         :type operation: str
+        :param runtime_metrics: Whether to request the last enqueued sequence number, offset
+         and time of the partition with each delivery. These are exposed by the receiver's
+         `runtime_info`. Default is `False`.
+        :type runtime_metrics: bool
+        :param offset: The offset from which to start receiving. Default is `None`, i.e. from
+         the start of the partition.
+        :type offset: ~azure.eventhub.common.Offset
+        :param retry_policy: The policy used to retry reconnects. Default is a RetryPolicy
+         with 3 retries.
+        :type retry_policy: ~azure.eventhub.common.RetryPolicy
+        :param codec: The codec with which `decode` decodes events. Default is `None`, in which
+         case each event is decoded by the codec registered for its content type.
+        :type codec: ~azure.eventhub.codecs.Codec
         :rtype: ~azure.eventhub.receiver.Receiver
         """
         path = self.address.path + operation if operation else self.address.path
         source_url = "amqps://{}{}/ConsumerGroups/{}/Partitions/{}".format(
             self.address.hostname, path, consumer_group, partition)
         handler = Receiver(
-            self, source_url, prefetch=prefetch, epoch=epoch,
-            keep_alive=keep_alive, auto_reconnect=auto_reconnect)
+            self, source_url, offset=offset, prefetch=prefetch, epoch=epoch,
+            keep_alive=keep_alive, auto_reconnect=auto_reconnect, runtime_metrics=runtime_metrics,
+            retry_policy=retry_policy, codec=codec)
         self.clients.append(handler)
         return handler
 
-    def add_sender(self, partition=None, operation=None, send_timeout=60, keep_alive=30, auto_reconnect=True):
+    def create_receive_pump(
+            self, on_events, receivers=None, on_error=None, io_threads=1, worker_threads=4,
+            max_queued_batches=None, max_batch_size=None, poll_timeout=0.1):
+        """
+        Create a pump that receives from the receivers of the client on a few I/O threads
+        and dispatches the batches of events to a bounded pool of worker threads. The client
+        must be run before the pump is started, and the pump stopped before the client.
+
+        :param on_events: Called on a worker thread with the receiver and each received batch
+         of events.
+        :type on_events: callable[~azure.eventhub.receiver.Receiver, list[~azure.eventhub.common.EventData]]
+        :param receivers: The receivers to receive from. Default is all the receivers of the client.
+        :type receivers: list[~azure.eventhub.receiver.Receiver]
+        :param on_error: Called with the receiver and the error when a receiver fails, in which
+         case it is no longer polled, or when `on_events` raises. Default is `None`, i.e. errors
+         are logged.
+        :type on_error: callable[~azure.eventhub.receiver.Receiver, Exception]
+        :param io_threads: The number of threads driving the receivers. Default is 1.
+        :type io_threads: int
+        :param worker_threads: The number of threads processing batches. Default is 4.
+        :type worker_threads: int
+        :param max_queued_batches: The maximum number of batches waiting for a worker, beyond
+         which receiving pauses. Default is twice the number of worker threads.
+        :type max_queued_batches: int
+        :param max_batch_size: The maximum number of events in a batch. Default is `None`,
+         i.e. up to the prefetch count of the receiver.
+        :type max_batch_size: int
+        :param poll_timeout: The time in seconds to wait for events from a receiver before
+         moving on to the next. Default is 0.1.
+        :type poll_timeout: float
+        :rtype: ~azure.eventhub.receive_pump.ReceivePump
+        """
+        if receivers is None:
+            receivers = [c for c in self.clients if isinstance(c, Receiver)]
+        return ReceivePump(
+            receivers, on_events, on_error=on_error, io_threads=io_threads, worker_threads=worker_threads,
+            max_queued_batches=max_queued_batches, max_batch_size=max_batch_size, poll_timeout=poll_timeout)
+
+    def add_sender(
+            self, partition=None, operation=None, send_timeout=60,
+            keep_alive=30, auto_reconnect=True, retry_policy=None, codec=None, compression=None):
         """
         Add a sender to the client to EventData object to an EventHub.
 
@@ -412,6 +605,16 @@ class EventHubClient(object):
         :type keep_alive: int
         :param auto_reconnect: Whether to automatically reconnect the sender if a retryable error occurs.
          Default value is `True`.
+        :param retry_policy: The policy used to retry failed sends and reconnects. Default is a
+         RetryPolicy with 3 retries.
+        :type retry_policy: ~azure.eventhub.common.RetryPolicy
+        :param codec: The codec with which `encode` encodes values. Default is a JsonCodec.
+        :type codec: ~azure.eventhub.codecs.Codec
+        :param compression: Compress the body of each event, or each message of a batched event,
+         before it is sent. Either a Compressor or the name of a content encoding: 'deflate', or 'lz4' or
+         'zstd' if the package is installed. Receivers decompress the events transparently.
+         Default is `None`, i.e. no compression.
+        :type compression: str or ~azure.eventhub.compression.Compressor
         :rtype: ~azure.eventhub.sender.Sender
         """
         target = "amqps://{}{}".format(self.address.hostname, self.address.path)
@@ -419,6 +622,7 @@ class EventHubClient(object):
             target = target + operation
         handler = Sender(
             self, target, partition=partition, send_timeout=send_timeout,
-            keep_alive=keep_alive, auto_reconnect=auto_reconnect)
+            keep_alive=keep_alive, auto_reconnect=auto_reconnect, retry_policy=retry_policy, codec=codec,
+            compression=compression)
         self.clients.append(handler)
         return handler
@@ -0,0 +1,301 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import json
+from collections import OrderedDict
+
+from azure.eventhub.common import EventData, _join_data
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import fastavro
+except ImportError:
+    fastavro = None
+
+
+CONTENT_TYPE = "content-type"
+
+
+class Codec(object):
+    """
+    Encodes values to and decodes values from event bodies. Codecs are identified
+    by the content type they set in the application properties of the events they
+    encode. Subclasses must implement `encode` and `decode`, and can override the
+    batch methods where a format can process many values more efficiently at once.
+
+    :ivar content_type: The content type of the encoded data.
+    :vartype content_type: str
+    """
+
+    content_type = None
+
+    def encode(self, value):
+        """
+        Encode a value.
+
+        :param value: The value to encode.
+        :rtype: bytes
+        """
+        raise NotImplementedError()
+
+    def decode(self, data):
+        """
+        Decode the body of an event.
+
+        :param data: The body of the event.
+        :type data: bytes
+        """
+        raise NotImplementedError()
+
+    def encode_batch(self, values):
+        """
+        Encode a list of values.
+
+        :param values: The values to encode.
+        :type values: list
+        :rtype: list[bytes]
+        """
+        return [self.encode(v) for v in values]
+
+    def decode_batch(self, data):
+        """
+        Decode the bodies of a list of events.
+
+        :param data: The bodies of the events.
+        :type data: list[bytes]
+        :rtype: list
+        """
+        return [self.decode(d) for d in data]
+
+
+class RawCodec(Codec):
+    """
+    Passes event bodies through as bytes.
+    """
+
+    content_type = "application/octet-stream"
+
+    def encode(self, value):
+        if isinstance(value, str):
+            return value.encode('UTF-8')
+        return bytes(value)
+
+    def decode(self, data):
+        return data
+
+
+class JsonCodec(Codec):
+    """
+    Encodes values as JSON. If the orjson package is installed it is used in place
+    of the standard library for UTF-8 data.
+
+    :param encoding: The text encoding of the JSON data. Default is 'UTF-8'.
+    :type encoding: str
+    :param use_orjson: Whether to use orjson if it is installed. Default is `True`.
+    :type use_orjson: bool
+    """
+
+    content_type = "application/json"
+
+    def __init__(self, encoding='UTF-8', use_orjson=True):
+        self.encoding = encoding
+        utf8 = encoding.upper().replace('-', '') == 'UTF8'
+        # A flag rather than the module is stored so that codecs can be pickled.
+        self._orjson = bool(orjson and use_orjson and utf8)
+
+    def encode(self, value):
+        if self._orjson:
+            return orjson.dumps(value)
+        return json.dumps(value, separators=(',', ':')).encode(self.encoding)
+
+    def decode(self, data):
+        if self._orjson:
+            return orjson.loads(data)
+        return json.loads(data.decode(self.encoding))
+
+
+class MsgPackCodec(Codec):
+    """
+    Encodes values as MessagePack. Requires the msgpack package.
+    """
+
+    content_type = "application/msgpack"
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError("The msgpack package is required to use MsgPackCodec.")
+
+    def encode(self, value):
+        return msgpack.packb(value, use_bin_type=True)
+
+    def decode(self, data):
+        return msgpack.unpackb(data, raw=False)
+
+    def decode_batch(self, data):
+        # MessagePack values are self-delimiting, so the bodies can be unpacked from a
+        # single stream. Each value must end where its body ends, otherwise a body holding
+        # several values could make up for an empty one. If not, fall back to decoding the
+        # bodies individually so that any error is raised for the offending body.
+        if len(data) > 1:
+            unpacker = msgpack.Unpacker(raw=False)
+            unpacker.feed(b"".join(data))
+            values = []
+            end = 0
+            try:
+                for body in data:
+                    end += len(body)
+                    values.append(unpacker.unpack())
+                    if unpacker.tell() != end:
+                        break
+                else:
+                    return values
+            except (ValueError, msgpack.OutOfData):
+                pass
+        return [self.decode(d) for d in data]
+
+
+class AvroCodec(Codec):
+    """
+    Encodes values as Avro binary data without an embedded schema, so the
+    receiver must use the same schema. Parsed schemas are cached and shared
+    between codecs. Requires the fastavro package.
+
+    :param schema: The Avro schema, as a dictionary or JSON string.
+    :type schema: dict or str
+    """
+
+    content_type = "avro/binary"
+    _schemas = {}
+
+    def __init__(self, schema):
+        if fastavro is None:
+            raise ImportError("The fastavro package is required to use AvroCodec.")
+        key = schema if isinstance(schema, str) else json.dumps(schema, sort_keys=True)
+        self.schema = AvroCodec._schemas.get(key)
+        if self.schema is None:
+            self.schema = fastavro.parse_schema(json.loads(key))
+            AvroCodec._schemas[key] = self.schema
+
+    def encode(self, value):
+        output = io.BytesIO()
+        fastavro.schemaless_writer(output, self.schema, value)
+        return output.getvalue()
+
+    def decode(self, data):
+        return fastavro.schemaless_reader(io.BytesIO(data), self.schema)
+
+
+class CodecRegistry(object):
+    """
+    Looks up the codec with which to decode an event by its content type.
+
+    :param default: The codec used for events without a content type, or with a
+     content type that has not been registered. Default is a RawCodec.
+    :type default: ~azure.eventhub.codecs.Codec
+    """
+
+    def __init__(self, default=None):
+        self.default = default or RawCodec()
+        self._codecs = {}
+
+    def register(self, codec, content_type=None):
+        """
+        Register a codec.
+
+        :param codec: The codec to register.
+        :type codec: ~azure.eventhub.codecs.Codec
+        :param content_type: The content type to register the codec for. Default is
+         the content type of the codec.
+        :type content_type: str
+        """
+        self._codecs[(content_type or codec.content_type).lower()] = codec
+
+    def get(self, content_type):
+        """
+        Get the codec for a content type. Any parameters of the content type,
+        such as the charset, are ignored.
+
+        :param content_type: The content type.
+        :type content_type: str
+        :rtype: ~azure.eventhub.codecs.Codec
+        """
+        if not content_type:
+            return self.default
+        return self._codecs.get(content_type.split(';')[0].strip().lower(), self.default)
+
+
+default_registry = CodecRegistry()
+default_registry.register(RawCodec())
+default_registry.register(JsonCodec())
+if msgpack is not None:
+    default_registry.register(MsgPackCodec())
+
+
+def encode_event(value, codec):
+    """
+    Encode a value into an event, setting its content type.
+
+    :param value: The value to encode.
+    :param codec: The codec to encode the value with.
+    :type codec: ~azure.eventhub.codecs.Codec
+    :rtype: ~azure.eventhub.common.EventData
+    """
+    event = EventData(codec.encode(value))
+    event.application_properties = {CONTENT_TYPE: codec.content_type}
+    return event
+
+
+def encode_batch(values, codec):
+    """
+    Encode a list of values into a batched event, each message of which has
+    the content type of the codec.
+
+    :param values: The values to encode.
+    :type values: list
+    :param codec: The codec to encode the values with.
+    :type codec: ~azure.eventhub.codecs.Codec
+    :rtype: ~azure.eventhub.common.EventData
+    """
+    event = EventData(batch=codec.encode_batch(values))
+    event.application_properties = {CONTENT_TYPE: codec.content_type}
+    return event
+
+
+def decode_events(events, codec=None, registry=None):
+    """
+    Decode the bodies of a list of events. Events are grouped by content type so
+    that each codec decodes all of its events in a single batch.
+
+    :param events: The events to decode.
+    :type events: list[~azure.eventhub.common.EventData]
+    :param codec: The codec to decode all events with, regardless of their content type.
+    :type codec: ~azure.eventhub.codecs.Codec
+    :param registry: The registry in which to look up the codec for each content type.
+     Default is the default registry.
+    :type registry: ~azure.eventhub.codecs.CodecRegistry
+    :rtype: list
+    """
+    if codec:
+        return codec.decode_batch([_join_data(e.body) for e in events])
+    registry = registry or default_registry
+    groups = OrderedDict()
+    for index, event in enumerate(events):
+        groups.setdefault(event.content_type, []).append(index)
+    values = [None] * len(events)
+    for content_type, indexes in groups.items():
+        decoded = registry.get(content_type).decode_batch([_join_data(events[i].body) for i in indexes])
+        for index, value in zip(indexes, decoded):
+            values[index] = value
+    return values
@@ -4,6 +4,7 @@
 # --------------------------------------------------------------------------------------------
 
 import datetime
+import random
 import time
 import json
 
@@ -19,6 +20,9 @@ _NO_RETRY_ERRORS = (
     b"com.microsoft:argument-error"
 )
 
+_AMQP_NO_RETRY_ERRORS = tuple(
+    getattr(c, 'value', c) for c in errors.ErrorPolicy().no_retry)
+
 def _error_handler(error):
     """
     Called internally when an event has failed to send so we
@@ -30,23 +34,170 @@ def _error_handler(error):
     :type error: Exception
     :rtype: ~uamqp.errors.ErrorAction
     """
-    if error.condition == b'com.microsoft:server-busy':
+    return _condition_action(error.condition)
+
+
+def _condition_action(condition):
+    condition = getattr(condition, 'value', condition)
+    if condition == b'com.microsoft:server-busy':
         return errors.ErrorAction(retry=True, backoff=4)
-    if error.condition == b'com.microsoft:timeout':
+    if condition == b'com.microsoft:timeout':
         return errors.ErrorAction(retry=True, backoff=2)
-    if error.condition == b'com.microsoft:operation-cancelled':
+    if condition == b'com.microsoft:operation-cancelled':
         return errors.ErrorAction(retry=True)
-    if error.condition == b"com.microsoft:container-close":
+    if condition == b"com.microsoft:container-close":
         return errors.ErrorAction(retry=True, backoff=4)
-    if error.condition in _NO_RETRY_ERRORS:
+    if condition in _NO_RETRY_ERRORS or condition in _AMQP_NO_RETRY_ERRORS:
         return errors.ErrorAction(retry=False)
     return errors.ErrorAction(retry=True)
 
 
+class _EventHubErrorPolicy(errors.ErrorPolicy):
+    """
+    Applies the Event Hubs error conditions to link and connection errors as well
+    as to failed messages, so that a detach with e.g. server-busy carries the
+    backoff it calls for.
+    """
+
+    def __init__(self, max_retries=3):
+        super(_EventHubErrorPolicy, self).__init__(max_retries=max_retries, on_error=_error_handler)
+
+    def on_link_error(self, error):
+        return _condition_action(error.condition)
+
+    def on_connection_error(self, error):
+        return _condition_action(error.condition)
+
+
+class RetryPolicy(object):
+    """
+    Determines whether and when a failed operation is retried, using exponential
+    backoff with jitter so that many clients retrying at the same time do not do
+    so in lockstep. Errors raised by the service are retried according to their
+    AMQP error condition, and any backoff the condition calls for is respected.
+
+    :param max_retries: The maximum number of retries. Default is 5.
+    :type max_retries: int
+    :param backoff_factor: The delay in seconds before the first retry. The delay
+     doubles with each subsequent retry. Default is 0.8.
+    :type backoff_factor: float
+    :param backoff_max: The maximum delay in seconds between retries. Default is 60.
+    :type backoff_max: float
+    :param jitter: Whether to randomize each delay to between half and the whole of
+     its value. Default is `True`.
+    :type jitter: bool
+    :param max_elapsed: The maximum time in seconds from the first attempt after which
+     no further retries are made. Default is `None`, i.e. no limit.
+    :type max_elapsed: float
+    """
+
+    def __init__(self, max_retries=5, backoff_factor=0.8, backoff_max=60, jitter=True, max_elapsed=None):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.max_elapsed = max_elapsed
+
+    @staticmethod
+    def _error_action(error):
+        action = getattr(error, 'action', None)
+        if isinstance(action, errors.ErrorAction):
+            return action
+        condition = getattr(error, 'condition', None)
+        condition = getattr(condition, 'value', condition)
+        if not condition:
+            return None
+        if not isinstance(condition, bytes):
+            condition = condition.encode('UTF-8')
+        return _condition_action(condition)
+
+    def is_retryable(self, error):
+        """
+        Whether an operation that failed with the given error may be retried.
+        Errors without an AMQP error condition are always retryable.
+
+        :param error: The error raised by the operation.
+        :type error: Exception
+        :rtype: bool
+        """
+        action = self._error_action(error)
+        return action.retry if action else True
+
+    def get_backoff(self, retry_count, error=None):
+        """
+        The time in seconds to wait before the given retry.
+
+        :param retry_count: The number of retries that have already been made.
+        :type retry_count: int
+        :param error: The error raised by the last attempt, if any.
+        :type error: Exception
+        :rtype: float
+        """
+        backoff = min(self.backoff_max, self.backoff_factor * (2 ** retry_count))
+        if self.jitter:
+            backoff = random.uniform(backoff / 2, backoff)
+        action = self._error_action(error) if error else None
+        if action and action.backoff:
+            backoff = max(backoff, action.backoff)
+        return backoff
+
+    def next_backoff(self, retry_count, error=None, started=None):
+        """
+        Returns the time in seconds to wait before retrying a failed operation, or `None`
+        if it should not be retried.
+
+        :param retry_count: The number of retries that have already been made.
+        :type retry_count: int
+        :param error: The error raised by the last attempt, if any.
+        :type error: Exception
+        :param started: The time, as returned by `time.time()`, of the first attempt.
+        :type started: float
+        :rtype: float or None
+        """
+        if retry_count >= self.max_retries:
+            return None
+        if error is not None and not self.is_retryable(error):
+            return None
+        backoff = self.get_backoff(retry_count, error)
+        if self.max_elapsed is not None and started is not None:
+            if time.time() - started + backoff > self.max_elapsed:
+                return None
+        return backoff
+
+
+def _as_bytes(data):
+    """
+    uamqp only sends str and bytes as binary data sections - other buffers would be
+    encoded as an AMQP value instead. As the data is copied into the AMQP message
+    regardless, a bytearray or memoryview is converted with a single copy here.
+    """
+    if isinstance(data, (bytearray, memoryview)):
+        return bytes(data)
+    return data
+
+
+def _join_data(data):
+    """
+    Join the data sections of a message body. A body of a single section is
+    returned without copying.
+
+    :raises: TypeError if the body is not made up of binary data sections.
+    """
+    if isinstance(data, bytes):
+        return data
+    sections = list(data)
+    if not all(isinstance(s, bytes) for s in sections):
+        raise TypeError("Message body is not binary data.")
+    return sections[0] if len(sections) == 1 else b"".join(sections)
+
+
 class EventData(object):
     """
     The EventData class is a holder of event content.
     Acts as a wrapper to an uamqp.message.Message object.
+
+    :ivar decoded: The decoded body of a received event, if the Event Processor Host
+     has been configured with a batch decoder. Default is `None`.
     """
 
     PROP_SEQ_NUMBER = b"x-opt-sequence-number"
@@ -59,8 +210,9 @@ class EventData(object):
         """
         Initialize EventData.
 
-        :param body: The data to send in a single message.
-        :type body: str, bytes or list
+        :param body: The data to send in a single message. A bytearray or memoryview is
+         copied to bytes, as uamqp only accepts bytes.
+        :type body: str, bytes, bytearray, memoryview or list
         :param batch: A data generator to send batched messages.
         :type batch: Generator
         :param message: The received message.
@@ -69,11 +221,15 @@ class EventData(object):
         self._partition_key = types.AMQPSymbol(EventData.PROP_PARTITION_KEY)
         self._annotations = {}
         self._app_properties = {}
+        self._decompressed_body = None
+        self._batch = None
+        self.decoded = None
         self.msg_properties = MessageProperties()
         if to_device:
             self.msg_properties.to = '/devices/{}/messages/devicebound'.format(to_device)
         if batch:
-            self.message = BatchMessage(data=batch, multi_messages=True, properties=self.msg_properties)
+            self._batch = (_as_bytes(d) for d in batch)
+            self.message = BatchMessage(data=self._batch, multi_messages=True, properties=self.msg_properties)
         elif message:
             self.message = message
             self.msg_properties = message.properties
@@ -81,13 +237,13 @@ class EventData(object):
             self._app_properties = message.application_properties
         else:
             if isinstance(body, list) and body:
-                self.message = Message(body[0], properties=self.msg_properties)
+                self.message = Message(_as_bytes(body[0]), properties=self.msg_properties)
                 for more in body[1:]:
-                    self.message._body.append(more)  # pylint: disable=protected-access
+                    self.message._body.append(_as_bytes(more))  # pylint: disable=protected-access
             elif body is None:
                 raise ValueError("EventData cannot be None.")
             else:
-                self.message = Message(body, properties=self.msg_properties)
+                self.message = Message(_as_bytes(body), properties=self.msg_properties)
 
     @property
     def sequence_number(self):
@@ -160,6 +316,51 @@ class EventData(object):
         self.message.header = header
         self._annotations = annotations
 
+    @property
+    def content_type(self):
+        """
+        The content type of the event body, as set in the 'content-type'
+        application property by a codec.
+
+        :rtype: str
+        """
+        return self._get_app_property('content-type')
+
+    @property
+    def content_encoding(self):
+        """
+        The compression of the event body as sent, as set in the 'content-encoding'
+        application property. Received bodies are decompressed by the receiver.
+
+        :rtype: str
+        """
+        return self._get_app_property('content-encoding')
+
+    def _map_batch(self, func):
+        """
+        Apply a function to each data section of a batched event as it is sent.
+        The batch message is rebuilt around the mapped data generator, keeping its
+        properties and annotations.
+
+        :param func: The function to apply to each data section.
+        :type func: callable[bytes, bytes]
+        """
+        self._batch = (func(d) for d in self._batch)
+        self.message = BatchMessage(
+            data=self._batch,
+            multi_messages=True,
+            properties=self.message.properties,
+            application_properties=self.message.application_properties,
+            annotations=self.message.annotations,
+            header=self.message.header)
+
+    def _get_app_property(self, name):
+        properties = self._app_properties or {}
+        value = properties.get(name.encode('UTF-8'), properties.get(name))
+        if isinstance(value, bytes):
+            return value.decode('UTF-8')
+        return value
+
     @property
     def application_properties(self):
         """
@@ -188,11 +389,25 @@ class EventData(object):
 
         :rtype: bytes or Generator[bytes]
         """
+        if self._decompressed_body is not None:
+            return iter((self._decompressed_body,))
         try:
             return self.message.get_data()
         except TypeError:
             raise ValueError("Message data empty.")
 
+    @property
+    def body_memoryview(self):
+        """
+        The body of the event data as a read-only memoryview over the received data,
+        so that large payloads can be sliced and passed on without copying. A body of
+        multiple data sections is joined first.
+
+        :rtype: memoryview
+        :raises: TypeError if the body is not binary data.
+        """
+        return memoryview(_join_data(self.body))
+
     def body_as_str(self, encoding='UTF-8'):
         """
         The body of the event data as a string if the data is of a
@@ -204,13 +419,9 @@ class EventData(object):
         """
         data = self.body
         try:
-            return "".join(b.decode(encoding) for b in data)
+            return _join_data(data).decode(encoding)
         except TypeError:
             return str(data)
-        except:  # pylint: disable=bare-except
-            pass
-        try:
-            return data.decode(encoding)
         except Exception as e:
             raise TypeError("Message data is not compatible with string type: {}".format(e))
 
@@ -282,6 +493,8 @@ class EventHubError(Exception):
     :vartype message: str
     :ivar error: The error condition, if available.
     :vartype error: str
+    :ivar condition: The full AMQP error condition, if available.
+    :vartype condition: str
     :ivar details: The error details, if included in the
      service response.
     :vartype details: dict[str, str]
@@ -289,15 +502,17 @@ class EventHubError(Exception):
 
     def __init__(self, message, details=None):
         self.error = None
+        self.condition = None
         self.message = message
         self.details = details
         if isinstance(message, constants.MessageSendResult):
             self.message = "Message send failed with result: {}".format(message)
-        if details and isinstance(details, Exception):
-            try:
-                condition = details.condition.value.decode('UTF-8')
-            except AttributeError:
-                condition = details.condition.decode('UTF-8')
+        condition = getattr(details, 'condition', None) if isinstance(details, Exception) else None
+        condition = getattr(condition, 'value', condition)
+        if condition:
+            if isinstance(condition, bytes):
+                condition = condition.decode('UTF-8')
+            self.condition = condition
             _, _, self.error = condition.partition(':')
             self.message += "\nError: {}".format(self.error)
             try:
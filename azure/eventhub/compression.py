@@ -0,0 +1,217 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import zlib
+import logging
+
+from uamqp import Message, BatchMessage
+
+from azure.eventhub.common import _join_data
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+log = logging.getLogger(__name__)
+
+CONTENT_ENCODING = "content-encoding"
+
+# Received batches with at least this many compressed bytes are decompressed
+# in an executor by the async receivers, rather than on the event loop.
+EXECUTOR_THRESHOLD = 256 * 1024
+
+
+class Compressor(object):
+    """
+    Compresses and decompresses event bodies. Compressors are identified by
+    the encoding they set in the 'content-encoding' application property of
+    the events they compress.
+
+    :ivar encoding: The name of the content encoding.
+    :vartype encoding: str
+    """
+
+    encoding = None
+
+    def compress(self, data):
+        """
+        Compress an event body.
+
+        :param data: The body to compress.
+        :type data: bytes
+        :rtype: bytes
+        """
+        raise NotImplementedError()
+
+    def decompress(self, data):
+        """
+        Decompress an event body.
+
+        :param data: The compressed body.
+        :type data: bytes
+        :rtype: bytes
+        """
+        raise NotImplementedError()
+
+
+class ZlibCompressor(Compressor):
+    """
+    Compresses event bodies with zlib.
+
+    :param level: The compression level, from 1 (fastest) to 9 (smallest). Default is 6.
+    :type level: int
+    """
+
+    encoding = "deflate"
+
+    def __init__(self, level=6):
+        self.level = level
+
+    def compress(self, data):
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data):
+        return zlib.decompress(data)
+
+
+class Lz4Compressor(Compressor):
+    """
+    Compresses event bodies with LZ4 frames. Requires the lz4 package.
+
+    :param level: The compression level. Default is 0, the fastest.
+    :type level: int
+    """
+
+    encoding = "lz4"
+
+    def __init__(self, level=0):
+        if lz4_frame is None:
+            raise ImportError("The lz4 package is required to use Lz4Compressor.")
+        self.level = level
+
+    def compress(self, data):
+        return lz4_frame.compress(data, compression_level=self.level)
+
+    def decompress(self, data):
+        return lz4_frame.decompress(data)
+
+
+class ZstdCompressor(Compressor):
+    """
+    Compresses event bodies with Zstandard. Requires the zstandard package.
+
+    :param level: The compression level. Default is 3.
+    :type level: int
+    """
+
+    encoding = "zstd"
+
+    def __init__(self, level=3):
+        if zstandard is None:
+            raise ImportError("The zstandard package is required to use ZstdCompressor.")
+        self.level = level
+
+    def compress(self, data):
+        # Compression contexts are not thread safe, so one is created per call.
+        return zstandard.ZstdCompressor(level=self.level).compress(data)
+
+    def decompress(self, data):
+        return zstandard.ZstdDecompressor().decompress(data)
+
+
+_COMPRESSORS = {ZlibCompressor.encoding: ZlibCompressor}
+if lz4_frame is not None:
+    _COMPRESSORS[Lz4Compressor.encoding] = Lz4Compressor
+if zstandard is not None:
+    _COMPRESSORS[ZstdCompressor.encoding] = ZstdCompressor
+
+
+def get_compressor(encoding):
+    """
+    Get a compressor by the name of its content encoding.
+
+    :param encoding: The content encoding: 'deflate', 'lz4' or 'zstd'.
+    :type encoding: str
+    :rtype: ~azure.eventhub.compression.Compressor
+    :raises: ValueError if the encoding is not supported, or the package it
+     requires is not installed.
+    """
+    try:
+        return _COMPRESSORS[encoding.lower()]()
+    except KeyError:
+        raise ValueError("Unsupported content encoding: {}".format(encoding))
+
+
+def compress_event(event, compressor):
+    """
+    Compress the body of an event before it is sent, and set its content encoding.
+    The data of a batched event is compressed message by message, as each is
+    delivered as a separate event. Events that already have a content encoding
+    are left unchanged.
+
+    :param event: The event to compress.
+    :type event: ~azure.eventhub.common.EventData
+    :param compressor: The compressor to use.
+    :type compressor: ~azure.eventhub.compression.Compressor
+    """
+    if event.content_encoding:
+        return
+    message = event.message
+    if isinstance(message, BatchMessage):
+        event._map_batch(compressor.compress)  # pylint: disable=protected-access
+    else:
+        event.message = Message(
+            compressor.compress(_join_data(event.body)),
+            properties=message.properties,
+            annotations=message.annotations,
+            header=message.header)
+    properties = dict(event.application_properties or {})
+    properties[CONTENT_ENCODING] = compressor.encoding
+    event.application_properties = properties
+
+
+def decompress_events(events):
+    """
+    Decompress the bodies of received events that have a content encoding.
+    Events with an unsupported encoding are left compressed.
+
+    :param events: The received events.
+    :type events: list[~azure.eventhub.common.EventData]
+    """
+    compressors = {}
+    for event in events:
+        encoding = event.content_encoding
+        if not encoding or event._decompressed_body is not None:  # pylint: disable=protected-access
+            continue
+        if encoding not in compressors:
+            try:
+                compressors[encoding] = get_compressor(encoding)
+            except ValueError as e:
+                log.warning("Unable to decompress event %r: %r", event.sequence_number, e)
+                compressors[encoding] = None
+        if compressors[encoding]:
+            try:
+                event._decompressed_body = compressors[encoding].decompress(  # pylint: disable=protected-access
+                    _join_data(event.message.get_data()))
+            except Exception as e:  # pylint: disable=broad-except
+                log.warning("Unable to decompress event %r: %r", event.sequence_number, e)
+
+
+def compressed_size(events):
+    """
+    The total size in bytes of the compressed bodies of a list of received events.
+
+    :param events: The received events.
+    :type events: list[~azure.eventhub.common.EventData]
+    :rtype: int
+    """
+    return sum(len(_join_data(e.message.get_data())) for e in events if e.content_encoding)
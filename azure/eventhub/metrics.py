@@ -0,0 +1,113 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import types
+
+# Sender metrics
+EVENTS_SENT = "eventhub.events_sent"
+BYTES_SENT = "eventhub.bytes_sent"
+SEND_FAILURES = "eventhub.send_failures"
+SEND_LATENCY = "eventhub.send_latency"
+
+# Receiver metrics
+EVENTS_RECEIVED = "eventhub.events_received"
+BYTES_RECEIVED = "eventhub.bytes_received"
+QUEUE_SIZE = "eventhub.queue_size"
+
+# Sender and Receiver metrics
+RECONNECTS = "eventhub.reconnects"
+
+# Event Processor Host metrics
+LEASES_ACQUIRED = "eventprocessorhost.leases_acquired"
+LEASES_STOLEN = "eventprocessorhost.leases_stolen"
+LEASES_LOST = "eventprocessorhost.leases_lost"
+CHECKPOINT_LATENCY = "eventprocessorhost.checkpoint_latency"
+LEASE_LATENCY = "eventprocessorhost.lease_latency"
+PROCESS_EVENTS_LATENCY = "eventprocessorhost.process_events_latency"
+BATCH_SIZE = "eventprocessorhost.batch_size"
+LOOP_LAG = "eventprocessorhost.loop_lag"
+PARTITION_LAG_SECONDS = "eventprocessorhost.partition_lag_seconds"
+PARTITION_LAG_EVENTS = "eventprocessorhost.partition_lag_events"
+
+
+class MetricsHook(object):
+    """
+    Receives the metrics emitted by the Sender, Receiver and Event Processor Host
+    clients. All methods are no-ops - override them to forward values to a metrics
+    backend, and pass an instance to the EventHubClient (`metrics`) or to the
+    EPHOptions (`metrics`).
+
+    Metric names are defined as constants in the `azure.eventhub.metrics` module.
+    Tags identify the source of a value and include the 'eventhub' name and the
+    'partition' ID where one applies. Lease latencies are also tagged with the
+    'operation' ('acquire', 'renew' or 'release') and loop lag with the 'host' name.
+    Per partition percentiles can be computed from the histograms by the backend.
+    """
+
+    def increment(self, name, value=1, tags=None):
+        """
+        Increment a counter.
+
+        :param name: The name of the counter.
+        :type name: str
+        :param value: The amount to increment by. Default is 1.
+        :type value: int
+        :param tags: Tags identifying the source of the value.
+        :type tags: dict[str, str]
+        """
+        pass
+
+    def gauge(self, name, value, tags=None):
+        """
+        Record the current value of a gauge.
+
+        :param name: The name of the gauge.
+        :type name: str
+        :param value: The current value.
+        :type value: int or float
+        :param tags: Tags identifying the source of the value.
+        :type tags: dict[str, str]
+        """
+        pass
+
+    def observe(self, name, value, tags=None):
+        """
+        Record a value in a histogram. Latencies are reported in seconds.
+
+        :param name: The name of the histogram.
+        :type name: str
+        :param value: The observed value.
+        :type value: int or float
+        :param tags: Tags identifying the source of the value.
+        :type tags: dict[str, str]
+        """
+        pass
+
+
+def _data_size(data):
+    """
+    The size in bytes of a binary data section, or 0 for other values, the size
+    of which is not known until they are encoded.
+    """
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    if isinstance(data, memoryview):
+        return data.nbytes
+    return 0
+
+
+def _message_size(message):
+    """
+    The size in bytes of the data sections of a message body. AMQP value and
+    sequence bodies are not counted. This never raises, so that reporting
+    metrics cannot fail a send or receive.
+    """
+    try:
+        data = message.get_data()
+        if isinstance(data, types.GeneratorType):
+            return sum(_data_size(d) for d in data)
+        return _data_size(data)
+    except Exception:  # pylint: disable=broad-except
+        return 0
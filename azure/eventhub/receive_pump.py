@@ -0,0 +1,196 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import logging
+import threading
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+log = logging.getLogger(__name__)
+
+
+class ReceivePump(object):
+    """
+    Receives events from a number of Receivers and dispatches the batches to a pool
+    of worker threads. The receivers are shared between a few I/O threads, each of
+    which drives the connections of its receivers in turn, so that many partitions can
+    be consumed with few threads.
+
+    Received batches are put on a bounded queue from which the workers take them. When
+    the queue is full, the I/O threads wait for the workers to catch up rather than
+    receiving more, so the number of events held in memory is bounded by the size of
+    the queue and the prefetch count of the receivers. A receiver is not polled again
+    while its last batch is waiting or being processed, so the batches of a partition
+    are processed one at a time and in order.
+    """
+
+    # The receive timeout in seconds of each poll. Receivers are polled in turn without
+    # waiting for events, so that idle receivers do not delay busy ones.
+    _poll_receive_timeout = 0.001
+
+    def __init__(
+            self, receivers, on_events, on_error=None, io_threads=1, worker_threads=4,
+            max_queued_batches=None, max_batch_size=None, poll_timeout=0.1):
+        """
+        Instantiate a receive pump.
+
+        :param receivers: The receivers to receive from. They must have been opened by
+         running the client before the pump is started.
+        :type receivers: list[~azure.eventhub.receiver.Receiver]
+        :param on_events: Called on a worker thread with the receiver and each received batch
+         of events.
+        :type on_events: callable[~azure.eventhub.receiver.Receiver, list[~azure.eventhub.common.EventData]]
+        :param on_error: Called on an I/O thread with the receiver and the error when a receiver
+         fails, in which case it is no longer polled, or on a worker thread when `on_events`
+         raises. Default is `None`, i.e. errors are logged.
+        :type on_error: callable[~azure.eventhub.receiver.Receiver, Exception]
+        :param io_threads: The number of threads driving the receivers. Default is 1.
+        :type io_threads: int
+        :param worker_threads: The number of threads processing batches. Default is 4.
+        :type worker_threads: int
+        :param max_queued_batches: The maximum number of batches waiting for a worker.
+         Default is twice the number of worker threads.
+        :type max_queued_batches: int
+        :param max_batch_size: The maximum number of events in a batch. Default is `None`,
+         i.e. up to the prefetch count of the receiver.
+        :type max_batch_size: int
+        :param poll_timeout: The time in seconds an I/O thread waits before polling its
+         receivers again when none of them had events. A worker finishing a batch ends the
+         wait early. Default is 0.1.
+        :type poll_timeout: float
+        """
+        if io_threads < 1 or worker_threads < 1:
+            raise ValueError("At least one I/O thread and one worker thread are required.")
+        self.receivers = list(receivers)
+        self.on_events = on_events
+        self.on_error = on_error
+        self.io_threads = min(io_threads, max(1, len(self.receivers)))
+        self.worker_threads = worker_threads
+        self.max_batch_size = max_batch_size
+        self.poll_timeout = poll_timeout
+        self._queue = queue.Queue(maxsize=max_queued_batches or worker_threads * 2)
+        self._in_flight = set()
+        self._failed = set()
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._stopped = threading.Event()
+        self._threads = []
+        self._workers = []
+
+    @property
+    def queued_batches(self):
+        """
+        The number of batches waiting for a worker.
+
+        :rtype: int
+        """
+        return self._queue.qsize()
+
+    def start(self):
+        """
+        Start the I/O and worker threads.
+        """
+        if self._threads:
+            raise ValueError("The pump has already been started.")
+        for i in range(self.worker_threads):
+            worker = threading.Thread(target=self._run_worker, name="eventhub-pump-worker-{}".format(i))
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+        for i in range(self.io_threads):
+            thread = threading.Thread(
+                target=self._run_io, args=(self.receivers[i::self.io_threads],),
+                name="eventhub-pump-io-{}".format(i))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """
+        Stop receiving and wait for the batches already received to be processed.
+        This must not be called from `on_events`.
+        """
+        self._stopped.set()
+        with self._lock:
+            self._released.notify_all()
+        for thread in self._threads:
+            thread.join()
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._threads = []
+        self._workers = []
+
+    def _run_io(self, receivers):
+        while not self._stopped.is_set():
+            received = False
+            for receiver in receivers:
+                if self._stopped.is_set():
+                    return
+                with self._lock:
+                    if receiver in self._failed:
+                        continue
+                    in_flight = receiver in self._in_flight
+                if in_flight:
+                    self._keep_alive(receiver)
+                    continue
+                try:
+                    events = receiver.receive(max_batch_size=self.max_batch_size, timeout=self._poll_receive_timeout)
+                except Exception as e:  # pylint: disable=broad-except
+                    with self._lock:
+                        self._failed.add(receiver)
+                    self._handle_error(receiver, e)
+                    continue
+                if events:
+                    received = True
+                    with self._lock:
+                        self._in_flight.add(receiver)
+                    # Blocks while the queue is full.
+                    self._queue.put((receiver, events))
+            if not received:
+                # One wait per round, ended early when a worker releases a receiver.
+                with self._lock:
+                    if not self._stopped.is_set():
+                        self._released.wait(self.poll_timeout)
+
+    @staticmethod
+    def _keep_alive(receiver):
+        """
+        Drive the connection of a receiver whose last batch has not been processed yet,
+        so that its link is serviced while it is not polled. Incoming events are held by
+        the handler until the receiver is polled again, and errors are left to be raised
+        by that receive.
+        """
+        try:
+            receiver._handler.do_work()  # pylint: disable=protected-access
+        except Exception as e:  # pylint: disable=broad-except
+            log.debug("%r: Connection work failed while the batch is processed: %r", receiver.name, e)
+
+    def _run_worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            receiver, events = item
+            try:
+                self.on_events(receiver, events)
+            except Exception as e:  # pylint: disable=broad-except
+                self._handle_error(receiver, e)
+            finally:
+                with self._lock:
+                    self._in_flight.discard(receiver)
+                    self._released.notify_all()
+
+    def _handle_error(self, receiver, error):
+        if self.on_error:
+            try:
+                self.on_error(receiver, error)
+            except Exception as e:  # pylint: disable=broad-except
+                log.error("%r: Pump error callback failed: %r", receiver.name, e)
+        else:
+            log.error("%r: Pump failed to process events: %r", receiver.name, error)
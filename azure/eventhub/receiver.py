@@ -4,24 +4,36 @@
 # --------------------------------------------------------------------------------------------
 
 import uuid
+import time
 import logging
+import datetime
 
-from uamqp import types, errors
+from uamqp import types, errors, utils
 from uamqp import ReceiveClient, Source
 
-from azure.eventhub.common import EventHubError, EventData, _error_handler
+from azure.eventhub import metrics, codecs, compression
+from azure.eventhub.common import EventHubError, EventData, RetryPolicy, _EventHubErrorPolicy
 
 log = logging.getLogger(__name__)
 
 
+def _from_timestamp(timestamp):
+    if timestamp is None:
+        return None
+    return datetime.datetime.utcfromtimestamp(float(timestamp)/1000)
+
+
 class Receiver:
     """
     Implements a Receiver.
     """
     timeout = 0
     _epoch = b'com.microsoft:epoch'
+    _runtime_metric = b'com.microsoft:enable-receiver-runtime-metric'
 
-    def __init__(self, client, source, offset=None, prefetch=300, epoch=None, keep_alive=None, auto_reconnect=True):
+    def __init__(
+            self, client, source, offset=None, prefetch=300, epoch=None,
+            keep_alive=None, auto_reconnect=True, runtime_metrics=False, retry_policy=None, codec=None):
         """
         Instantiate a receiver.
 
@@ -34,6 +46,16 @@ class Receiver:
         :type prefetch: int
         :param epoch: An optional epoch value.
         :type epoch: int
+        :param runtime_metrics: Whether to request the last enqueued sequence number, offset
+         and time of the partition with each delivery. These are exposed by `runtime_info`.
+         Default is `False`.
+        :type runtime_metrics: bool
+        :param retry_policy: The policy used to retry reconnects. Default is a RetryPolicy
+         with 3 retries.
+        :type retry_policy: ~azure.eventhub.common.RetryPolicy
+        :param codec: The codec with which `decode` decodes events. Default is `None`, in which
+         case each event is decoded by the codec registered for its content type.
+        :type codec: ~azure.eventhub.codecs.Codec
         """
         self.running = False
         self.client = client
@@ -43,25 +65,35 @@ class Receiver:
         self.epoch = epoch
         self.keep_alive = keep_alive
         self.auto_reconnect = auto_reconnect
-        self.retry_policy = errors.ErrorPolicy(max_retries=3, on_error=_error_handler)
+        self.runtime_metrics = runtime_metrics
+        self.runtime_info = None
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=3)
+        self.error_policy = _EventHubErrorPolicy(max_retries=self.retry_policy.max_retries)
         self.properties = None
         self.redirected = None
         self.error = None
         partition = self.source.split('/')[-1]
         self.name = "EHReceiver-{}-partition{}".format(uuid.uuid4(), partition)
+        self.codec = codec
+        self.metrics = self.client.metrics
+        self._metric_tags = {"eventhub": self.client.eh_name, "partition": partition}
         source = Source(self.source)
         if self.offset is not None:
             source.set_filter(self.offset.selector())
         if epoch:
             self.properties = {types.AMQPSymbol(self._epoch): types.AMQPLong(int(epoch))}
+        self._capabilities = None
+        if runtime_metrics:
+            self._capabilities = utils.data_factory(types.AMQPArray([types.AMQPSymbol(self._runtime_metric)]))
         self._handler = ReceiveClient(
             source,
             auth=self.client.get_auth(),
             debug=self.client.debug,
             prefetch=self.prefetch,
             link_properties=self.properties,
+            desired_capabilities=self._capabilities,
             timeout=self.timeout,
-            error_policy=self.retry_policy,
+            error_policy=self.error_policy,
             keep_alive_interval=self.keep_alive,
             client_name=self.name,
             properties=self.client.create_properties())
@@ -91,8 +123,9 @@ class Receiver:
                 debug=self.client.debug,
                 prefetch=self.prefetch,
                 link_properties=self.properties,
+                desired_capabilities=self._capabilities,
                 timeout=self.timeout,
-                error_policy=self.retry_policy,
+                error_policy=self.error_policy,
                 keep_alive_interval=self.keep_alive,
                 client_name=self.name,
                 properties=self.client.create_properties())
@@ -100,50 +133,62 @@ class Receiver:
         while not self.has_started():
             self._handler._connection.work()
 
-    def reconnect(self):
+    def reconnect(self, error=None):
         """If the Receiver was disconnected from the service with
-        a retryable error - attempt to reconnect."""
+        a retryable error - attempt to reconnect. Attempts are spaced
+        out and limited according to the retry policy.
+
+        :param error: The error that disconnected the Receiver.
+        :type error: Exception
+        """
         # pylint: disable=protected-access
         alt_creds = {
             "username": self.client._auth_config.get("iot_username"),
             "password":self.client._auth_config.get("iot_password")}
-        self._handler.close()
-        source = Source(self.source)
-        if self.offset is not None:
-            source.set_filter(self.offset.selector())
-        self._handler = ReceiveClient(
-            source,
-            auth=self.client.get_auth(**alt_creds),
-            debug=self.client.debug,
-            prefetch=self.prefetch,
-            link_properties=self.properties,
-            timeout=self.timeout,
-            error_policy=self.retry_policy,
-            keep_alive_interval=self.keep_alive,
-            client_name=self.name,
-            properties=self.client.create_properties())
-        try:
-            self._handler.open()
-            while not self.has_started():
-                self._handler._connection.work()
-        except (errors.LinkDetach, errors.ConnectionClose) as shutdown:
-            if shutdown.action.retry and self.auto_reconnect:
-                self.reconnect()
-            else:
-                error = EventHubError(str(shutdown), shutdown)
+        started = time.time()
+        retry_count = 0
+        while True:
+            backoff = self.retry_policy.next_backoff(retry_count, error, started)
+            if backoff is None:
+                error = EventHubError(str(error), error)
                 self.close(exception=error)
                 raise error
-        except errors.MessageHandlerError as shutdown:
-            if self.auto_reconnect:
-                self.reconnect()
-            else:
-                error = EventHubError(str(shutdown), shutdown)
+            log.info("%r: Reconnecting in %r seconds.", self.name, backoff)
+            time.sleep(backoff)
+            retry_count += 1
+            if self.metrics:
+                self.metrics.increment(metrics.RECONNECTS, tags=self._metric_tags)
+            self._handler.close()
+            source = Source(self.source)
+            if self.offset is not None:
+                source.set_filter(self.offset.selector())
+            self._handler = ReceiveClient(
+                source,
+                auth=self.client.get_auth(**alt_creds),
+                debug=self.client.debug,
+                prefetch=self.prefetch,
+                link_properties=self.properties,
+                desired_capabilities=self._capabilities,
+                timeout=self.timeout,
+                error_policy=self.error_policy,
+                keep_alive_interval=self.keep_alive,
+                client_name=self.name,
+                properties=self.client.create_properties())
+            try:
+                self._handler.open()
+                while not self.has_started():
+                    self._handler._connection.work()
+                return
+            except (errors.LinkDetach, errors.ConnectionClose, errors.MessageHandlerError) as shutdown:
+                if not self.auto_reconnect:
+                    error = EventHubError(str(shutdown), shutdown)
+                    self.close(exception=error)
+                    raise error
+                error = shutdown
+            except Exception as e:
+                error = EventHubError("Receiver reconnect failed: {}".format(e))
                 self.close(exception=error)
                 raise error
-        except Exception as e:
-            error = EventHubError("Receiver reconnect failed: {}".format(e))
-            self.close(exception=error)
-            raise error
 
     def get_handler_state(self):
         """
@@ -233,21 +278,30 @@ class Receiver:
             message_batch = self._handler.receive_message_batch(
                 max_batch_size=max_batch_size,
                 timeout=timeout_ms)
+            compressed = []
             for message in message_batch:
                 event_data = EventData(message=message)
                 self.offset = event_data.offset
                 data_batch.append(event_data)
+                if event_data.content_encoding:
+                    compressed.append(event_data)
+            if compressed:
+                compression.decompress_events(compressed)
+            if self.runtime_metrics and message_batch:
+                self._update_runtime_info(message_batch[-1])
+            if self.metrics:
+                self._record_received(message_batch)
             return data_batch
         except (errors.LinkDetach, errors.ConnectionClose) as shutdown:
             if shutdown.action.retry and self.auto_reconnect:
-                self.reconnect()
+                self.reconnect(shutdown)
                 return data_batch
             error = EventHubError(str(shutdown), shutdown)
             self.close(exception=error)
             raise error
         except errors.MessageHandlerError as shutdown:
             if self.auto_reconnect:
-                self.reconnect()
+                self.reconnect(shutdown)
                 return data_batch
             error = EventHubError(str(shutdown), shutdown)
             self.close(exception=error)
@@ -256,3 +310,58 @@ class Receiver:
             error = EventHubError("Receive failed: {}".format(e))
             self.close(exception=error)
             raise error
+
+    def decode(self, events):
+        """
+        Decode the bodies of a list of received events. Events with the same
+        content type are decoded by their codec in a single batch.
+
+        :param events: The received events.
+        :type events: list[~azure.eventhub.common.EventData]
+        :rtype: list
+        """
+        return codecs.decode_events(events, codec=self.codec)
+
+    def _update_runtime_info(self, message):
+        """
+        Update the partition runtime information from the delivery annotations
+        of a received message. The service includes these annotations when the
+        receiver link was opened with runtime metrics enabled.
+        Keys in the runtime info dictionary include:
+            -'last_enqueued_sequence_number'
+            -'last_enqueued_offset'
+            -'last_enqueued_time'
+            -'retrieval_time'
+
+        Times are in UTC.
+
+        :param message: The most recently received message.
+        :type message: ~uamqp.message.Message
+        """
+        annotations = message.delivery_annotations
+        if not annotations or b"last_enqueued_sequence_number" not in annotations:
+            return
+        offset = annotations.get(b"last_enqueued_offset")
+        enqueued_time = annotations.get(b"last_enqueued_time_utc")
+        retrieval_time = annotations.get(b"runtime_info_retrieval_time_utc")
+        self.runtime_info = {
+            'last_enqueued_sequence_number': annotations[b"last_enqueued_sequence_number"],
+            'last_enqueued_offset': offset.decode('utf-8') if isinstance(offset, bytes) else offset,
+            'last_enqueued_time': _from_timestamp(enqueued_time),
+            'retrieval_time': _from_timestamp(retrieval_time)}
+
+    def _record_received(self, message_batch):
+        """
+        Report the number and size of a received batch of messages, and the
+        current size of the prefetch queue, to the metrics hook.
+
+        :param message_batch: The received messages.
+        :type message_batch: list[~uamqp.message.Message]
+        """
+        try:
+            size = sum(metrics._message_size(m) for m in message_batch)  # pylint: disable=protected-access
+            self.metrics.increment(metrics.EVENTS_RECEIVED, len(message_batch), tags=self._metric_tags)
+            self.metrics.increment(metrics.BYTES_RECEIVED, size, tags=self._metric_tags)
+            self.metrics.gauge(metrics.QUEUE_SIZE, self.queue_size, tags=self._metric_tags)
+        except Exception as e:  # pylint: disable=broad-except
+            log.warning("%r: Failed to record receive metrics: %r", self.name, e)
@@ -4,12 +4,14 @@
 # --------------------------------------------------------------------------------------------
 
 import uuid
+import time
 import logging
 
 from uamqp import constants, errors
-from uamqp import SendClient
+from uamqp import SendClient, BatchMessage
 
-from azure.eventhub.common import EventHubError, _error_handler
+from azure.eventhub import metrics, codecs, compression as compressors
+from azure.eventhub.common import EventHubError, RetryPolicy, _EventHubErrorPolicy
 
 log = logging.getLogger(__name__)
 
@@ -19,7 +21,9 @@ class Sender:
     Implements a Sender.
     """
 
-    def __init__(self, client, target, partition=None, send_timeout=60, keep_alive=None, auto_reconnect=True):
+    def __init__(
+            self, client, target, partition=None, send_timeout=60,
+            keep_alive=None, auto_reconnect=True, retry_policy=None, codec=None, compression=None):
         """
         Instantiate an EventHub event Sender handler.
 
@@ -39,6 +43,16 @@ class Sender:
         :param auto_reconnect: Whether to automatically reconnect the sender if a retryable error occurs.
          Default value is `True`.
         :type auto_reconnect: bool
+        :param retry_policy: The policy used to retry failed sends and reconnects. Default is a
+         RetryPolicy with 3 retries.
+        :type retry_policy: ~azure.eventhub.common.RetryPolicy
+        :param codec: The codec with which `encode` encodes values. Default is a JsonCodec.
+        :type codec: ~azure.eventhub.codecs.Codec
+        :param compression: Compress the body of each event, or each message of a batched event,
+         before it is sent. Either a Compressor or the name of a content encoding: 'deflate', or 'lz4' or
+         'zstd' if the package is installed. Receivers decompress the events transparently.
+         Default is `None`, i.e. no compression.
+        :type compression: str or ~azure.eventhub.compression.Compressor
         """
         self.running = False
         self.client = client
@@ -49,17 +63,25 @@ class Sender:
         self.error = None
         self.keep_alive = keep_alive
         self.auto_reconnect = auto_reconnect
-        self.retry_policy = errors.ErrorPolicy(max_retries=3, on_error=_error_handler)
+        self.retry_policy = retry_policy or RetryPolicy(max_retries=3)
+        self.error_policy = _EventHubErrorPolicy(max_retries=self.retry_policy.max_retries)
         self.name = "EHSender-{}".format(uuid.uuid4())
+        self.codec = codec or codecs.JsonCodec()
+        if isinstance(compression, str):
+            compression = compressors.get_compressor(compression)
+        self.compression = compression
+        self.metrics = self.client.metrics
+        self._metric_tags = {"eventhub": self.client.eh_name}
         if partition:
             self.target += "/Partitions/" + partition
             self.name += "-partition{}".format(partition)
+            self._metric_tags["partition"] = partition
         self._handler = SendClient(
             self.target,
             auth=self.client.get_auth(),
             debug=self.client.debug,
             msg_timeout=self.timeout,
-            error_policy=self.retry_policy,
+            error_policy=self.error_policy,
             keep_alive_interval=self.keep_alive,
             client_name=self.name,
             properties=self.client.create_properties())
@@ -83,7 +105,7 @@ class Sender:
                 auth=self.client.get_auth(),
                 debug=self.client.debug,
                 msg_timeout=self.timeout,
-                error_policy=self.retry_policy,
+                error_policy=self.error_policy,
                 keep_alive_interval=self.keep_alive,
                 client_name=self.name,
                 properties=self.client.create_properties())
@@ -91,43 +113,58 @@ class Sender:
         while not self.has_started():
             self._handler._connection.work()  # pylint: disable=protected-access
 
-    def reconnect(self):
+    def reconnect(self, error=None):
         """If the Sender was disconnected from the service with
-        a retryable error - attempt to reconnect."""
+        a retryable error - attempt to reconnect. Attempts are spaced
+        out and limited according to the retry policy.
+
+        :param error: The error that disconnected the Sender.
+        :type error: Exception
+        """
         # pylint: disable=protected-access
-        self._handler.close()
         unsent_events = self._handler.pending_messages
-        self._handler = SendClient(
-            self.target,
-            auth=self.client.get_auth(),
-            debug=self.client.debug,
-            msg_timeout=self.timeout,
-            error_policy=self.retry_policy,
-            keep_alive_interval=self.keep_alive,
-            client_name=self.name,
-            properties=self.client.create_properties())
-        try:
-            self._handler.open()
-            self._handler.queue_message(*unsent_events)
-            self._handler.wait()
-        except (errors.LinkDetach, errors.ConnectionClose) as shutdown:
-            if shutdown.action.retry and self.auto_reconnect:
-                self.reconnect()
-            else:
-                error = EventHubError(str(shutdown), shutdown)
+        started = time.time()
+        retry_count = 0
+        while True:
+            backoff = self.retry_policy.next_backoff(retry_count, error, started)
+            if backoff is None:
+                error = EventHubError(str(error), error)
                 self.close(exception=error)
                 raise error
-        except errors.MessageHandlerError as shutdown:
-            if self.auto_reconnect:
-                self.reconnect()
-            else:
-                error = EventHubError(str(shutdown), shutdown)
+            log.info("%r: Reconnecting in %r seconds.", self.name, backoff)
+            time.sleep(backoff)
+            retry_count += 1
+            if self.metrics:
+                self.metrics.increment(metrics.RECONNECTS, tags=self._metric_tags)
+            self._handler.close()
+            self._handler = SendClient(
+                self.target,
+                auth=self.client.get_auth(),
+                debug=self.client.debug,
+                msg_timeout=self.timeout,
+                error_policy=self.error_policy,
+                keep_alive_interval=self.keep_alive,
+                client_name=self.name,
+                properties=self.client.create_properties())
+            requeued = False
+            try:
+                self._handler.open()
+                self._handler.queue_message(*unsent_events)
+                requeued = True
+                self._handler.wait()
+                return
+            except (errors.LinkDetach, errors.ConnectionClose, errors.MessageHandlerError) as shutdown:
+                if not self.auto_reconnect:
+                    error = EventHubError(str(shutdown), shutdown)
+                    self.close(exception=error)
+                    raise error
+                if requeued:
+                    unsent_events = self._handler.pending_messages
+                error = shutdown
+            except Exception as e:
+                error = EventHubError("Sender Reconnect failed: {}".format(e))
                 self.close(exception=error)
                 raise error
-        except Exception as e:
-            error = EventHubError("Sender Reconnect failed: {}".format(e))
-            self.close(exception=error)
-            raise error
 
     def get_handler_state(self):
         """
@@ -201,7 +238,9 @@ class Sender:
             raise ValueError("Unable to send until client has been started.")
         if event_data.partition_key and self.partition:
             raise ValueError("EventData partition key cannot be used with a partition sender.")
-        event_data.message.on_send_complete = self._on_outcome
+        if self.compression:
+            compressors.compress_event(event_data, self.compression)
+        event_data.message.on_send_complete = self._measure(event_data, self._on_outcome)
         try:
             self._handler.send_message(event_data.message)
             if self._outcome != constants.MessageSendResult.Ok:
@@ -212,14 +251,14 @@ class Sender:
             raise error
         except (errors.LinkDetach, errors.ConnectionClose) as shutdown:
             if shutdown.action.retry and self.auto_reconnect:
-                self.reconnect()
+                self.reconnect(shutdown)
             else:
                 error = EventHubError(str(shutdown), shutdown)
                 self.close(exception=error)
                 raise error
         except errors.MessageHandlerError as shutdown:
             if self.auto_reconnect:
-                self.reconnect()
+                self.reconnect(shutdown)
             else:
                 error = EventHubError(str(shutdown), shutdown)
                 self.close(exception=error)
@@ -247,9 +286,14 @@ class Sender:
             raise ValueError("Unable to send until client has been started.")
         if event_data.partition_key and self.partition:
             raise ValueError("EventData partition key cannot be used with a partition sender.")
+        if self.compression:
+            compressors.compress_event(event_data, self.compression)
         if callback:
-            event_data.message.on_send_complete = lambda o, c: callback(o, Sender._error(o, c))
-        self._handler.queue_message(event_data.message)
+            event_data.message.on_send_complete = self._measure(
+                event_data, lambda o, c: callback(o, Sender._error(o, c)))
+        elif self.metrics:
+            event_data.message.on_send_complete = self._measure(event_data, None)
+        self._queue_message(event_data.message)
 
     def wait(self):
         """
@@ -263,14 +307,14 @@ class Sender:
             self._handler.wait()
         except (errors.LinkDetach, errors.ConnectionClose) as shutdown:
             if shutdown.action.retry and self.auto_reconnect:
-                self.reconnect()
+                self.reconnect(shutdown)
             else:
                 error = EventHubError(str(shutdown), shutdown)
                 self.close(exception=error)
                 raise error
         except errors.MessageHandlerError as shutdown:
             if self.auto_reconnect:
-                self.reconnect()
+                self.reconnect(shutdown)
             else:
                 error = EventHubError(str(shutdown), shutdown)
                 self.close(exception=error)
@@ -278,6 +322,45 @@ class Sender:
         except Exception as e:
             raise EventHubError("Send failed: {}".format(e))
 
+    def encode(self, values):
+        """
+        Encode a list of values with the sender's codec into a single batched
+        event, each message of which has the content type of the codec.
+
+        :param values: The values to encode.
+        :type values: list
+        :rtype: ~azure.eventhub.common.EventData
+        """
+        return codecs.encode_batch(values, self.codec)
+
+    def _queue_message(self, message):
+        """
+        Add a message to the send queue of the handler.
+
+        :param message: The message to send.
+        :type message: ~uamqp.message.Message
+        """
+        self._handler.queue_message(*self._gather(message))
+
+    @staticmethod
+    def _gather(message):
+        """
+        Gather the messages that a message is sent as. A batch larger than the maximum
+        message size is split into several messages, the outcomes of which are joined
+        so that its send completion callback runs once, when every part has settled,
+        with the first failure if any part failed.
+
+        :param message: The message to send.
+        :type message: ~uamqp.message.Message
+        :rtype: list[~uamqp.message.Message]
+        """
+        messages = list(message.gather())
+        if len(messages) > 1 and message.on_send_complete:
+            on_send_complete = _join_outcomes(len(messages), message.on_send_complete)
+            for part in messages:
+                part.on_send_complete = on_send_complete
+        return messages
+
     def _on_outcome(self, outcome, condition):
         """
         Called when the outcome is received for a delivery.
@@ -288,6 +371,88 @@ class Sender:
         self._outcome = outcome
         self._condition = condition
 
+    def _measure(self, event_data, on_send_complete):
+        """
+        Wrap the send completion callback of an event to report its size, outcome
+        and latency to the metrics hook. If no metrics hook is configured the
+        callback is returned unchanged.
+
+        :param event_data: The event being sent.
+        :type event_data: ~azure.eventhub.common.EventData
+        :param on_send_complete: The callback to run once the send has completed.
+        :type on_send_complete: callable[~uamqp.constants.MessageSendResult, Exception]
+        """
+        if not self.metrics:
+            return on_send_complete
+        measurement = _SendMeasurement(self.metrics, self._metric_tags, event_data)
+
+        def measured(outcome, condition):
+            try:
+                measurement.complete(outcome)
+            except Exception as e:  # pylint: disable=broad-except
+                log.warning("%r: Failed to record send metrics: %r", self.name, e)
+            if on_send_complete:
+                on_send_complete(outcome, condition)
+        return measured
+
     @staticmethod
     def _error(outcome, condition):
         return None if outcome == constants.MessageSendResult.Ok else EventHubError(outcome, condition)
+
+
+def _join_outcomes(count, on_send_complete):
+    """
+    Wrap a send completion callback to run once the given number of messages have
+    settled, with the outcome and condition of the first that failed, if any.
+    """
+    pending = count
+    failure = None
+
+    def settled(outcome, condition):
+        nonlocal pending, failure
+        pending -= 1
+        if outcome != constants.MessageSendResult.Ok and not failure:
+            failure = (outcome, condition)
+        if pending == 0:
+            on_send_complete(*(failure or (outcome, condition)))
+    return settled
+
+
+class _SendMeasurement(object):
+    """
+    Tracks the number of events and bytes in an outgoing message, and the time
+    since it was queued, in order to report them once the send has completed.
+    A batched message is counted as its body generator is consumed.
+    """
+
+    def __init__(self, hook, tags, event_data):
+        self.hook = hook
+        self.tags = tags
+        self.started = time.time()
+        self.completed = False
+        if isinstance(event_data.message, BatchMessage):
+            self.events = 0
+            self.size = 0
+            event_data._map_batch(self._count)  # pylint: disable=protected-access
+        else:
+            self.events = 1
+            self.size = metrics._message_size(event_data.message)  # pylint: disable=protected-access
+
+    def _count(self, item):
+        self.events += 1
+        self.size += metrics._data_size(item)  # pylint: disable=protected-access
+        return item
+
+    def complete(self, outcome):
+        # A batch larger than the maximum message size is split into several
+        # messages. Their outcomes are joined when the batch is transferred, but
+        # each completes when it is sent with `send` - only the first is reported.
+        if self.completed:
+            return
+        self.completed = True
+        self.hook.observe(metrics.SEND_LATENCY, time.time() - self.started, tags=self.tags)
+        if outcome == constants.MessageSendResult.Ok:
+            self.hook.increment(metrics.EVENTS_SENT, self.events, tags=self.tags)
+            self.hook.increment(metrics.BYTES_SENT, self.size, tags=self.tags)
+        else:
+            self.hook.increment(metrics.SEND_FAILURES, self.events, tags=self.tags)
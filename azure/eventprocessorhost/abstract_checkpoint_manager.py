@@ -65,6 +65,17 @@ class AbstractCheckpointManager(ABC):
         """
         pass
 
+    async def flush_checkpoints_async(self):
+        """
+        Write any checkpoints that have been updated but not yet stored. This is called
+        when the host stops. Checkpoint managers that store each checkpoint as it is
+        updated need not override it.
+
+        :return: `True` if the checkpoints were written successfully, `False` if not.
+        :rtype: bool
+        """
+        return True
+
     @abstractmethod
     async def delete_checkpoint_async(self, partition_id):
         """
@@ -142,3 +142,26 @@ class AbstractLeaseManager(ABC):
         :rtype: bool
         """
         pass
+
+    async def get_stored_partition_ids_async(self):
+        """
+        Return the partition IDs of the Event Hub persisted in the lease store by
+        store_partition_ids_async(), along with the time at which they were stored.
+        Optional - the default implementation stores nothing and returns `None`, in which
+        case the partition IDs are always retrieved from the Event Hub.
+
+        :return: A tuple of the partition IDs and the time (seconds since the epoch) that
+         they were stored, or `None`.
+        :rtype: tuple[list[str], float]
+        """
+        return None
+
+    async def store_partition_ids_async(self, partition_ids):
+        """
+        Persist the partition IDs of the Event Hub in the lease store so that they can be
+        shared with other hosts. Optional - the default implementation does nothing.
+
+        :param partition_ids: The partition IDs of the Event Hub.
+        :type partition_ids: list[str]
+        """
+        pass
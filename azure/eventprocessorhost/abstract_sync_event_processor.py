@@ -0,0 +1,63 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# -----------------------------------------------------------------------------------
+
+from abc import ABC, abstractmethod
+
+class AbstractSyncEventProcessor(ABC):
+    """
+    Abstract that must be extended by the event processor classes of a
+    ThreadedEventProcessorHost. The methods are called on the worker thread
+    running the pump of the partition.
+    """
+    def __init__(self, params=None):
+        pass
+
+    @abstractmethod
+    def open(self, context):
+        """
+        Called by processor host to initialize the event processor.
+
+        :param context: Information about the partition
+        :type context: ~azure.eventprocessorhost.threaded_eph.SyncPartitionContext
+        """
+        pass
+
+    @abstractmethod
+    def close(self, context, reason):
+        """
+        Called by processor host to indicate that the event processor is being stopped.
+
+        :param context: Information about the partition
+        :type context: ~azure.eventprocessorhost.threaded_eph.SyncPartitionContext
+        :param reason: The reason for closing.
+        :type reason: str
+        """
+        pass
+
+    @abstractmethod
+    def process_events(self, context, messages):
+        """
+        Called by the processor host when a batch of events has arrived.
+        This is where the real work of the event processor is done.
+
+        :param context: Information about the partition
+        :type context: ~azure.eventprocessorhost.threaded_eph.SyncPartitionContext
+        :param messages: The events to be processed.
+        :type messages: list[~azure.eventhub.common.EventData]
+        """
+        pass
+
+    @abstractmethod
+    def process_error(self, context, error):
+        """
+        Called when the underlying client experiences an error while receiving.
+        EventProcessorHost will take care of recovering from the error and
+        continuing to pump messages.
+
+        :param context: Information about the partition
+        :type context: ~azure.eventprocessorhost.threaded_eph.SyncPartitionContext
+        :param error: The error that occured.
+        """
+        pass
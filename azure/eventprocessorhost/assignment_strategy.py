@@ -0,0 +1,156 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# -----------------------------------------------------------------------------------
+
+import time
+import hashlib
+import threading
+
+
+class AssignmentStrategy:
+    """
+    Decides which leases a host steals from other hosts to balance the partitions.
+    Each lease has a weight, and a host steals leases until it holds its share of the
+    total weight of the partitions. Leases are taken from whichever host currently
+    holds the most weight, in order of preference, and only while the other host is
+    left with at least as much weight as this one, so that it will not steal the lease
+    back. With the default weight of 1 for every lease, this gives every host either
+    floor(L/H) or ceil(L/H) of L leases between H hosts.
+    """
+
+    def weight(self, lease):  # pylint: disable=no-self-use,unused-argument
+        """
+        The weight of a lease. Default is 1 for every lease.
+
+        :param lease: The lease.
+        :type lease: ~azure.eventprocessorhost.lease.Lease
+        :rtype: float
+        """
+        return 1
+
+    def preference(self, host_name, lease):  # pylint: disable=no-self-use,unused-argument
+        """
+        How much the host prefers to steal a lease over the other leases of the same owner.
+        Leases with a higher preference are stolen first, and leases with the same preference
+        in the order they were listed. Default is 0 for every lease.
+
+        :param host_name: The name of the host stealing leases.
+        :type host_name: str
+        :param lease: The lease.
+        :type lease: ~azure.eventprocessorhost.lease.Lease
+        :rtype: float
+        """
+        return 0
+
+    def update(self, host_name, leases):
+        """
+        Called with all the leases after each lease scan of the host, before any are stolen.
+
+        :param host_name: The name of the host.
+        :type host_name: str
+        :param leases: The leases of all the partitions.
+        :type leases: list[~azure.eventprocessorhost.lease.Lease]
+        """
+        pass
+
+    def leases_to_steal(self, host_name, stealable_leases, have_weight):
+        """
+        Determines which leases to steal in order to reach this host's share of the
+        partitions in a single pass.
+
+        :param host_name: The name of the host stealing leases.
+        :type host_name: str
+        :param stealable_leases: The leases owned by other hosts.
+        :type stealable_leases: list[~azure.eventprocessorhost.lease.Lease]
+        :param have_weight: The total weight of the leases this host owns.
+        :type have_weight: float
+        :rtype: list[~azure.eventprocessorhost.lease.Lease]
+        """
+        leases_by_owner = {}
+        for lease in stealable_leases:
+            leases_by_owner.setdefault(lease.owner, []).append(lease)
+        host_count = len([o for o in leases_by_owner if o and o != host_name]) + 1
+        owner_weights = {o: sum(self.weight(l) for l in leases) for o, leases in leases_by_owner.items()}
+        target_weight = (sum(owner_weights.values()) + have_weight) / host_count
+
+        steal_these_leases = []
+        while have_weight < target_weight and leases_by_owner:
+            biggest_owner = max(owner_weights, key=lambda o: owner_weights[o])
+            candidates = sorted(leases_by_owner[biggest_owner], key=lambda l: -self.preference(host_name, l))
+            for lease in candidates:
+                weight = self.weight(lease)
+                if owner_weights[biggest_owner] - weight >= have_weight + weight:
+                    break
+            else:
+                break
+            leases_by_owner[biggest_owner].remove(lease)
+            owner_weights[biggest_owner] -= weight
+            have_weight += weight
+            steal_these_leases.append(lease)
+        return steal_these_leases
+
+
+class StickyAssignment(AssignmentStrategy):
+    """
+    Prefers to steal the leases of the partitions the host has owned most recently,
+    so that partitions return to the host that may still hold state for them.
+
+    :param history_duration: The time in seconds for which the host remembers owning
+     a partition. Default is 600.
+    :type history_duration: float
+    """
+
+    def __init__(self, history_duration=600):
+        self.history_duration = history_duration
+        self._owned = {}
+        self._lock = threading.Lock()
+
+    def update(self, host_name, leases):
+        now = time.time()
+        with self._lock:
+            for lease in leases:
+                if lease.owner == host_name:
+                    self._owned[(host_name, lease.partition_id)] = now
+
+    def preference(self, host_name, lease):
+        with self._lock:
+            owned = self._owned.get((host_name, lease.partition_id))
+        if owned is None or time.time() - owned > self.history_duration:
+            return 0
+        return owned
+
+
+class RendezvousAssignment(AssignmentStrategy):
+    """
+    Prefers to steal the leases of the partitions whose rendezvous hash with the name of
+    the host is highest, so that each partition tends to be assigned to the same host for
+    as long as the set of hosts is unchanged. Set the `host_name` of each host to a stable
+    name, as by default it is unique to each EventProcessorHost.
+    """
+
+    def preference(self, host_name, lease):
+        key = "{}:{}".format(host_name, lease.partition_id).encode('utf-8')
+        return int(hashlib.md5(key).hexdigest()[:16], 16)
+
+
+class WeightedAssignment(AssignmentStrategy):
+    """
+    Balances the partitions by weight, such as the throughput of each partition, rather
+    than by count. The heaviest leases that can be stolen without leaving their owner with
+    less weight than this host are stolen first.
+
+    :param weights: A function returning the weight of a partition from its ID, or `None`
+     if it is not known, in which case the weight is 1.
+    :type weights: callable[str, float]
+    """
+
+    def __init__(self, weights):
+        self.weights = weights
+
+    def weight(self, lease):
+        weight = self.weights(lease.partition_id)
+        return 1 if weight is None else weight
+
+    def preference(self, host_name, lease):
+        return self.weight(lease)
@@ -5,8 +5,10 @@
 
 import re
 import json
+import time
 import uuid
 import logging
+import threading
 import concurrent.futures
 import functools
 import asyncio
@@ -14,6 +16,8 @@ import asyncio
 import requests
 
 from azure.storage.blob import BlockBlobService
+from azure.storage.retry import ExponentialRetry
+from azure.eventhub import metrics
 from azure.eventprocessorhost.azure_blob_lease import AzureBlobLease
 from azure.eventprocessorhost.checkpoint import Checkpoint
 from azure.eventprocessorhost.abstract_lease_manager import AbstractLeaseManager
@@ -23,12 +27,57 @@ from azure.eventprocessorhost.abstract_checkpoint_manager import AbstractCheckpo
 _logger = logging.getLogger(__name__)
 
 
+class _StorageRetry(ExponentialRetry):
+    """
+    Applies the host's retry policy to the requests made by the storage client,
+    while keeping the storage SDK's decision of which responses are retryable.
+    """
+
+    def __init__(self, retry_policy):
+        super(_StorageRetry, self).__init__(max_attempts=retry_policy.max_retries)
+        self.retry_policy = retry_policy
+
+    def _backoff(self, context):
+        return self.retry_policy.get_backoff(context.count - 1)
+
+
+def _timed_lease_operation(operation):
+    """
+    Report the duration of a lease operation to the metrics hook of the host,
+    tagged with the name of the operation.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def timed(self, lease):
+            started = time.time()
+            try:
+                return await func(self, lease)
+            finally:
+                if self.host.eph_options.metrics:
+                    tags = self._metric_tags(lease.partition_id)  # pylint: disable=protected-access
+                    tags["operation"] = operation
+                    self.host.eph_options.metrics.observe(metrics.LEASE_LATENCY, time.time() - started, tags=tags)
+        return timed
+    return decorator
+
+
 class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeaseManager):
     """
     Manages checkpoints and lease with azure storage blobs. In this implementation,
     checkpoints are data that's actually in the lease blob, so checkpoint operations
     turn into lease operations under the covers.
 
+    If a checkpoint flush interval is set, checkpoints are instead written together:
+    the checkpoints of all the partitions of a host are stored in a single blob for
+    that host, which is written at most once per interval whatever the number of
+    partitions checkpointed. Updating a checkpoint returns as soon as it is buffered,
+    and pending checkpoints are flushed when a lease is released and when the host
+    stops. The checkpoint blobs of all hosts are read once per lease scan, when blobs
+    whose checkpoints have all been superseded are also deleted. Reading a checkpoint
+    merges the lease blob of the partition with the checkpoints read during the last
+    scan, taking the checkpoint with the highest sequence number. Checkpoints are still
+    written to the lease blob when a lease is released.
+
     :param str storage_account_name: The storage account name. This is used to
      authenticate requests signed with an account key and to construct the storage
      endpoint. It is required unless a connection string is given.
@@ -49,11 +98,16 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
     :param str connection_string: If specified, this will override all other endpoint parameters.
      See http://azure.microsoft.com/en-us/documentation/articles/storage-configure-connection-string/
      for the connection string format.
+    :param float checkpoint_flush_interval: If specified, the checkpoints of a host are
+     written together to one blob per host, at most once per this interval in seconds.
+     Updating a checkpoint does not wait for the next flush. Default value is None - i.e.
+     each checkpoint is written to the lease blob of its partition.
     """
 
     def __init__(self, storage_account_name=None, storage_account_key=None, lease_container_name="eph-leases",
                  storage_blob_prefix=None, lease_renew_interval=10, lease_duration=30,
-                 sas_token=None, endpoint_suffix="core.windows.net", connection_string=None):
+                 sas_token=None, endpoint_suffix="core.windows.net", connection_string=None,
+                 checkpoint_flush_interval=None):
         AbstractCheckpointManager.__init__(self)
         AbstractLeaseManager.__init__(self, lease_renew_interval, lease_duration)
         self.storage_account_name = storage_account_name
@@ -67,6 +121,16 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
         self.consumer_group_directory = None
         self.host = None
         self.storage_max_execution_time = 120
+        self.partition_ids_blob_name = "partition_ids"
+        self.checkpoint_blob_prefix = "checkpoints-"
+        self.checkpoint_flush_interval = checkpoint_flush_interval
+        self._host_checkpoints = {}
+        self._pending_checkpoints = {}
+        self._stored_checkpoints = None
+        self._flush_future = None
+        # Checkpoints may be updated from the loops of several threads.
+        self._checkpoint_lock = threading.Lock()
+        self._write_lock = threading.Lock()
         self.request_session = requests.Session()
         self.request_session.mount('https://', requests.adapters.HTTPAdapter(pool_connections=100, pool_maxsize=100))
         self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=32)
@@ -97,8 +161,12 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
                                                endpoint_suffix=self.endpoint_suffix,
                                                connection_string=self.connection_string,
                                                request_session=self.request_session)
+        self.storage_client.retry = _StorageRetry(self.host.eph_options.retry_policy).retry
         self.consumer_group_directory = self.storage_blob_prefix + self.host.eh_config.consumer_group
 
+    def _metric_tags(self, partition_id):
+        return {"eventhub": self.host.eh_config.eh_name, "partition": partition_id}
+
     # Checkpoint Managment Methods
 
     async def create_checkpoint_store_if_not_exists_async(self):
@@ -121,12 +189,23 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
         :return: Given partition checkpoint info, or `None` if none has been previously stored.
         :rtype: ~azure.eventprocessorhost.checkpoint.Checkpoint
         """
+        if self.checkpoint_flush_interval is not None:
+            # Checkpoints written by this host are the latest while it owns the partition.
+            local = self._pending_checkpoints.get(partition_id) or self._host_checkpoints.get(partition_id)
+            if local:
+                return local
         lease = await self.get_lease_async(partition_id)
         checkpoint = None
         if lease:
             if lease.offset:
                 checkpoint = Checkpoint(partition_id, lease.offset,
                                         lease.sequence_number)
+        if self.checkpoint_flush_interval is not None:
+            if self._stored_checkpoints is None:
+                await self._read_host_checkpoints_async()
+            stored = self._stored_checkpoints.get(partition_id)
+            if stored and (not checkpoint or stored.sequence_number > checkpoint.sequence_number):
+                checkpoint = stored
         return checkpoint
 
     async def create_checkpoint_if_not_exists_async(self, partition_id):
@@ -155,11 +234,155 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
         :param checkpoint: The checkpoint to update the lease with.
         :type checkpoint: ~azure.eventprocessorhost.checkpoint.Checkpoint
         """
-        new_lease = AzureBlobLease()
-        new_lease.with_source(lease)
-        new_lease.offset = checkpoint.offset
-        new_lease.sequence_number = checkpoint.sequence_number
-        return await self.update_lease_async(new_lease)
+        started = time.time()
+        if self.checkpoint_flush_interval is None:
+            new_lease = AzureBlobLease()
+            new_lease.with_source(lease)
+            new_lease.offset = checkpoint.offset
+            new_lease.sequence_number = checkpoint.sequence_number
+            updated = await self.update_lease_async(new_lease)
+        elif lease is None or not lease.token:
+            updated = False
+        else:
+            with self._checkpoint_lock:
+                self._pending_checkpoints[lease.partition_id] = checkpoint
+                if not self._flush_future:
+                    # The timer runs on the loop of the host, as the loop of the pump
+                    # that checkpoints first may be stopped before it fires.
+                    self._flush_future = asyncio.run_coroutine_threadsafe(
+                        self._flush_checkpoints_async(), self.host.loop)
+            updated = True
+        if self.host.eph_options.metrics:
+            self.host.eph_options.metrics.observe(
+                metrics.CHECKPOINT_LATENCY, time.time() - started, tags=self._metric_tags(lease.partition_id))
+        return updated
+
+    def _host_checkpoint_blob_name(self):
+        return self.checkpoint_blob_prefix + self.host.host_name
+
+    async def _flush_checkpoints_async(self):
+        """
+        Write the checkpoints of all the partitions of this host to its checkpoint
+        blob once the flush interval has passed.
+        """
+        await asyncio.sleep(self.checkpoint_flush_interval)
+        with self._checkpoint_lock:
+            # Checkpoints updated from here on are written by the next flush.
+            self._flush_future = None
+        await self.flush_checkpoints_async()
+
+    async def flush_checkpoints_async(self):
+        """
+        Write the pending checkpoints of this host to its checkpoint blob now, rather
+        than at the end of the flush interval. If the write fails the checkpoints are
+        kept to be written by the next flush.
+
+        :return: `True` if the checkpoints were written successfully or none were
+         pending, `False` if not.
+        :rtype: bool
+        """
+        with self._checkpoint_lock:
+            pending, self._pending_checkpoints = self._pending_checkpoints, {}
+            if self._flush_future:
+                # Checkpoints updated from here on start a new interval.
+                self._flush_future.cancel()
+                self._flush_future = None
+        if not pending:
+            return True
+        try:
+            await asyncio.get_event_loop().run_in_executor(
+                self.executor,
+                functools.partial(self._write_host_checkpoints, pending))
+        except Exception as err:  # pylint: disable=broad-except
+            _logger.error("Failed to flush checkpoints %r %r", self.host.guid, err)
+            with self._checkpoint_lock:
+                for partition_id, checkpoint in pending.items():
+                    self._pending_checkpoints.setdefault(partition_id, checkpoint)
+            return False
+        return True
+
+    def _write_host_checkpoints(self, pending):
+        # Flushes are written one at a time so that an older one cannot overwrite a newer one.
+        with self._write_lock:
+            checkpoints = dict(self._host_checkpoints)
+            checkpoints.update(pending)
+            content = json.dumps({
+                "owner": self.host.host_name,
+                "updated": time.time(),
+                "checkpoints": {p: {"offset": c.offset, "sequence_number": c.sequence_number}
+                                for p, c in checkpoints.items()}})
+            self.storage_client.create_blob_from_text(
+                self.lease_container_name,
+                self._host_checkpoint_blob_name(),
+                content)
+            self._host_checkpoints.update(pending)
+
+    async def _read_host_checkpoints_async(self):
+        """
+        Read the checkpoint blobs of all hosts and keep the latest checkpoint of each
+        partition, to be merged with the lease blobs by get_checkpoint_async().
+
+        :return: The contents of the checkpoint blobs, by blob name.
+        :rtype: dict
+        """
+        loop = asyncio.get_event_loop()
+        stored = {}
+        try:
+            blobs = await loop.run_in_executor(
+                self.executor,
+                functools.partial(
+                    self.storage_client.list_blobs,
+                    self.lease_container_name,
+                    prefix=self.checkpoint_blob_prefix))
+            for name in [b.name for b in blobs]:
+                blob = await loop.run_in_executor(
+                    self.executor,
+                    functools.partial(
+                        self.storage_client.get_blob_to_text,
+                        self.lease_container_name, name))
+                stored[name] = json.loads(blob.content)
+        except Exception as err:  # pylint: disable=broad-except
+            _logger.error("Failed to get host checkpoints %r", err)
+            raise err
+
+        latest = {}
+        for content in stored.values():
+            for partition_id, checkpoint in content["checkpoints"].items():
+                current = latest.get(partition_id)
+                if not current or checkpoint["sequence_number"] > current.sequence_number:
+                    latest[partition_id] = Checkpoint(
+                        partition_id, checkpoint["offset"], checkpoint["sequence_number"])
+        self._stored_checkpoints = latest
+        return stored
+
+    async def _delete_superseded_checkpoints_async(self, stored):
+        """
+        Delete the checkpoint blobs left by other hosts whose checkpoints have all been
+        superseded by newer blobs, so that the blobs of previous host generations do not
+        accumulate.
+
+        :param stored: The contents of the checkpoint blobs, by blob name.
+        :type stored: dict
+        """
+        loop = asyncio.get_event_loop()
+        for name, content in stored.items():
+            if name == self._host_checkpoint_blob_name():
+                continue
+            superseded = all(
+                any(other["updated"] > content["updated"] and
+                    other["checkpoints"].get(p, {}).get("sequence_number", -1) >= c["sequence_number"]
+                    for other in stored.values())
+                for p, c in content["checkpoints"].items())
+            if superseded:
+                _logger.info("Deleting superseded checkpoints %r", name)
+                try:
+                    await loop.run_in_executor(
+                        self.executor,
+                        functools.partial(
+                            self.storage_client.delete_blob,
+                            self.lease_container_name, name))
+                except Exception as err:  # pylint: disable=broad-except
+                    _logger.warning("Failed to delete checkpoints %r %r", name, err)
 
     async def delete_checkpoint_async(self, partition_id):
         """
@@ -181,7 +404,7 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
         :rtype: bool
         """
         try:
-            await self.host.loop.run_in_executor(
+            await asyncio.get_event_loop().run_in_executor(
                 self.executor,
                 functools.partial(
                     self.storage_client.create_container,
@@ -213,7 +436,7 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
         :rtype: ~azure.eventprocessorhost.lease.Lease
         """
         try:
-            blob = await self.host.loop.run_in_executor(
+            blob = await asyncio.get_event_loop().run_in_executor(
                 self.executor,
                 functools.partial(
                     self.storage_client.get_blob_to_text,
@@ -241,6 +464,47 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
         except Exception as err:  # pylint: disable=broad-except
             _logger.error("Failed to get lease %r %r", err, partition_id)
 
+    async def get_stored_partition_ids_async(self):
+        """
+        Return the partition IDs of the Event Hub persisted in the lease container by
+        store_partition_ids_async(), along with the time at which they were stored.
+
+        :return: A tuple of the partition IDs and the time (seconds since the epoch) that
+         they were stored, or `None` if they have not been stored.
+        :rtype: tuple[list[str], float]
+        """
+        try:
+            blob = await asyncio.get_event_loop().run_in_executor(
+                self.executor,
+                functools.partial(
+                    self.storage_client.get_blob_to_text,
+                    self.lease_container_name, self.partition_ids_blob_name))
+            stored = json.loads(blob.content)
+            return stored["partition_ids"], stored["updated"]
+        except Exception as err:  # pylint: disable=broad-except
+            _logger.info("No stored partition ids %r", err)
+            return None
+
+    async def store_partition_ids_async(self, partition_ids):
+        """
+        Persist the partition IDs of the Event Hub in the lease container so that they
+        can be shared with other hosts.
+
+        :param partition_ids: The partition IDs of the Event Hub.
+        :type partition_ids: list[str]
+        """
+        content = json.dumps({"partition_ids": partition_ids, "updated": time.time()})
+        try:
+            await asyncio.get_event_loop().run_in_executor(
+                self.executor,
+                functools.partial(
+                    self.storage_client.create_blob_from_text,
+                    self.lease_container_name,
+                    self.partition_ids_blob_name,
+                    content))
+        except Exception as err:  # pylint: disable=broad-except
+            _logger.warning("Failed to store partition ids %r", err)
+
     async def get_all_leases(self):
         """
         Return the lease info for all partitions.
@@ -249,6 +513,14 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
         :return: A list of lease info.
         :rtype: list[~azure.eventprocessorhost.lease.Lease]
         """
+        if self.checkpoint_flush_interval is not None:
+            # The checkpoint blobs are read once per lease scan rather than for each checkpoint.
+            try:
+                stored = await self._read_host_checkpoints_async()
+            except Exception:  # pylint: disable=broad-except
+                pass
+            else:
+                await self._delete_superseded_checkpoints_async(stored)
         lease_futures = []
         partition_ids = await self.host.partition_manager.get_partition_ids_async()
         for partition_id in partition_ids:
@@ -274,7 +546,7 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
                          self.lease_container_name,
                          partition_id,
                          json_lease)
-            await self.host.loop.run_in_executor(
+            await asyncio.get_event_loop().run_in_executor(
                 self.executor,
                 functools.partial(
                     self.storage_client.create_blob_from_text,
@@ -297,7 +569,7 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
         :param lease: The stored lease to be deleted.
         :type lease: ~azure.eventprocessorhost.lease.Lease
         """
-        await self.host.loop.run_in_executor(
+        await asyncio.get_event_loop().run_in_executor(
             self.executor,
             functools.partial(
                 self.storage_client.delete_blob,
@@ -305,6 +577,7 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
                 lease.partition_id,
                 lease_id=lease.token))
 
+    @_timed_lease_operation("acquire")
     async def acquire_lease_async(self, lease):
         """
         Acquire the lease on the desired partition for this EventProcessorHost.
@@ -317,6 +590,7 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
         :rtype: bool
         """
         retval = True
+        stolen = False
         new_lease_id = str(uuid.uuid4())
         partition_id = lease.partition_id
         try:
@@ -337,7 +611,7 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
                     retval = False
                 else:
                     _logger.info("ChangingLease %r %r", self.host.guid, lease.partition_id)
-                    await self.host.loop.run_in_executor(
+                    await asyncio.get_event_loop().run_in_executor(
                         self.executor,
                         functools.partial(
                             self.storage_client.change_blob_lease,
@@ -346,9 +620,10 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
                             lease.token,
                             new_lease_id))
                     lease.token = new_lease_id
+                    stolen = True
             else:
                 _logger.info("AcquiringLease %r %r", self.host.guid, lease.partition_id)
-                lease.token = await self.host.loop.run_in_executor(
+                lease.token = await asyncio.get_event_loop().run_in_executor(
                     self.executor,
                     functools.partial(
                         self.storage_client.acquire_blob_lease,
@@ -358,14 +633,23 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
                         new_lease_id))
             lease.owner = self.host.host_name
             lease.increment_epoch()
+            # Another host may have checkpointed the partition since this host last owned it.
+            with self._checkpoint_lock:
+                self._host_checkpoints.pop(partition_id, None)
+                self._pending_checkpoints.pop(partition_id, None)
             # check if this solves the issue
             retval = await self.update_lease_async(lease)
         except Exception as err:  # pylint: disable=broad-except
             _logger.error("Failed to acquire lease %r %r %r", err, partition_id, lease.token)
             return False
 
+        if retval and self.host.eph_options.metrics:
+            self.host.eph_options.metrics.increment(
+                metrics.LEASES_STOLEN if stolen else metrics.LEASES_ACQUIRED,
+                tags=self._metric_tags(partition_id))
         return retval
 
+    @_timed_lease_operation("renew")
     async def renew_lease_async(self, lease):
         """
         Renew a lease currently held by this host.
@@ -378,7 +662,7 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
         :rtype: bool
         """
         try:
-            await self.host.loop.run_in_executor(
+            await asyncio.get_event_loop().run_in_executor(
                 self.executor,
                 functools.partial(
                     self.storage_client.renew_blob_lease,
@@ -389,12 +673,16 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
         except Exception as err:  # pylint: disable=broad-except
             if "LeaseIdMismatchWithLeaseOperation" in str(err):
                 _logger.info("LeaseLost on partition %r", lease.partition_id)
+                if self.host.eph_options.metrics:
+                    self.host.eph_options.metrics.increment(
+                        metrics.LEASES_LOST, tags=self._metric_tags(lease.partition_id))
             else:
                 _logger.error("Failed to renew lease on partition %r with token %r %r",
                               lease.partition_id, lease.token, err)
             return False
         return True
 
+    @_timed_lease_operation("release")
     async def release_lease_async(self, lease):
         """
         Give up a lease currently held by this host. If the lease has been stolen, or expired,
@@ -410,11 +698,17 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
             _logger.info("Releasing lease %r %r", self.host.guid, lease.partition_id)
             lease_id = lease.token
             released_copy = AzureBlobLease()
-            released_copy.with_lease(lease)
+            released_copy.with_source(lease)
+            if self.checkpoint_flush_interval is not None:
+                await self.flush_checkpoints_async()
+                checkpoint = self._host_checkpoints.get(lease.partition_id)
+                if checkpoint and checkpoint.sequence_number > (released_copy.sequence_number or 0):
+                    released_copy.offset = checkpoint.offset
+                    released_copy.sequence_number = checkpoint.sequence_number
             released_copy.token = None
             released_copy.owner = None
             released_copy.state = None
-            await self.host.loop.run_in_executor(
+            await asyncio.get_event_loop().run_in_executor(
                 self.executor,
                 functools.partial(
                     self.storage_client.create_blob_from_text,
@@ -422,7 +716,7 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
                     lease.partition_id,
                     json.dumps(released_copy.serializable()),
                     lease_id=lease_id))
-            await self.host.loop.run_in_executor(
+            await asyncio.get_event_loop().run_in_executor(
                 self.executor,
                 functools.partial(
                     self.storage_client.release_blob_lease,
@@ -458,7 +752,7 @@ class AzureStorageCheckpointLeaseManager(AbstractCheckpointManager, AbstractLeas
         # First, renew the lease to make sure the update will go through.
         if await self.renew_lease_async(lease):
             try:
-                await self.host.loop.run_in_executor(
+                await asyncio.get_event_loop().run_in_executor(
                     self.executor,
                     functools.partial(
                         self.storage_client.create_blob_from_text,
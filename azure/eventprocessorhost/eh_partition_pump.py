@@ -3,9 +3,10 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # -----------------------------------------------------------------------------------
 
+import time
 import logging
 import asyncio
-from azure.eventhub import Offset, EventHubClientAsync
+from azure.eventhub import Offset, EventHubClientAsync, EventHubError, metrics
 from azure.eventprocessorhost.partition_pump import PartitionPump
 
 
@@ -30,16 +31,23 @@ class EventHubPartitionPump(PartitionPump):
         """
         _opened_ok = False
         _retry_count = 0
-        while (not _opened_ok) and (_retry_count < 5):
+        _started = time.time()
+        retry_policy = self.host.eph_options.retry_policy
+        while not _opened_ok:
             try:
                 await self.open_clients_async()
                 _opened_ok = True
             except Exception as err:  # pylint: disable=broad-except
-                _logger.warning(
-                    "%r,%r PartitionPumpWarning: Failure creating client or receiver, retrying: %r",
-                    self.host.guid, self.partition_context.partition_id, err)
                 last_exception = err
+                backoff = retry_policy.next_backoff(_retry_count, err, _started)
+                if backoff is None:
+                    break
+                _logger.warning(
+                    "%r,%r PartitionPumpWarning: Failure creating client or receiver, retrying in %.1fs: %r",
+                    self.host.guid, self.partition_context.partition_id, backoff, err)
                 _retry_count += 1
+                await self.clean_up_clients_async()
+                await asyncio.sleep(backoff)
 
         if not _opened_ok:
             await self.processor.process_error_async(self.partition_context, last_exception)
@@ -48,7 +56,10 @@ class EventHubPartitionPump(PartitionPump):
         if self.pump_status == "Opening":
             loop = asyncio.get_event_loop()
             self.set_pump_status("Running")
-            await self.eh_client.run_async()
+            if self.host.eph_options.shared_connection:
+                await self.partition_receive_handler.open_async()
+            else:
+                await self.eh_client.run_async()
             self.running = loop.create_task(self.partition_receiver.run())
 
         if self.pump_status in ["OpenFailed", "Errored"]:
@@ -64,27 +75,68 @@ class EventHubPartitionPump(PartitionPump):
         """
         await self.partition_context.get_initial_offset_async()
         # Create event hub client and receive handler and set options
-        self.eh_client = EventHubClientAsync(
-            self.host.eh_config.client_address,
-            debug=self.host.eph_options.debug_trace,
-            http_proxy=self.host.eph_options.http_proxy)
-        self.partition_receive_handler = self.eh_client.add_async_receiver(
-            self.partition_context.consumer_group_name,
-            self.partition_context.partition_id,
-            Offset(self.partition_context.offset),
-            prefetch=self.host.eph_options.prefetch_count,
-            keep_alive=self.host.eph_options.keep_alive_interval,
-            auto_reconnect=self.host.eph_options.auto_reconnect_on_error,
-            loop=self.loop)
+        if self.host.eph_options.shared_connection:
+            self.eh_client = self.host.partition_manager.get_receive_client()
+        else:
+            self.eh_client = EventHubClientAsync(
+                self.host.eh_config.client_address,
+                debug=self.host.eph_options.debug_trace,
+                http_proxy=self.host.eph_options.http_proxy,
+                metrics=self.host.eph_options.metrics)
+        if self.host.eph_options.epoch_receivers:
+            # The lease epoch is incremented each time the lease is acquired, so a host that
+            # steals the lease disconnects the receiver of the previous owner.
+            self.partition_receive_handler = self.eh_client.add_async_epoch_receiver(
+                self.partition_context.consumer_group_name,
+                self.partition_context.partition_id,
+                self.partition_context.lease.epoch,
+                offset=Offset(self.partition_context.offset),
+                prefetch=self.host.eph_options.prefetch_count,
+                keep_alive=self.host.eph_options.keep_alive_interval,
+                auto_reconnect=self.host.eph_options.auto_reconnect_on_error,
+                runtime_metrics=self.host.eph_options.runtime_metrics,
+                retry_policy=self.host.eph_options.retry_policy,
+                loop=self.loop)
+        else:
+            self.partition_receive_handler = self.eh_client.add_async_receiver(
+                self.partition_context.consumer_group_name,
+                self.partition_context.partition_id,
+                Offset(self.partition_context.offset),
+                prefetch=self.host.eph_options.prefetch_count,
+                keep_alive=self.host.eph_options.keep_alive_interval,
+                auto_reconnect=self.host.eph_options.auto_reconnect_on_error,
+                runtime_metrics=self.host.eph_options.runtime_metrics,
+                retry_policy=self.host.eph_options.retry_policy,
+                loop=self.loop)
         self.partition_receiver = PartitionReceiver(self)
 
+    def on_lease_lost(self):
+        """
+        Called when the receiver has been disconnected because another host has stolen the
+        lease and connected with a higher epoch. The pump is closed straight away rather
+        than when the next lease renewal fails. The pumps are managed on the loop of the
+        host, which may be running on another thread than that of the pump.
+        """
+        self.set_pump_status("Errored")
+        self.evicted = True
+        future = asyncio.run_coroutine_threadsafe(
+            self.host.partition_manager.remove_pump_async(self.partition_context.partition_id, "LeaseLost"),
+            self.host.loop)
+        future.add_done_callback(self.host.partition_manager._log_pump_update)  # pylint: disable=protected-access
+
     async def clean_up_clients_async(self):
         """
         Resets the pump swallows all exceptions.
         """
         if self.partition_receiver:
             if self.eh_client:
-                await self.eh_client.stop_async()
+                if self.host.eph_options.shared_connection:
+                    # Only remove this partition's receiver from the shared client.
+                    await self.partition_receive_handler.close_async()
+                    if self.partition_receive_handler in self.eh_client.clients:
+                        self.eh_client.clients.remove(self.partition_receive_handler)
+                else:
+                    await self.eh_client.stop_async()
                 self.partition_receiver = None
                 self.partition_receive_handler = None
                 self.eh_client = None
@@ -115,6 +167,8 @@ class PartitionReceiver:
         self.eh_partition_pump = eh_partition_pump
         self.max_batch_size = self.eh_partition_pump.host.eph_options.max_batch_size
         self.recieve_timeout = self.eh_partition_pump.host.eph_options.receive_timeout
+        self.target_batch_latency = self.eh_partition_pump.host.eph_options.target_batch_latency
+        self.event_latency = None
 
     async def run(self):
         """
@@ -127,6 +181,15 @@ class PartitionReceiver:
                     msgs = await self.eh_partition_pump.partition_receive_handler.receive(
                         max_batch_size=self.max_batch_size,
                         timeout=self.recieve_timeout)
+                except EventHubError as e:
+                    if e.error == "link:stolen":
+                        _logger.info("Receiver disconnected by a receiver with a higher epoch %r %r",
+                                     self.eh_partition_pump.host.guid,
+                                     self.eh_partition_pump.partition_context.partition_id)
+                        self.eh_partition_pump.on_lease_lost()
+                    else:
+                        _logger.info("Error raised while attempting to receive messages: %r", e)
+                        await self.process_error_async(e)
                 except Exception as e:  # pylint: disable=broad-except
                     _logger.info("Error raised while attempting to receive messages: %r", e)
                     await self.process_error_async(e)
@@ -138,7 +201,45 @@ class PartitionReceiver:
                         if self.eh_partition_pump.host.eph_options.release_pump_on_timeout:
                             await self.process_error_async(TimeoutError("No events received"))
                     else:
+                        if self.eh_partition_pump.partition_receive_handler.runtime_info:
+                            self.eh_partition_pump.partition_context.set_runtime_info(
+                                self.eh_partition_pump.partition_receive_handler.runtime_info)
+                        started = time.time()
                         await self.process_events_async(msgs)
+                        if self.target_batch_latency:
+                            self.update_batch_size(len(msgs), time.time() - started)
+
+    def update_batch_size(self, event_count, elapsed):
+        """
+        Adjust the batch size toward the target batch latency, based on the time taken to
+        process the last batch. The processing time per event is smoothed over recent
+        batches. The batch size only grows while batches are full, so that it is not
+        raised while the partition is keeping up. It changes by at most a factor of two
+        at a time, and stays between 1 and the prefetch count.
+
+        :param event_count: The number of events in the batch.
+        :type event_count: int
+        :param elapsed: The time in seconds taken to process the batch.
+        :type elapsed: float
+        """
+        event_latency = elapsed / event_count
+        if self.event_latency is None:
+            self.event_latency = event_latency
+        else:
+            self.event_latency = 0.7 * self.event_latency + 0.3 * event_latency
+        target_size = int(self.target_batch_latency / max(self.event_latency, 1e-6))
+        if target_size > self.max_batch_size and event_count < self.max_batch_size:
+            return
+        target_size = max(self.max_batch_size // 2, min(self.max_batch_size * 2, target_size))
+        batch_size = max(1, min(self.eh_partition_pump.host.eph_options.prefetch_count, target_size))
+        if batch_size != self.max_batch_size:
+            _logger.debug("Batch size changed from %r to %r %r", self.max_batch_size, batch_size,
+                          self.eh_partition_pump.partition_context.partition_id)
+            self.max_batch_size = batch_size
+            hook = self.eh_partition_pump.host.eph_options.metrics
+            if hook:
+                tags = self.eh_partition_pump._metric_tags()  # pylint: disable=protected-access
+                hook.gauge(metrics.BATCH_SIZE, batch_size, tags=tags)
 
     async def process_events_async(self, events):
         """
@@ -5,6 +5,8 @@
 
 import uuid
 import asyncio
+from azure.eventhub import RetryPolicy
+from azure.eventprocessorhost.assignment_strategy import StickyAssignment
 from azure.eventprocessorhost.partition_manager import PartitionManager
 
 
@@ -96,6 +98,89 @@ class EPHOptions:
     :ivar auto_reconnect_on_error: Whether to automatically attempt to reconnect a receiver
      connection if it is detach from the service with a retryable error. Default is True.
     :vartype auto_reconnect_on_error: bool
+    :ivar shared_connection: Whether the receivers of all the partitions owned by the host
+     share a single connection, rather than each partition opening its own connection and
+     authenticating separately. Default is False.
+    :vartype shared_connection: bool
+    :ivar epoch_receivers: Whether partition receivers are opened with the epoch of their
+     lease. When another host steals a lease its receiver disconnects the receiver of the
+     previous owner, which then closes its pump immediately instead of continuing to
+     receive until it next fails to renew the lease. Default is True.
+    :vartype epoch_receivers: bool
+    :ivar runtime_metrics: Whether partition receivers should request the last enqueued
+     sequence number, offset and time of their partition with each delivery. When enabled
+     the partition lag is available on the PartitionContext. Default is False.
+    :vartype runtime_metrics: bool
+    :ivar partition_refresh_interval: The interval in seconds at which the partition IDs of
+     the Event Hub are refreshed, so that partitions added to the Event Hub are picked up
+     without restarting the host. Default is None - i.e. the partition IDs are retrieved once
+     when the host starts.
+    :vartype partition_refresh_interval: int
+    :ivar persist_partition_ids: Whether to store the partition IDs of the Event Hub in the
+     lease container. Hosts that start or refresh within the refresh interval of a stored
+     copy will use it instead of querying the Event Hub. Default is False.
+    :vartype persist_partition_ids: bool
+    :ivar graceful_shutdown: Whether to hand partitions over to other hosts when this host
+     is closed. Each partition pump releases its lease, keeping the last checkpoint requested
+     by the event processor, so that other hosts pick up the partitions on their next lease
+     scan rather than waiting for the lease to expire. Default is False.
+    :vartype graceful_shutdown: bool
+    :ivar max_concurrent_lease_operations: The maximum number of leases that will be
+     retrieved, acquired or renewed concurrently during each lease scan. Default is 32.
+    :vartype max_concurrent_lease_operations: int
+    :ivar retry_policy: The policy used to retry opening and reconnecting partition receivers,
+     creating leases and checkpoints, and the requests made to Azure Storage. Retries back off
+     exponentially with jitter, and errors from the Event Hubs service are retried
+     according to their error condition. Default is a RetryPolicy with 5 retries.
+    :vartype retry_policy: ~azure.eventhub.common.RetryPolicy
+    :ivar metrics: A hook to receive throughput, lease and checkpoint metrics from the
+     partition receivers, pumps and storage manager. Default is None - i.e. no metrics
+     are recorded.
+    :vartype metrics: ~azure.eventhub.metrics.MetricsHook
+    :ivar batch_decoder: A function that decodes the bodies of each batch of events before it
+     is passed to the event processor. It is called with a list of the bodies as bytes and must
+     return a list of the same length, the values of which are set as the `decoded` attribute
+     of the events. If it raises or returns a list of another length, the error is set as the
+     `decoded` attribute of each event and the batch is still passed to the event processor.
+     It runs in the `decode_executor`, so that decoding does not block the receivers and lease
+     renewals on the event loop, and must be picklable if a process pool is used - for example
+     the `decode_batch` method of a codec from `azure.eventhub.codecs`.
+     Default is None - i.e. events are not decoded.
+    :vartype batch_decoder: callable[list[bytes], list]
+    :ivar decode_executor: The executor in which the batch decoder is run, such as a
+     ThreadPoolExecutor or a ProcessPoolExecutor. Default is None - i.e. the default
+     executor of the event loop.
+    :vartype decode_executor: ~concurrent.futures.Executor
+    :ivar dedicated_lease_loop: Whether to scan, acquire and renew leases on a dedicated
+     thread with its own event loop, rather than on the loop of the partition pumps, so that
+     busy event processors cannot delay lease renewal and cause leases to expire. Pumps are
+     still started and stopped on the loop of the host, and lease metrics are reported from
+     the lease thread. Default is False.
+    :vartype dedicated_lease_loop: bool
+    :ivar loop_lag_interval: The interval in seconds at which the lag of the event loop of the
+     host is measured and reported to the metrics hook. Default is None - i.e. the lag is not
+     measured.
+    :vartype loop_lag_interval: float
+    :ivar loop_lag_threshold: The time in seconds for which the event loop can be blocked before
+     the stack of its thread is sampled, to find the code that is blocking it. Requires the
+     `loop_lag_interval`. Default is None - i.e. the stack is not sampled.
+    :vartype loop_lag_threshold: float
+    :ivar on_loop_lag: A function called with the time in seconds for which the loop has been
+     blocked, and the sampled stack as a list of strings, when the `loop_lag_threshold` is
+     exceeded. It is called from a watchdog thread while the loop is still blocked, and can
+     be used to trigger a profiler. Default is None - i.e. the stack is logged as a warning.
+    :vartype on_loop_lag: callable[float, list[str]]
+    :ivar target_batch_latency: The time in seconds that processing a batch of events should
+     take. When set, each partition adjusts its batch size, starting from `max_batch_size`, so
+     that batches are processed in about this time. Batch sizes only grow while batches are
+     full, and are bounded by the `prefetch_count`. Default is None - i.e. the batch size
+     is fixed at `max_batch_size`.
+    :vartype target_batch_latency: float
+    :ivar assignment_strategy: The strategy deciding which leases the host steals from other
+     hosts to balance the partitions, such as a RendezvousAssignment, or a WeightedAssignment
+     to balance by partition throughput. Default is a StickyAssignment - i.e. partitions are
+     balanced by count, preferring to steal those the host owned most recently.
+    :vartype assignment_strategy: ~azure.eventprocessorhost.assignment_strategy.AssignmentStrategy
     """
 
     def __init__(self):
@@ -108,3 +193,20 @@ class EPHOptions:
         self.http_proxy = None
         self.keep_alive_interval = None
         self.auto_reconnect_on_error = True
+        self.epoch_receivers = True
+        self.shared_connection = False
+        self.runtime_metrics = False
+        self.partition_refresh_interval = None
+        self.persist_partition_ids = False
+        self.max_concurrent_lease_operations = 32
+        self.graceful_shutdown = False
+        self.retry_policy = RetryPolicy()
+        self.metrics = None
+        self.batch_decoder = None
+        self.decode_executor = None
+        self.dedicated_lease_loop = False
+        self.loop_lag_interval = None
+        self.loop_lag_threshold = None
+        self.on_loop_lag = None
+        self.target_batch_latency = None
+        self.assignment_strategy = StickyAssignment()
@@ -0,0 +1,111 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# -----------------------------------------------------------------------------------
+
+import sys
+import time
+import logging
+import asyncio
+import threading
+import traceback
+
+from azure.eventhub import metrics
+
+
+_logger = logging.getLogger(__name__)
+
+
+class LoopMonitor:
+    """
+    Measures the lag of the event loop of the host, as the time by which a sleep of
+    the given interval overruns, and reports it to the metrics hook.
+
+    If a threshold is set, a watchdog thread also checks that the loop is still
+    responsive. When the loop has been blocked for longer than the threshold, the
+    stack of the loop's thread is sampled, showing the code that is blocking it,
+    and passed to the `on_loop_lag` EPH option, or logged if no callback is set.
+    This is reported once per stall.
+    """
+
+    def __init__(self, host, interval, threshold=None):
+        """
+        Initialize LoopMonitor.
+
+        :param host: The host whose loop to monitor.
+        :type host: ~azure.eventprocessorhost.eph.EventProcessorHost
+        :param interval: The interval in seconds at which the lag is measured.
+        :type interval: float
+        :param threshold: The lag in seconds after which the stack of a blocked
+         loop is sampled. Default is None - i.e. the stack is not sampled.
+        :type threshold: float
+        """
+        self.host = host
+        self.interval = interval
+        self.threshold = threshold
+        self.heartbeat = None
+        self.loop_thread_id = None
+        self.task = None
+        self.watchdog = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """
+        Start monitoring the loop of the host. Must be called from the loop.
+        """
+        self.heartbeat = time.monotonic()
+        self.loop_thread_id = threading.get_ident()
+        self.task = self.host.loop.create_task(self.run_async())
+        if self.threshold is not None:
+            self.watchdog = threading.Thread(
+                target=self._watch,
+                name="eph-loop-monitor-{}".format(self.host.guid))
+            self.watchdog.daemon = True
+            self.watchdog.start()
+
+    async def stop_async(self):
+        """
+        Stop monitoring the loop.
+        """
+        self._stopped.set()
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+
+    async def run_async(self):
+        """
+        Measure the lag of the loop until stopped.
+        """
+        tags = {"eventhub": self.host.eh_config.eh_name, "host": self.host.host_name}
+        while not self._stopped.is_set():
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.heartbeat = time.monotonic()
+            if self.host.eph_options.metrics:
+                self.host.eph_options.metrics.observe(
+                    metrics.LOOP_LAG, max(0, self.heartbeat - started - self.interval), tags=tags)
+
+    def _watch(self):
+        reported = False
+        while not self._stopped.wait(min(self.interval, self.threshold)):
+            lag = time.monotonic() - self.heartbeat - self.interval
+            if lag < self.threshold:
+                reported = False
+            elif not reported:
+                reported = True
+                self._report_lag(lag)
+
+    def _report_lag(self, lag):
+        frame = sys._current_frames().get(self.loop_thread_id)  # pylint: disable=protected-access
+        stack = traceback.format_stack(frame) if frame else []
+        if self.host.eph_options.on_loop_lag:
+            try:
+                self.host.eph_options.on_loop_lag(lag, stack)
+            except Exception as err:  # pylint: disable=broad-except
+                _logger.error("Loop lag callback failed %r", err)
+        else:
+            _logger.warning("%r Event loop blocked for %.3f seconds in:\n%s",
+                            self.host.guid, lag, "".join(stack))
@@ -23,8 +23,35 @@ class PartitionContext:
         self.offset = "-1"
         self.sequence_number = 0
         self.lease = None
+        self.last_enqueued_sequence_number = None
+        self.last_enqueued_offset = None
+        self.last_enqueued_time = None
         self.pump_loop = pump_loop or asyncio.get_event_loop()
 
+    @property
+    def lag(self):
+        """
+        The number of events enqueued in the partition after the most recently
+        received event. This is only available when runtime metrics have been
+        enabled in the EPHOptions, otherwise it will be `None`.
+
+        :rtype: int
+        """
+        if self.last_enqueued_sequence_number is None or self.sequence_number is None:
+            return None
+        return max(0, self.last_enqueued_sequence_number - self.sequence_number)
+
+    def set_runtime_info(self, runtime_info):
+        """
+        Updates the last enqueued event information of the partition.
+
+        :param runtime_info: The partition runtime information reported by the receiver.
+        :type runtime_info: dict
+        """
+        self.last_enqueued_sequence_number = runtime_info['last_enqueued_sequence_number']
+        self.last_enqueued_offset = runtime_info['last_enqueued_offset']
+        self.last_enqueued_time = runtime_info['last_enqueued_time']
+
     def set_offset_and_sequence_number(self, event_data):
         """
         Updates offset based on event.
@@ -3,13 +3,16 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # -----------------------------------------------------------------------------------
 
+import time
 import logging
 import asyncio
+import threading
 from queue import Queue
 from collections import Counter
 
 from azure.eventhub import EventHubClientAsync
 from azure.eventprocessorhost.eh_partition_pump import EventHubPartitionPump
+from azure.eventprocessorhost.loop_monitor import LoopMonitor
 from azure.eventprocessorhost.cancellation_token import CancellationToken
 
 
@@ -25,30 +28,103 @@ class PartitionManager:
         self.host = host
         self.partition_pumps = {}
         self.partition_ids = None
+        self.partition_ids_updated = 0
+        self.eh_client = None
+        self.receive_client = None
+        self.lease_semaphore = None
         self.run_task = None
+        self.lease_loop = None
+        self.lease_thread = None
+        self.loop_monitor = None
+        # Event loops running on worker threads to spread the partition pumps across.
+        # If empty, the pumps run on the loop of the host.
+        self.pump_loops = []
         self.cancellation_token = CancellationToken()
 
+    def _partition_ids_expired(self):
+        refresh_interval = self.host.eph_options.partition_refresh_interval
+        return refresh_interval is not None and time.time() - self.partition_ids_updated >= refresh_interval
+
     async def get_partition_ids_async(self):
         """
-        Returns a list of all the event hub partition IDs.
+        Returns a list of all the event hub partition IDs. The IDs are cached and
+        only retrieved again once the partition refresh interval has passed.
 
         :rtype: list[str]
         """
-        if not self.partition_ids:
+        if not self.partition_ids or self._partition_ids_expired():
             try:
-                eh_client = EventHubClientAsync(
-                    self.host.eh_config.client_address,
-                    debug=self.host.eph_options.debug_trace,
-                    http_proxy=self.host.eph_options.http_proxy)
-                try:
-                    eh_info = await eh_client.get_eventhub_info_async()
-                    self.partition_ids = eh_info['partition_ids']
-                except Exception as err:  # pylint: disable=broad-except
+                self.partition_ids = await self._load_partition_ids_async()
+            except Exception as err:  # pylint: disable=broad-except
+                if not self.partition_ids:
                     raise Exception("Failed to get partition ids", repr(err))
-            finally:
-                await eh_client.stop_async()
+                _logger.warning("%r Failed to refresh partition ids, using cached %r", self.host.guid, err)
+            self.partition_ids_updated = time.time()
         return self.partition_ids
 
+    async def _load_partition_ids_async(self):
+        """
+        Retrieve the partition IDs from the lease store if a recent enough copy has
+        been stored there, otherwise from the Event Hub.
+
+        :rtype: list[str]
+        """
+        refresh_interval = self.host.eph_options.partition_refresh_interval
+        if self.host.eph_options.persist_partition_ids:
+            stored = await self.host.storage_manager.get_stored_partition_ids_async()
+            if stored and (refresh_interval is None or time.time() - stored[1] < refresh_interval):
+                return stored[0]
+
+        if not self.eh_client:
+            self.eh_client = EventHubClientAsync(
+                self.host.eh_config.client_address,
+                debug=self.host.eph_options.debug_trace,
+                http_proxy=self.host.eph_options.http_proxy)
+        try:
+            eh_info = await self.eh_client.get_eventhub_info_async()
+        finally:
+            # The management connection is only kept open if it will be needed again.
+            if refresh_interval is None:
+                await self._close_eh_client_async()
+        if self.host.eph_options.persist_partition_ids:
+            await self.host.storage_manager.store_partition_ids_async(eh_info['partition_ids'])
+        return eh_info['partition_ids']
+
+    async def _close_eh_client_async(self):
+        if self.eh_client:
+            await self.eh_client.stop_async()
+            self.eh_client = None
+
+    def get_receive_client(self):
+        """
+        Returns the client shared by the partition pumps of this host when the
+        `shared_connection` EPH option is set. Receivers for each partition are
+        added to and removed from this client as leases are acquired and lost,
+        all on a single connection.
+
+        :rtype: ~azure.eventhub.async_ops.EventHubClientAsync
+        """
+        if not self.receive_client:
+            self.receive_client = EventHubClientAsync(
+                self.host.eh_config.client_address,
+                debug=self.host.eph_options.debug_trace,
+                http_proxy=self.host.eph_options.http_proxy,
+                metrics=self.host.eph_options.metrics,
+                shared_connection=True)
+        return self.receive_client
+
+    async def refresh_partition_ids_async(self):
+        """
+        Refresh the partition IDs if the refresh interval has passed, creating the
+        checkpoint and lease for any partitions that have been added to the Event Hub.
+        """
+        known_partition_ids = set(self.partition_ids or [])
+        partition_ids = await self.get_partition_ids_async()
+        new_partition_ids = [p for p in partition_ids if p not in known_partition_ids]
+        if new_partition_ids:
+            _logger.info("%r New partitions found %r", self.host.guid, new_partition_ids)
+            await self.create_checkpoints_async(new_partition_ids)
+
     async def start_async(self):
         """
         Intializes the partition checkpoint and lease store and then calls run async.
@@ -58,7 +134,16 @@ class PartitionManager:
 
         partition_count = await self.initialize_stores_async()
         _logger.info("%r PartitionCount: %r", self.host.guid, partition_count)
-        self.run_task = asyncio.ensure_future(self.run_async())
+        if self.host.eph_options.loop_lag_interval:
+            self.loop_monitor = LoopMonitor(
+                self.host, self.host.eph_options.loop_lag_interval, self.host.eph_options.loop_lag_threshold)
+            self.loop_monitor.start()
+        if self.host.eph_options.dedicated_lease_loop:
+            # The management client is bound to this loop, so the lease loop opens its own.
+            await self._close_eh_client_async()
+            self.run_task = self._start_lease_loop()
+        else:
+            self.run_task = asyncio.ensure_future(self.run_async())
 
     async def stop_async(self):
         """
@@ -67,6 +152,84 @@ class PartitionManager:
         self.cancellation_token.cancel()
         if self.run_task and not self.run_task.done():
             await self.run_task
+        if self.lease_thread:
+            self.lease_loop.call_soon_threadsafe(self.lease_loop.stop)
+            await self.host.loop.run_in_executor(None, self.lease_thread.join)
+            self.lease_thread = None
+        if self.loop_monitor:
+            await self.loop_monitor.stop_async()
+            self.loop_monitor = None
+        await self.host.storage_manager.flush_checkpoints_async()
+
+    def _start_lease_loop(self):
+        """
+        Start the run loop on a dedicated thread with its own event loop, so that
+        lease renewal is not delayed by the partition pumps and event processors.
+
+        :return: A future that completes once the run loop has stopped.
+        :rtype: ~asyncio.Future
+        """
+        self.lease_loop = asyncio.new_event_loop()
+        self.lease_thread = threading.Thread(
+            target=self._run_lease_loop,
+            name="eph-leases-{}".format(self.host.guid))
+        self.lease_thread.daemon = True
+        self.lease_thread.start()
+        return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self.run_async(), self.lease_loop))
+
+    def _run_lease_loop(self):
+        asyncio.set_event_loop(self.lease_loop)
+        try:
+            self.lease_loop.run_forever()
+        finally:
+            self.lease_loop.close()
+
+    async def _on_pump_loop(self, coro):
+        """
+        Run a coroutine that manages the partition pumps on the loop of the host.
+        When the run loop is on a dedicated thread, the coroutine is scheduled on the
+        host's loop and its result is awaited from the lease loop.
+        """
+        if not self.lease_thread:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.host.loop))
+
+    async def _update_pump_async(self, coro):
+        """
+        Start, update or remove a partition pump following a lease operation. When the
+        run loop is on a dedicated thread, the coroutine is scheduled on the loop of the
+        host without waiting for it, so that a busy pump loop cannot hold up the lease scan.
+        """
+        if not self.lease_thread:
+            await coro
+            return
+        future = asyncio.run_coroutine_threadsafe(coro, self.host.loop)
+        future.add_done_callback(self._log_pump_update)
+
+    async def _on_loop_async(self, coro, loop):
+        """
+        Run a coroutine on the given loop, which may be running on another thread,
+        and await its result from the current loop.
+        """
+        if loop is None or loop is asyncio.get_event_loop():
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def _assign_pump_loop(self):
+        """
+        Return the worker loop running the fewest partition pumps, or `None` if
+        the pumps run on the loop of the host.
+
+        :rtype: ~asyncio.AbstractEventLoop
+        """
+        if not self.pump_loops:
+            return None
+        pump_counts = Counter(p.loop for p in list(self.partition_pumps.values()))
+        return min(self.pump_loops, key=lambda l: pump_counts[l])
+
+    def _log_pump_update(self, future):
+        if not future.cancelled() and future.exception():
+            _logger.error("Failed to update pump %r %r", self.host.guid, future.exception())
 
     async def run_async(self):
         """
@@ -79,9 +242,17 @@ class PartitionManager:
 
         try:
             _logger.info("Shutting down all pumps %r", self.host.guid)
-            await self.remove_all_pumps_async("Shutdown")
+            await self._on_pump_loop(self.remove_all_pumps_async("Shutdown"))
         except Exception as err:  # pylint: disable=broad-except
             raise Exception("Failed to remove all pumps {!r}".format(err))
+        finally:
+            await self._close_eh_client_async()
+            await self._on_pump_loop(self._close_receive_client_async())
+
+    async def _close_receive_client_async(self):
+        if self.receive_client:
+            await self.receive_client.stop_async()
+            self.receive_client = None
 
     async def initialize_stores_async(self):
         """
@@ -94,6 +265,16 @@ class PartitionManager:
         """
         await self.host.storage_manager.create_checkpoint_store_if_not_exists_async()
         partition_ids = await self.get_partition_ids_async()
+        await self.create_checkpoints_async(partition_ids)
+        return len(partition_ids)
+
+    async def create_checkpoints_async(self, partition_ids):
+        """
+        Ensures that a checkpoint exists for each of the given partitions.
+
+        :param partition_ids: The partition IDs.
+        :type partition_ids: list[str]
+        """
         retry_tasks = []
         for partition_id in partition_ids:
             retry_tasks.append(
@@ -106,7 +287,6 @@ class PartitionManager:
                     host_id=self.host.host_name))
 
         await asyncio.gather(*retry_tasks)
-        return len(partition_ids)
 
     def retry(self, func, partition_id, retry_message, final_failure_message, max_retries, host_id):
         """
@@ -120,9 +300,12 @@ class PartitionManager:
                           final_failure_message, max_retries, host_id):
         """
         Throws if it runs out of retries. If it returns, action succeeded.
+        Attempts are spaced out according to the host's retry policy.
         """
         created_okay = False
         retry_count = 0
+        started = time.time()
+        retry_policy = self.host.eph_options.retry_policy
         while not created_okay and retry_count <= max_retries:
             try:
                 await func(partition_id)
@@ -130,6 +313,12 @@ class PartitionManager:
             except Exception as err:  # pylint: disable=broad-except
                 _logger.error("%r %r %r %r", retry_message, host_id, partition_id, err)
                 retry_count += 1
+                if retry_count > max_retries:
+                    break
+                backoff = retry_policy.next_backoff(retry_count - 1, err, started)
+                if backoff is None:
+                    break
+                await asyncio.sleep(backoff)
         if not created_okay:
             raise Exception(host_id, final_failure_message)
 
@@ -139,6 +328,11 @@ class PartitionManager:
         """
         while not self.cancellation_token.is_cancelled:
             lease_manager = self.host.storage_manager
+            if self.host.eph_options.partition_refresh_interval is not None:
+                try:
+                    await self.refresh_partition_ids_async()
+                except Exception as err:  # pylint: disable=broad-except
+                    _logger.error("Failed to refresh partitions %r", err)
             # Inspect all leases.
             # Acquire any expired leases.
             # Renew any leases that currently belong to us.
@@ -148,39 +342,33 @@ class PartitionManager:
                 self.attempt_renew_lease_async(
                     get_lease_task,
                     owned_by_others_q=leases_owned_by_others_q,
-                    lease_manager=lease_manager)
+                    lease_manager=lease_manager,
+                    start_pump=True)
                 for get_lease_task in getting_all_leases]
             await asyncio.gather(*renew_tasks)
 
-            # Extract all leasees leases_owned_by_others and our_lease_count from the
+            # Extract all leasees leases_owned_by_others and our_leases from the
             all_leases = {}
             leases_owned_by_others = []
-            our_lease_count = 0
+            our_leases = []
             while not leases_owned_by_others_q.empty():
                 lease_owned_by_other = leases_owned_by_others_q.get()
                 # Check if lease is owned by other and append
                 if lease_owned_by_other[0]:
                     leases_owned_by_others.append(lease_owned_by_other[1])
                 else:
-                    our_lease_count += 1
+                    our_leases.append(lease_owned_by_other[1])
                 all_leases[lease_owned_by_other[1].partition_id] = lease_owned_by_other[1]
+            self.host.eph_options.assignment_strategy.update(self.host.host_name, list(all_leases.values()))
 
             # Grab more leases if available and needed for load balancing
             leases_owned_by_others_count = len(leases_owned_by_others)
             if leases_owned_by_others_count > 0:
-                steal_this_lease = self.which_lease_to_steal(
-                    leases_owned_by_others, our_lease_count)
-                if steal_this_lease:
-                    try:
-                        _logger.info("Lease to steal %r", steal_this_lease.serializable())
-                        if await lease_manager.acquire_lease_async(steal_this_lease):
-                            _logger.info("Stole lease sucessfully %r %r",
-                                         self.host.guid, steal_this_lease.partition_id)
-                        else:
-                            _logger.info("Failed to steal lease for partition %r %r",
-                                         self.host.guid, steal_this_lease.partition_id)
-                    except Exception as err:  # pylint: disable=broad-except
-                        _logger.error("Failed to steal lease %r", err)
+                steal_these_leases = self.which_leases_to_steal(
+                    leases_owned_by_others, len(our_leases), owned_leases=our_leases)
+                if steal_these_leases:
+                    await asyncio.gather(*[
+                        self.steal_lease_async(l, lease_manager) for l in steal_these_leases])
 
             for partition_id in all_leases:
                 try:
@@ -188,10 +376,10 @@ class PartitionManager:
                     if updated_lease.owner == self.host.host_name:
                         _logger.debug("Attempting to renew lease %r %r",
                                       self.host.guid, partition_id)
-                        await self.check_and_add_pump_async(partition_id, updated_lease)
+                        await self._update_pump_async(self.check_and_add_pump_async(partition_id, updated_lease))
                     else:
                         _logger.debug("Removing pump due to lost lease.")
-                        await self.remove_pump_async(partition_id, "LeaseLost")
+                        await self._update_pump_async(self.remove_pump_async(partition_id, "LeaseLost"))
                 except Exception as err:  # pylint: disable=broad-except
                     _logger.error("Failed to update lease %r", err)
             await asyncio.sleep(lease_manager.lease_renew_interval)
@@ -231,8 +419,13 @@ class PartitionManager:
         """
         loop = asyncio.get_event_loop()
         partition_pump = EventHubPartitionPump(self.host, lease)
+        partition_pump.loop = self._assign_pump_loop()
         # Do the put after start, if the start fails then put doesn't happen
-        loop.create_task(partition_pump.open_async())
+        if partition_pump.loop:
+            future = asyncio.run_coroutine_threadsafe(partition_pump.open_async(), partition_pump.loop)
+            future.add_done_callback(self._log_pump_update)
+        else:
+            loop.create_task(partition_pump.open_async())
         self.partition_pumps[partition_id] = partition_pump
         _logger.info("Created new partition pump %r %r", self.host.guid, partition_id)
 
@@ -248,9 +441,10 @@ class PartitionManager:
         if partition_id in self.partition_pumps:
             captured_pump = self.partition_pumps[partition_id]
             if not captured_pump.is_closing():
-                await captured_pump.close_async(reason)
+                await self._on_loop_async(captured_pump.close_async(reason), captured_pump.loop)
             # else, pump is already closing/closed, don't need to try to shut it down again
-            del self.partition_pumps[partition_id]  # remove pump
+            if self.partition_pumps.get(partition_id) is captured_pump:
+                del self.partition_pumps[partition_id]  # remove pump
             _logger.debug("Removed pump %r %r", self.host.guid, partition_id)
             _logger.debug("%r pumps still running", len(self.partition_pumps))
         else:
@@ -273,42 +467,74 @@ class PartitionManager:
         await asyncio.gather(*pump_tasks)
         return True
 
-    def which_lease_to_steal(self, stealable_leases, have_lease_count):
+    async def steal_lease_async(self, lease, lease_manager):
+        """
+        Attempts to steal a lease owned by another host.
+
+        :param lease: The lease to steal.
+        :type lease: ~azure.eventprocessorhost.lease.Lease
+        :param lease_manager: The lease manager.
+        :type lease_manager: ~azure.eventprocessorhost.abstract_lease_manager.AbstractLeaseManager
         """
-        Determines and return which lease to steal
-        If the number of leases is a multiple of the number of hosts, then the desired
-        configuration is that all hosts own the name number of leases, and the
-        difference between the "biggest" owner and any other is 0.
+        try:
+            _logger.info("Lease to steal %r", lease.serializable())
+            if await lease_manager.acquire_lease_async(lease):
+                _logger.info("Stole lease sucessfully %r %r",
+                             self.host.guid, lease.partition_id)
+            else:
+                _logger.info("Failed to steal lease for partition %r %r",
+                             self.host.guid, lease.partition_id)
+        except Exception as err:  # pylint: disable=broad-except
+            _logger.error("Failed to steal lease %r", err)
 
-        If the number of leases is not a multiple of the number of hosts, then the most
-        even configurationpossible is for some hosts to have (self, leases/hosts) leases
-        and others to have (self, (self, leases/hosts) + 1). For example, for 16 partitions
-        distributed over five hosts, the distribution would be 4, 3, 3, 3, 3, or any of the
-        possible reorderings.
+    def which_leases_to_steal(self, stealable_leases, have_lease_count, owned_leases=None):
+        """
+        Determines and returns which leases to steal in order to reach this host's share
+        of the partitions in a single pass, according to the `assignment_strategy` EPH option.
 
-        In either case, if the difference between this host and the biggest owner is 2 or more,
-        then thesystem is not in the most evenly-distributed configuration, so steal one lease
-        from the biggest. If there is a tie for biggest, we pick whichever appears first in the
-        list because it doesn't really matter which "biggest" is trimmed down.
+        The target share is computed from the number of hosts that currently own leases,
+        including this one. With L leases and H hosts of equal weight, an even distribution
+        gives every host either floor(L/H) or ceil(L/H) leases, so this host steals until it
+        owns ceil(L/H) leases or there is nothing left that can be stolen without causing
+        flapping.
 
-        Stealing one at a time prevents flapping because it reduces the difference between the
-        biggest and this host by two at a time. If the starting difference is two or greater,
-        then the difference cannot end up below 0. This host may become tied for biggest, but it
-        cannot become larger than the host that it is stealing from.
+        Leases are stolen one at a time from whichever host is currently the biggest owner,
+        and only while that owner has at least two more leases than this host. Following a
+        steal the difference between the two is reduced by two, so the victim is never left
+        with fewer leases than this host and will not steal the lease back. If there is a tie
+        for biggest, we pick whichever appears first in the list because it doesn't really
+        matter which "biggest" is trimmed down. Which of its leases is stolen is decided by
+        the preference of the strategy, such as for partitions this host owned recently.
 
         :param stealable_leases: List of leases to determine which can be stolen.
         :type stealable_leases: list[~azure.eventprocessorhost.lease.Lease]
         :param have_lease_count: Lease count.
         :type have_lease_count: int
-        :rtype: ~azure.eventprocessorhost.lease.Lease
+        :param owned_leases: The leases owned by this host, used to weigh them. Default is
+         `None`, in which case each is weighed as 1.
+        :type owned_leases: list[~azure.eventprocessorhost.lease.Lease]
+        :rtype: list[~azure.eventprocessorhost.lease.Lease]
+        """
+        strategy = self.host.eph_options.assignment_strategy
+        if owned_leases is None:
+            have_weight = have_lease_count
+        else:
+            have_weight = sum(strategy.weight(l) for l in owned_leases)
+        return strategy.leases_to_steal(self.host.host_name, stealable_leases, have_weight)
+
+    def which_lease_to_steal(self, stealable_leases, have_lease_count):
         """
-        counts_by_owner = self.count_leases_by_owner(stealable_leases)
-        biggest_owner = (sorted(counts_by_owner.items(), key=lambda kv: kv[1])).pop()
-        steal_this_lease = None
-        if (biggest_owner[1] - have_lease_count) >= 2:
-            steal_this_lease = [l for l in stealable_leases if l.owner == biggest_owner[0]][0]
+        Determines and return which lease to steal. This is the first of the leases
+        returned by which_leases_to_steal().
 
-        return steal_this_lease
+        :param stealable_leases: List of leases to determine which can be stolen.
+        :type stealable_leases: list[~azure.eventprocessorhost.lease.Lease]
+        :param have_lease_count: Lease count.
+        :type have_lease_count: int
+        :rtype: ~azure.eventprocessorhost.lease.Lease
+        """
+        steal_these_leases = self.which_leases_to_steal(stealable_leases, have_lease_count)
+        return steal_these_leases[0] if steal_these_leases else None
 
     def count_leases_by_owner(self, leases):  # pylint: disable=no-self-use
         """
@@ -324,37 +550,59 @@ class PartitionManager:
         loop = asyncio.new_event_loop()
         loop.run_until_complete(self.attempt_renew_lease_async(lease_task, owned_by_others_q, lease_manager))
 
-    async def attempt_renew_lease_async(self, lease_task, owned_by_others_q, lease_manager):
+    def _get_lease_semaphore(self):
+        # Created on first use so that it is bound to the running loop.
+        if not self.lease_semaphore:
+            self.lease_semaphore = asyncio.Semaphore(self.host.eph_options.max_concurrent_lease_operations)
+        return self.lease_semaphore
+
+    async def attempt_renew_lease_async(self, lease_task, owned_by_others_q, lease_manager, start_pump=False):
         """
         Attempts to renew a potential lease if possible and
         marks in the queue as none adds to adds to the queue.
+        The number of leases being retrieved, acquired or renewed at once is
+        limited by the `max_concurrent_lease_operations` EPH option.
+
+        :param start_pump: Whether to start the partition pump as soon as an
+         expired lease has been acquired, rather than once all leases have been scanned.
+        :type start_pump: bool
         """
+        acquired_lease = None
         try:
-            possible_lease = await lease_task
-            if await possible_lease.is_expired():
-                _logger.info("Trying to aquire lease %r %r",
-                             self.host.guid, possible_lease.partition_id)
-                if await lease_manager.acquire_lease_async(possible_lease):
-                    owned_by_others_q.put((False, possible_lease))
-                else:
-                    owned_by_others_q.put((True, possible_lease))
-
-            elif possible_lease.owner == self.host.host_name:
-                try:
-                    _logger.debug("Trying to renew lease %r %r",
-                                  self.host.guid, possible_lease.partition_id)
-                    if await lease_manager.renew_lease_async(possible_lease):
+            async with self._get_lease_semaphore():
+                possible_lease = await lease_task
+                if await possible_lease.is_expired():
+                    _logger.info("Trying to aquire lease %r %r",
+                                 self.host.guid, possible_lease.partition_id)
+                    if await lease_manager.acquire_lease_async(possible_lease):
                         owned_by_others_q.put((False, possible_lease))
+                        acquired_lease = possible_lease
                     else:
                         owned_by_others_q.put((True, possible_lease))
-                except Exception as err:  # pylint: disable=broad-except
-                    # Update to 'Lease Lost' exception.
-                    _logger.error("Lease lost exception %r %r %r",
-                                  err, self.host.guid, possible_lease.partition_id)
+
+                elif possible_lease.owner == self.host.host_name:
+                    try:
+                        _logger.debug("Trying to renew lease %r %r",
+                                      self.host.guid, possible_lease.partition_id)
+                        if await lease_manager.renew_lease_async(possible_lease):
+                            owned_by_others_q.put((False, possible_lease))
+                        else:
+                            owned_by_others_q.put((True, possible_lease))
+                    except Exception as err:  # pylint: disable=broad-except
+                        # Update to 'Lease Lost' exception.
+                        _logger.error("Lease lost exception %r %r %r",
+                                      err, self.host.guid, possible_lease.partition_id)
+                        owned_by_others_q.put((True, possible_lease))
+                else:
                     owned_by_others_q.put((True, possible_lease))
-            else:
-                owned_by_others_q.put((True, possible_lease))
 
         except Exception as err:  # pylint: disable=broad-except
             _logger.error(
                 "Failure during getting/acquiring/renewing lease, skipping %r", err)
+
+        if acquired_lease and start_pump:
+            try:
+                await self._update_pump_async(
+                    self.check_and_add_pump_async(acquired_lease.partition_id, acquired_lease))
+            except Exception as err:  # pylint: disable=broad-except
+                _logger.error("Failed to start pump %r %r", acquired_lease.partition_id, err)
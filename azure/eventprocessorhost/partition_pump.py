@@ -4,8 +4,11 @@
 # ---------------------
 
 from abc import  abstractmethod
+import time
 import logging
 import asyncio
+from azure.eventhub import metrics
+from azure.eventhub.common import _join_data
 from azure.eventprocessorhost.partition_context import PartitionContext
 
 
@@ -24,6 +27,8 @@ class PartitionPump():
         self.partition_context = None
         self.processor = None
         self.loop = None
+        # Set when a receiver with a higher epoch has taken the partition over.
+        self.evicted = False
 
     def run(self):
         """
@@ -109,16 +114,36 @@ class PartitionPump():
             _logger.error("%r %r %r", self.host.guid, self.partition_context.partition_id, err)
             raise err
 
-        if reason == "LeaseLost":
+        if reason == "LeaseLost" and not self.evicted:
+            # An evicted pump's lease is already owned by another host, so it cannot be released.
             try:
                 _logger.info("Lease Lost releasing ownership")
                 await self.host.storage_manager.release_lease_async(self.partition_context.lease)
             except Exception as err:  # pylint: disable=broad-except
                 _logger.error("%r %r %r", self.host.guid, self.partition_context.partition_id, err)
                 raise err
+        elif reason == "Shutdown" and self.host.eph_options.graceful_shutdown and \
+                self.host.partition_manager.cancellation_token.is_cancelled:
+            # Errored pumps are also closed with "Shutdown" before being restarted, in
+            # which case the lease is kept.
+            await self.drain_async()
 
         self.set_pump_status("Closed")
 
+    async def drain_async(self):
+        """
+        Hands the partition over to another host on shutdown. The lease is released so that
+        it is available to other hosts on their next lease scan rather than once it expires,
+        and the last checkpoint requested by the processor is written to the lease blob as it
+        is released. The pump does not checkpoint the events it passed to the processor itself,
+        as it cannot tell whether they were processed successfully.
+        """
+        context = self.partition_context
+        if not context or not context.lease or not context.lease.token:
+            return
+        _logger.info("Releasing lease on shutdown %r %r", self.host.guid, context.partition_id)
+        await self.host.storage_manager.release_lease_async(context.lease)
+
     @abstractmethod
     async def on_closing_async(self, reason):
         """
@@ -145,10 +170,68 @@ class PartitionPump():
                 last = events[-1]
                 if last is not None:
                     self.partition_context.set_offset_and_sequence_number(last)
+                    if self.host.eph_options.metrics:
+                        self.record_lag(last)
+                    if self.host.eph_options.batch_decoder:
+                        await self.decode_async(events)
+                    started = time.time()
                     await self.processor.process_events_async(self.partition_context, events)
+                    if self.host.eph_options.metrics:
+                        self.host.eph_options.metrics.observe(
+                            metrics.PROCESS_EVENTS_LATENCY, time.time() - started, tags=self._metric_tags())
             except Exception as err:  # pylint: disable=broad-except
                 await self.process_error_async(err)
 
+    async def decode_async(self, events):
+        """
+        Decode the bodies of a batch of events with the batch decoder of the host, in
+        its decode executor, and set the results as the `decoded` attribute of the events.
+        If the batch cannot be decoded, the error is set as the `decoded` attribute of each
+        event instead, so that the batch is still passed to the processor.
+
+        :param events: The events to decode.
+        :type events: list[~azure.eventhub.common.EventData]
+        """
+        options = self.host.eph_options
+        try:
+            # The bodies are copied out of the received messages on the loop, as
+            # the messages themselves cannot be passed to another process.
+            bodies = [_join_data(e.body) for e in events]
+            decoded = await asyncio.get_event_loop().run_in_executor(
+                options.decode_executor, options.batch_decoder, bodies)
+            if len(decoded) != len(events):
+                raise ValueError("The batch decoder returned {} values for {} events.".format(
+                    len(decoded), len(events)))
+        except Exception as err:  # pylint: disable=broad-except
+            _logger.warning("Failed to decode batch %r %r %r",
+                            self.host.guid, self.partition_context.partition_id, err)
+            decoded = [err] * len(events)
+        for event, value in zip(events, decoded):
+            event.decoded = value
+
+    def record_lag(self, event_data):
+        """
+        Report how far behind the partition the pump is to the metrics hook, as the
+        time since the given event was enqueued and, if runtime metrics are enabled,
+        as the number of events enqueued since.
+
+        :param event_data: The most recently received event.
+        :type event_data: ~azure.eventhub.common.EventData
+        """
+        tags = self._metric_tags()
+        enqueued_time = event_data.enqueued_time
+        if enqueued_time:
+            self.host.eph_options.metrics.gauge(
+                metrics.PARTITION_LAG_SECONDS,
+                max(0, time.time() - enqueued_time.timestamp()),
+                tags=tags)
+        lag = self.partition_context.lag
+        if lag is not None:
+            self.host.eph_options.metrics.gauge(metrics.PARTITION_LAG_EVENTS, lag, tags=tags)
+
+    def _metric_tags(self):
+        return {"eventhub": self.host.eh_config.eh_name, "partition": self.partition_context.partition_id}
+
     async def process_error_async(self, error):
         """
         Passes error to the event processor for processing.
@@ -0,0 +1,171 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# -----------------------------------------------------------------------------------
+
+import asyncio
+import functools
+import threading
+
+from azure.eventprocessorhost.abstract_event_processor import AbstractEventProcessor
+from azure.eventprocessorhost.eph import EventProcessorHost, EPHOptions
+
+
+class ThreadedEventProcessorHost:
+    """
+    Runs an EventProcessorHost for applications that do not use asyncio.
+    Leases are managed on a thread with its own event loop, and the partition pumps
+    are spread across a number of worker threads, each running its own event loop.
+    Batches of events are delivered to a sync event processor on the worker thread
+    of the partition, so the partitions of a worker are processed one batch at a time
+    while the other workers carry on.
+    """
+
+    def __init__(self, event_processor, eh_config, storage_manager, ep_params=None,
+                 eph_options=None, worker_threads=4):
+        """
+        Initialize ThreadedEventProcessorHost.
+
+        :param event_processor: The event processing handler.
+        :type event_processor: ~azure.eventprocessorhost.abstract_sync_event_processor.AbstractSyncEventProcessor
+        :param eh_config: The EPH connection configuration.
+        :type eh_config: ~azure.eventprocessorhost.eh_config.EventHubConfig
+        :param storage_manager: The Azure storage manager for persisting lease and
+         checkpoint information.
+        :type storage_manager:
+         ~azure.eventprocessorhost.azure_storage_checkpoint_manager.AzureStorageCheckpointLeaseManager
+        :param ep_params: Optional arbitrary parameters to be passed into the event_processor
+         on initialization.
+        :type ep_params: list
+        :param eph_options: EPH configuration options. The `shared_connection` option is not
+         supported, as a connection cannot be shared by the loops of several threads.
+        :type eph_options: ~azure.eventprocessorhost.eph.EPHOptions
+        :param worker_threads: The number of threads running the partition pumps. Default is 4.
+        :type worker_threads: int
+        """
+        eph_options = eph_options or EPHOptions()
+        if eph_options.shared_connection:
+            raise ValueError("A shared connection cannot be used by the partition pumps of several threads.")
+        if worker_threads < 1:
+            raise ValueError("At least one worker thread is required.")
+        self.loop = asyncio.new_event_loop()
+        self.host = EventProcessorHost(
+            functools.partial(_SyncEventProcessorAdapter, event_processor),
+            eh_config, storage_manager, ep_params=ep_params, eph_options=eph_options, loop=self.loop)
+        self.worker_threads = worker_threads
+        self.threads = []
+
+    def start(self):
+        """
+        Start the host and its worker threads. Returns once the lease and checkpoint
+        stores have been initialized; partitions are then acquired in the background.
+        """
+        if self.threads:
+            raise Exception("A ThreadedEventProcessorHost cannot be started multiple times.")
+        self._start_thread(self.loop, "eph-host-{}".format(self.host.guid))
+        pump_loops = []
+        for i in range(self.worker_threads):
+            pump_loops.append(asyncio.new_event_loop())
+            self._start_thread(pump_loops[-1], "eph-worker-{}-{}".format(i, self.host.guid))
+        self.host.partition_manager.pump_loops = pump_loops
+        asyncio.run_coroutine_threadsafe(self.host.open_async(), self.loop).result()
+
+    def stop(self):
+        """
+        Stop the host, closing the event processors of all partitions, and wait
+        for its threads to finish.
+        """
+        try:
+            asyncio.run_coroutine_threadsafe(self.host.close_async(), self.loop).result()
+        finally:
+            for loop in [self.loop] + self.host.partition_manager.pump_loops:
+                loop.call_soon_threadsafe(loop.stop)
+            for thread in self.threads:
+                thread.join()
+
+    def _start_thread(self, loop, name):
+        thread = threading.Thread(target=self._run_loop, args=(loop,), name=name)
+        thread.daemon = True
+        thread.start()
+        self.threads.append(thread)
+
+    @staticmethod
+    def _run_loop(loop):
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+
+class SyncPartitionContext:
+    """
+    The information related to an Event Hubs partition passed to a sync event processor.
+    Attributes are read from the partition context of the pump. A checkpoint requested
+    by the processor is persisted once the call to the processor has returned.
+    """
+
+    def __init__(self, context):
+        self.context = context
+        self._checkpoint_requested = False
+        self._checkpoint_event = None
+
+    def __getattr__(self, name):
+        return getattr(self.context, name)
+
+    def checkpoint(self, event_data=None):
+        """
+        Request a checkpoint of the partition, at the given event or otherwise at the
+        last event received.
+
+        :param event_data: A received EventData with valid offset and sequenceNumber.
+        :type event_data: ~azure.eventhub.common.EventData
+        """
+        self._checkpoint_requested = True
+        self._checkpoint_event = event_data
+
+    async def persist_checkpoint_async(self):
+        """
+        Persist the checkpoint requested by the processor, if any.
+        """
+        if not self._checkpoint_requested:
+            return
+        event_data = self._checkpoint_event
+        self._checkpoint_requested = False
+        self._checkpoint_event = None
+        if event_data:
+            await self.context.checkpoint_async_event_data(event_data)
+        else:
+            await self.context.checkpoint_async()
+
+
+class _SyncEventProcessorAdapter(AbstractEventProcessor):
+    """
+    Delivers the calls of a partition pump to a sync event processor.
+    """
+
+    def __init__(self, event_processor, params=None):
+        super(_SyncEventProcessorAdapter, self).__init__(params)
+        self.event_processor = event_processor(params)
+        self.context = None
+
+    def _sync_context(self, context):
+        if not self.context or self.context.context is not context:
+            self.context = SyncPartitionContext(context)
+        return self.context
+
+    async def open_async(self, context):
+        self.event_processor.open(self._sync_context(context))
+
+    async def close_async(self, context, reason):
+        sync_context = self._sync_context(context)
+        self.event_processor.close(sync_context, reason)
+        await sync_context.persist_checkpoint_async()
+
+    async def process_events_async(self, context, messages):
+        sync_context = self._sync_context(context)
+        self.event_processor.process_events(sync_context, messages)
+        await sync_context.persist_checkpoint_async()
+
+    async def process_error_async(self, context, error):
+        self.event_processor.process_error(self._sync_context(context), error)
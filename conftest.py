@@ -5,6 +5,7 @@
 #--------------------------------------------------------------------------
 
 import os
+import asyncio
 import pytest
 import logging
 import sys
@@ -21,6 +22,7 @@ from azure.eventprocessorhost.lease import Lease
 from azure.eventprocessorhost.partition_pump import PartitionPump
 from azure.eventprocessorhost.partition_manager import PartitionManager
 from azure.eventprocessorhost.abstract_event_processor import AbstractEventProcessor
+from tests.stubs import InMemoryBlobService
 
 
 log = get_logger(None, logging.DEBUG)
@@ -161,6 +163,24 @@ def eph():
     return host
 
 
+@pytest.fixture()
+def local_eph():
+    """
+    An EventProcessorHost backed by an in-memory blob store with 4 partitions,
+    for tests that do not require a live Event Hub or storage account.
+    """
+    loop = asyncio.new_event_loop()
+    storage_clm = AzureStorageCheckpointLeaseManager(
+        storage_account_name="local", storage_account_key="a2V5", lease_duration=30)
+    eh_config = EventHubConfig("local", "local", "policy", "key", consumer_group="$default")
+    host = EventProcessorHost(MockEventProcessor, eh_config, storage_clm, loop=loop)
+    storage_clm.storage_client = InMemoryBlobService()
+    host.partition_manager.partition_ids = ["0", "1", "2", "3"]
+    loop.run_until_complete(host.partition_manager.initialize_stores_async())
+    yield host
+    loop.close()
+
+
 @pytest.fixture()
 def eh_partition_pump(eph):
     lease = AzureBlobLease()
@@ -54,11 +54,18 @@ setup(
         'License :: OSI Approved :: MIT License',
     ],
     zip_safe=False,
-    packages=find_packages(exclude=["azure", "examples", "tests"]),
+    packages=find_packages(exclude=["azure", "examples", "tests", "benchmarks"]),
     install_requires=[
-        'uamqp>=1.0.0,<2.0.0',
+        'uamqp>=1.1.0,<2.0.0',
         'msrestazure~=0.4.11',
         'azure-common~=1.1',
         'azure-storage~=0.36.0'
-    ]
+    ],
+    extras_require={
+        'orjson': ['orjson'],
+        'msgpack': ['msgpack>=0.6.0'],
+        'avro': ['fastavro>=0.22.0'],
+        'lz4': ['lz4>=2.0.0'],
+        'zstd': ['zstandard>=0.10.0']
+    }
 )
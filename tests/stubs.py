@@ -0,0 +1,211 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""
+Local stand-ins for the network and storage layers, used by the unit tests and
+the benchmarks to exercise the client without a live Event Hub or storage account.
+"""
+
+import uuid
+import time
+
+from uamqp import Message, constants
+
+
+def received_message(sequence_number, body):
+    """
+    Build a uamqp Message that looks like one delivered by the service.
+
+    :param sequence_number: The sequence number to stamp on the message.
+    :type sequence_number: int
+    :param body: The message body.
+    :type body: bytes
+    :rtype: ~uamqp.message.Message
+    """
+    annotations = {
+        b"x-opt-sequence-number": sequence_number,
+        b"x-opt-offset": str(sequence_number * len(body)).encode('utf-8'),
+        b"x-opt-enqueued-time": int(time.time() * 1000)}
+    return Message(body, annotations=annotations)
+
+
+class StubSendClient(object):
+    """
+    Stands in for ~uamqp.SendClient. Every queued message is settled
+    successfully the next time the client is asked to wait.
+    """
+
+    def __init__(self):
+        self._pending = []
+
+    @property
+    def pending_messages(self):
+        return list(self._pending)
+
+    def queue_message(self, *messages):
+        for message in messages:
+            self._pending.extend(message.gather())
+
+    def wait(self):
+        pending, self._pending = self._pending, []
+        for message in pending:
+            if message.on_send_complete:
+                message.on_send_complete(constants.MessageSendResult.Ok, None)
+
+    def send_message(self, message):
+        self.queue_message(message)
+        self.wait()
+
+    async def wait_async(self):
+        self.wait()
+
+    async def send_message_async(self, message):
+        self.send_message(message)
+
+    def close(self):
+        self._pending = []
+
+    async def close_async(self):
+        self.close()
+
+
+class StubReceiveClient(object):
+    """
+    Stands in for ~uamqp.ReceiveClient. Each receive call returns the same
+    pre-built batch of messages so only the client side wrapping is measured.
+    """
+
+    def __init__(self, messages):
+        self._messages = messages
+        self._received_messages = None
+
+    def receive_message_batch(self, max_batch_size=None, timeout=0):  # pylint: disable=unused-argument
+        return self._messages[:max_batch_size] if max_batch_size else list(self._messages)
+
+    async def receive_message_batch_async(self, max_batch_size=None, timeout=0):
+        return self.receive_message_batch(max_batch_size=max_batch_size, timeout=timeout)
+
+    def do_work(self):
+        return True
+
+    def close(self):
+        pass
+
+    async def close_async(self):
+        pass
+
+
+class _Blob(object):
+
+    def __init__(self, content, name=None):
+        self.content = content
+        self.name = name
+
+
+class _LeaseProperties(object):
+
+    def __init__(self, state):
+        self.state = state
+
+
+class _BlobProperties(object):
+
+    def __init__(self, state):
+        self.lease = _LeaseProperties(state)
+
+
+class _BlobPropertiesResult(object):
+
+    def __init__(self, state):
+        self.properties = _BlobProperties(state)
+
+
+class InMemoryBlobService(object):
+    """
+    Stands in for ~azure.storage.blob.BlockBlobService, implementing only the
+    operations used by the AzureStorageCheckpointLeaseManager. Leases are
+    tracked in memory and expire after their requested duration.
+
+    :param latency: An optional delay in seconds added to every operation to
+     approximate the round trip to a storage account.
+    :type latency: float
+    """
+
+    def __init__(self, latency=0):
+        self.latency = latency
+        self.containers = {}
+        self.leases = {}
+        self.operations = 0
+
+    def _call(self):
+        self.operations += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _lease_state(self, container, name):
+        lease = self.leases.get((container, name))
+        if lease and lease[1] > time.time():
+            return "leased"
+        return "available"
+
+    def _check_lease(self, container, name, lease_id):
+        lease = self.leases.get((container, name))
+        if self._lease_state(container, name) == "leased" and lease[0] != lease_id:
+            raise Exception("LeaseIdMismatchWithLeaseOperation")
+
+    def create_container(self, container_name, **kwargs):  # pylint: disable=unused-argument
+        self._call()
+        self.containers.setdefault(container_name, {})
+        return True
+
+    def get_blob_to_text(self, container_name, blob_name, **kwargs):  # pylint: disable=unused-argument
+        self._call()
+        return _Blob(self.containers[container_name][blob_name])
+
+    def list_blobs(self, container_name, prefix=None, **kwargs):  # pylint: disable=unused-argument
+        self._call()
+        return [_Blob(content, name) for name, content in self.containers[container_name].items()
+                if not prefix or name.startswith(prefix)]
+
+    def get_blob_properties(self, container_name, blob_name, **kwargs):  # pylint: disable=unused-argument
+        self._call()
+        return _BlobPropertiesResult(self._lease_state(container_name, blob_name))
+
+    def create_blob_from_text(self, container_name, blob_name, text, lease_id=None, **kwargs):  # pylint: disable=unused-argument
+        self._call()
+        self._check_lease(container_name, blob_name, lease_id)
+        self.containers.setdefault(container_name, {})[blob_name] = text
+
+    def delete_blob(self, container_name, blob_name, lease_id=None, **kwargs):  # pylint: disable=unused-argument
+        self._call()
+        self._check_lease(container_name, blob_name, lease_id)
+        self.containers[container_name].pop(blob_name, None)
+
+    def acquire_blob_lease(self, container_name, blob_name, lease_duration=-1, proposed_lease_id=None, **kwargs):  # pylint: disable=unused-argument
+        self._call()
+        if self._lease_state(container_name, blob_name) == "leased":
+            raise Exception("LeaseAlreadyPresent")
+        lease_id = proposed_lease_id or str(uuid.uuid4())
+        self.leases[(container_name, blob_name)] = (lease_id, time.time() + lease_duration)
+        return lease_id
+
+    def change_blob_lease(self, container_name, blob_name, lease_id, proposed_lease_id, **kwargs):  # pylint: disable=unused-argument
+        self._call()
+        self._check_lease(container_name, blob_name, lease_id)
+        expiry = self.leases[(container_name, blob_name)][1]
+        self.leases[(container_name, blob_name)] = (proposed_lease_id, expiry)
+        return proposed_lease_id
+
+    def renew_blob_lease(self, container_name, blob_name, lease_id, timeout=None, **kwargs):  # pylint: disable=unused-argument
+        self._call()
+        self._check_lease(container_name, blob_name, lease_id)
+        self.leases[(container_name, blob_name)] = (lease_id, time.time() + (timeout or 30))
+        return lease_id
+
+    def release_blob_lease(self, container_name, blob_name, lease_id, **kwargs):  # pylint: disable=unused-argument
+        self._call()
+        self._check_lease(container_name, blob_name, lease_id)
+        self.leases.pop((container_name, blob_name), None)
+
@@ -0,0 +1,34 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# -----------------------------------------------------------------------------------
+
+import asyncio
+
+import pytest
+
+from benchmarks import run_benchmarks
+
+
+@pytest.mark.parametrize("name", sorted(run_benchmarks.BENCHMARKS))
+def test_benchmark_runs(name):
+    """
+    Test that each benchmark runs against the local stand-ins
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        result = run_benchmarks.run_benchmark(name, loop, repeat=1, min_time=0)
+    finally:
+        loop.close()
+    assert result["per_event_us"] > 0
+
+
+def test_compare_baseline():
+    """
+    Test that slowdowns beyond the tolerance are reported as regressions
+    """
+    baseline = {"benchmarks": {"fast": {"per_event_us": 10.0}, "slow": {"per_event_us": 10.0}}}
+    results = {"benchmarks": {"fast": {"per_event_us": 11.0}, "slow": {"per_event_us": 20.0}}}
+    regressions = run_benchmarks.compare(results, baseline, tolerance=0.25)
+    assert [r[0] for r in regressions] == ["slow"]
+    assert results["benchmarks"]["fast"]["ratio"] == 1.1
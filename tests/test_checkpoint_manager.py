@@ -6,7 +6,10 @@
 import pytest
 import asyncio
 import time
+import json
+import threading
 from azure.common import AzureException
+from azure.eventprocessorhost import Checkpoint
 
 
 def test_init(eph, storage_clm):
@@ -97,3 +100,123 @@ def test_checkpointing(eph, storage_clm):
     assert cloud_checkpoint.partition_id == "1"
     assert cloud_checkpoint.offset == "512"
     loop.run_until_complete(storage_clm.release_lease_async(lease))
+
+
+def test_bulk_checkpoints(local_eph):
+    storage = local_eph.storage_manager
+    storage.checkpoint_flush_interval = 0.05
+    client = storage.storage_client
+    loop = local_eph.loop
+    leases = [loop.run_until_complete(storage.get_lease_async(p)) for p in ["0", "1", "2", "3"]]
+    for lease in leases:
+        assert loop.run_until_complete(storage.acquire_lease_async(lease))
+
+    async def checkpoint_all(sequence_number):
+        return await asyncio.gather(*[
+            storage.update_checkpoint_async(l, Checkpoint(l.partition_id, str(sequence_number), sequence_number))
+            for l in leases])
+
+    operations = client.operations
+    assert all(loop.run_until_complete(checkpoint_all(10)))
+    assert client.operations == operations
+    loop.run_until_complete(asyncio.sleep(0.2))
+    # All four checkpoints are written in one operation.
+    assert client.operations == operations + 1
+    blob_name = "checkpoints-" + local_eph.host_name
+    stored = json.loads(client.containers["eph-leases"][blob_name])
+    assert stored["checkpoints"]["2"] == {"offset": "10", "sequence_number": 10}
+    assert loop.run_until_complete(storage.get_checkpoint_async("2")).sequence_number == 10
+
+    # A new host generation merges the checkpoint blobs read by the lease scan with the lease blobs.
+    storage._host_checkpoints = {}  # pylint: disable=protected-access
+    local_eph.host_name = "next-generation"
+    client.containers["eph-leases"]["checkpoints-old"] = json.dumps({
+        "owner": "old", "updated": 0, "checkpoints": {"2": {"offset": "5", "sequence_number": 5}}})
+
+    async def scan_leases():
+        return await asyncio.gather(*(await storage.get_all_leases()))
+
+    assert len(loop.run_until_complete(scan_leases())) == 4
+    # Blobs whose checkpoints have all been superseded are deleted by the scan.
+    assert "checkpoints-old" not in client.containers["eph-leases"]
+    assert blob_name in client.containers["eph-leases"]
+    operations = client.operations
+    checkpoint = loop.run_until_complete(storage.get_checkpoint_async("2"))
+    assert (checkpoint.offset, checkpoint.sequence_number) == ("10", 10)
+    # Only the lease blob is read, the checkpoint blobs are not read again.
+    assert client.operations == operations + 1
+
+
+def test_bulk_checkpoint_reacquired_lease(local_eph):
+    storage = local_eph.storage_manager
+    storage.checkpoint_flush_interval = 60
+    loop = local_eph.loop
+    lease = loop.run_until_complete(storage.get_lease_async("1"))
+    assert loop.run_until_complete(storage.acquire_lease_async(lease))
+    storage._pending_checkpoints["1"] = Checkpoint("1", "7", 7)  # pylint: disable=protected-access
+    storage._host_checkpoints["1"] = Checkpoint("1", "6", 6)  # pylint: disable=protected-access
+    assert loop.run_until_complete(storage.acquire_lease_async(lease))
+    # Checkpoints from a previous ownership of the partition are neither read nor flushed.
+    assert "1" not in storage._pending_checkpoints  # pylint: disable=protected-access
+    assert "1" not in storage._host_checkpoints  # pylint: disable=protected-access
+
+
+def test_bulk_checkpoint_flushed_on_host_loop(local_eph):
+    storage = local_eph.storage_manager
+    storage.checkpoint_flush_interval = 0.05
+    host_loop = local_eph.loop
+    leases = [host_loop.run_until_complete(storage.get_lease_async(p)) for p in ["2", "3"]]
+    for lease in leases:
+        assert host_loop.run_until_complete(storage.acquire_lease_async(lease))
+    host_thread = threading.Thread(target=host_loop.run_forever)
+    host_thread.start()
+    stopped_loop = asyncio.new_event_loop()
+    pump_loop = asyncio.new_event_loop()
+    try:
+        # The first checkpoint is requested from a pump loop that then stops running.
+        assert stopped_loop.run_until_complete(storage.update_checkpoint_async(leases[0], Checkpoint("2", "4", 4)))
+        assert pump_loop.run_until_complete(storage.update_checkpoint_async(leases[1], Checkpoint("3", "5", 5)))
+        # Neither pump loop is running when the flush is due.
+        deadline = time.time() + 5
+        while len(storage._host_checkpoints) < 2 and time.time() < deadline:  # pylint: disable=protected-access
+            time.sleep(0.01)
+    finally:
+        host_loop.call_soon_threadsafe(host_loop.stop)
+        host_thread.join()
+        stopped_loop.close()
+        pump_loop.close()
+    assert storage._host_checkpoints["2"].sequence_number == 4  # pylint: disable=protected-access
+    assert storage._host_checkpoints["3"].sequence_number == 5  # pylint: disable=protected-access
+
+
+def test_bulk_checkpoint_does_not_wait_for_flush(local_eph):
+    storage = local_eph.storage_manager
+    storage.checkpoint_flush_interval = 60
+    client = storage.storage_client
+    loop = local_eph.loop
+    leases = [loop.run_until_complete(storage.get_lease_async(p)) for p in ["0", "1"]]
+    for lease in leases:
+        assert loop.run_until_complete(storage.acquire_lease_async(lease))
+
+    started = time.time()
+    for lease in leases:
+        checkpoint = Checkpoint(lease.partition_id, "8", 8)
+        assert loop.run_until_complete(storage.update_checkpoint_async(lease, checkpoint))
+    assert time.time() - started < 1
+    blob_name = "checkpoints-" + local_eph.host_name
+    assert blob_name not in client.containers["eph-leases"]
+    assert loop.run_until_complete(storage.get_checkpoint_async("0")).sequence_number == 8
+
+    # Releasing a lease flushes the pending checkpoints and writes its own to the lease blob.
+    assert loop.run_until_complete(storage.release_lease_async(leases[0]))
+    stored = json.loads(client.containers["eph-leases"][blob_name])
+    assert set(stored["checkpoints"]) == {"0", "1"}
+    released = json.loads(client.containers["eph-leases"]["0"])
+    assert (released["offset"], released["sequence_number"]) == ("8", 8)
+
+    # Stopping the host flushes checkpoints updated since.
+    assert loop.run_until_complete(storage.update_checkpoint_async(leases[1], Checkpoint("1", "9", 9)))
+    loop.run_until_complete(local_eph.partition_manager.stop_async())
+    stored = json.loads(client.containers["eph-leases"][blob_name])
+    assert stored["checkpoints"]["1"] == {"offset": "9", "sequence_number": 9}
+    assert storage._flush_future is None  # pylint: disable=protected-access
@@ -5,9 +5,14 @@
 
 import unittest
 import asyncio
+import threading
 import logging
 import pytest
 
+from azure.eventhub import EventHubError, EventHubClientAsync
+from azure.eventprocessorhost.eh_partition_pump import EventHubPartitionPump, PartitionReceiver
+from azure.eventprocessorhost.partition_context import PartitionContext
+
 
 async def wait_and_close(host):
     """
@@ -27,3 +32,180 @@ def test_partition_pump_async(eh_partition_pump):
         eh_partition_pump.open_async(),
         wait_and_close(eh_partition_pump))
     loop.run_until_complete(tasks)
+
+
+class StolenReceiver(object):
+
+    queue_size = 0
+    runtime_info = None
+
+    async def receive(self, max_batch_size=None, timeout=None):
+        error = EventHubError("New receiver with higher epoch")
+        error.error = "link:stolen"
+        raise error
+
+
+def test_epoch_receiver_lease_lost(local_eph, monkeypatch):
+    """
+    Test that the pump opens an epoch receiver and closes as soon as it is disconnected
+    """
+    epochs = []
+
+    def add_async_epoch_receiver(self, consumer_group, partition, epoch, **kwargs):
+        epochs.append(epoch)
+        return StolenReceiver()
+
+    monkeypatch.setattr(EventHubClientAsync, "add_async_epoch_receiver", add_async_epoch_receiver)
+    loop = local_eph.loop
+    lease = loop.run_until_complete(local_eph.storage_manager.get_lease_async("2"))
+    assert loop.run_until_complete(local_eph.storage_manager.acquire_lease_async(lease))
+    partition_pump = EventHubPartitionPump(local_eph, lease)
+    partition_pump.partition_context = PartitionContext(
+        local_eph, "2", local_eph.eh_config.client_address, "$default", loop)
+    partition_pump.partition_context.lease = lease
+    partition_pump.processor = local_eph.event_processor(None)
+    loop.run_until_complete(partition_pump.open_clients_async())
+    assert epochs == [lease.epoch] == [1]
+
+    partition_pump.eh_client = None
+    local_eph.partition_manager.partition_pumps["2"] = partition_pump
+    partition_pump.set_pump_status("Running")
+
+    async def run():
+        partition_pump.running = asyncio.ensure_future(partition_pump.partition_receiver.run())
+        await partition_pump.running
+        await asyncio.gather(*[t for t in asyncio.all_tasks() if t is not asyncio.current_task()])
+
+    released = []
+
+    async def release_lease_async(lease):
+        released.append(lease)
+
+    monkeypatch.setattr(local_eph.storage_manager, "release_lease_async", release_lease_async)
+    loop.run_until_complete(run())
+    assert partition_pump.pump_status == "Closed"
+    assert "2" not in local_eph.partition_manager.partition_pumps
+    # The lease is owned by the host that evicted the pump, so it is not released.
+    assert partition_pump.evicted and not released
+
+
+def test_lease_lost_removes_pump_on_host_loop(local_eph, monkeypatch):
+    """
+    Test that a pump evicted on a worker loop is removed on the loop of the host
+    """
+    removed = []
+
+    async def remove_pump_async(partition_id, reason):
+        removed.append((partition_id, reason, asyncio.get_event_loop()))
+
+    monkeypatch.setattr(local_eph.partition_manager, "remove_pump_async", remove_pump_async)
+    lease = local_eph.loop.run_until_complete(local_eph.storage_manager.get_lease_async("3"))
+    partition_pump = EventHubPartitionPump(local_eph, lease)
+    partition_pump.partition_context = PartitionContext(
+        local_eph, "3", local_eph.eh_config.client_address, "$default", local_eph.loop)
+    worker_loop = asyncio.new_event_loop()
+    worker = threading.Thread(target=worker_loop.run_forever)
+    worker.start()
+    try:
+        worker_loop.call_soon_threadsafe(partition_pump.on_lease_lost)
+        for _ in range(500):
+            local_eph.loop.run_until_complete(asyncio.sleep(0.01))
+            if removed:
+                break
+    finally:
+        worker_loop.call_soon_threadsafe(worker_loop.stop)
+        worker.join()
+        worker_loop.close()
+    assert removed == [("3", "LeaseLost", local_eph.loop)]
+
+
+class SharedReceiver(object):
+
+    def __init__(self, client):
+        self.client = client
+        self.opened = False
+        self.closed = False
+
+    async def open_async(self):
+        self.opened = True
+
+    async def close_async(self):
+        self.closed = True
+
+
+def test_shared_connection(local_eph, monkeypatch):
+    """
+    Test that pumps add and remove their receivers on the host's shared client
+    """
+    def add_async_epoch_receiver(self, consumer_group, partition, epoch, **kwargs):
+        receiver = SharedReceiver(self)
+        self.clients.append(receiver)
+        return receiver
+
+    monkeypatch.setattr(EventHubClientAsync, "add_async_epoch_receiver", add_async_epoch_receiver)
+    local_eph.eph_options.shared_connection = True
+    loop = local_eph.loop
+    pumps = []
+    for partition_id in ["0", "1"]:
+        lease = loop.run_until_complete(local_eph.storage_manager.get_lease_async(partition_id))
+        partition_pump = EventHubPartitionPump(local_eph, lease)
+        partition_pump.partition_context = PartitionContext(
+            local_eph, partition_id, local_eph.eh_config.client_address, "$default", loop)
+        partition_pump.partition_context.lease = lease
+        loop.run_until_complete(partition_pump.open_clients_async())
+        pumps.append(partition_pump)
+
+    client = local_eph.partition_manager.receive_client
+    assert client.shared_connection
+    assert pumps[0].eh_client is pumps[1].eh_client is client
+    assert len(client.clients) == 2
+
+    removed = pumps[0].partition_receive_handler
+    loop.run_until_complete(pumps[0].clean_up_clients_async())
+    assert removed.closed
+    assert client.clients == [pumps[1].partition_receive_handler]
+    assert not client.stopped
+
+    async def connection():
+        return await client.get_connection_async()
+
+    shared = loop.run_until_complete(connection())
+    assert shared is loop.run_until_complete(connection())
+    loop.run_until_complete(client.stop_async())
+    assert client.connection is None
+
+
+def _partition_receiver(host):
+    lease = host.loop.run_until_complete(host.storage_manager.get_lease_async("0"))
+    pump = EventHubPartitionPump(host, lease)
+    pump.partition_context = PartitionContext(host, "0", "local", "$default", pump_loop=host.loop)
+    return PartitionReceiver(pump)
+
+
+def test_adaptive_batch_size(local_eph):
+    """
+    Test that the batch size converges on the target latency within its bounds
+    """
+    local_eph.eph_options.target_batch_latency = 0.1
+    local_eph.eph_options.prefetch_count = 300
+    receiver = _partition_receiver(local_eph)
+    sizes = []
+    for _ in range(5):
+        receiver.update_batch_size(receiver.max_batch_size, receiver.max_batch_size * 0.001)
+        sizes.append(receiver.max_batch_size)
+    assert sizes == [20, 40, 80, 100, 100]
+
+    # Batches that are not full do not grow the batch size.
+    receiver.update_batch_size(10, 0.001)
+    assert receiver.max_batch_size == 100
+
+    # Slow processing shrinks it, by at most half at a time.
+    for _ in range(10):
+        receiver.update_batch_size(receiver.max_batch_size, receiver.max_batch_size * 0.05)
+    assert receiver.max_batch_size == 2
+
+    local_eph.eph_options.prefetch_count = 30
+    receiver = _partition_receiver(local_eph)
+    for _ in range(5):
+        receiver.update_batch_size(receiver.max_batch_size, 0)
+    assert receiver.max_batch_size == 30
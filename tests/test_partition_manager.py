@@ -3,7 +3,16 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # -----------------------------------------------------------------------------------
 
+import time
 import asyncio
+import threading
+from queue import Queue
+
+from azure.eventprocessorhost.azure_blob_lease import AzureBlobLease
+from azure.eventprocessorhost.assignment_strategy import (
+    StickyAssignment,
+    RendezvousAssignment,
+    WeightedAssignment)
 
 
 def test_get_partition_ids(partition_manager):
@@ -13,3 +22,209 @@ def test_get_partition_ids(partition_manager):
     loop = asyncio.get_event_loop()
     pids = loop.run_until_complete(partition_manager.get_partition_ids_async())
     assert pids == ["0", "1"]
+
+
+class StubManagementClient(object):
+
+    def __init__(self, partition_ids):
+        self.partition_ids = partition_ids
+        self.requests = 0
+        self.stopped = False
+
+    async def get_eventhub_info_async(self):
+        self.requests += 1
+        return {'partition_ids': list(self.partition_ids)}
+
+    async def stop_async(self):
+        self.stopped = True
+
+
+def test_partition_ids_refreshed(local_eph):
+    manager = local_eph.partition_manager
+    local_eph.eph_options.partition_refresh_interval = 60
+    manager.eh_client = StubManagementClient(["0", "1", "2", "3", "4", "5"])
+    manager.partition_ids_updated = time.time()
+    loop = local_eph.loop
+    assert loop.run_until_complete(manager.get_partition_ids_async()) == ["0", "1", "2", "3"]
+    assert manager.eh_client.requests == 0
+
+    manager.partition_ids_updated = 0
+    loop.run_until_complete(manager.refresh_partition_ids_async())
+    assert manager.partition_ids == ["0", "1", "2", "3", "4", "5"]
+    lease = loop.run_until_complete(local_eph.storage_manager.get_lease_async("5"))
+    assert lease.partition_id == "5"
+
+    loop.run_until_complete(manager.get_partition_ids_async())
+    assert manager.eh_client.requests == 1
+
+
+def test_partition_ids_persisted(local_eph):
+    manager = local_eph.partition_manager
+    local_eph.eph_options.persist_partition_ids = True
+    client = StubManagementClient(["0", "1"])
+    manager.eh_client = client
+    manager.partition_ids = None
+    loop = local_eph.loop
+    assert loop.run_until_complete(manager.get_partition_ids_async()) == ["0", "1"]
+    assert client.stopped
+
+    # Another host reads the stored copy instead of querying the Event Hub.
+    manager.partition_ids = None
+    manager.eh_client = StubManagementClient(["0", "1", "2"])
+    assert loop.run_until_complete(manager.get_partition_ids_async()) == ["0", "1"]
+    assert manager.eh_client.requests == 0
+
+
+def _owned_leases(counts):
+    leases = []
+    for owner, count in counts.items():
+        for _ in range(count):
+            lease = AzureBlobLease()
+            lease.with_partition_id(str(len(leases)))
+            lease.owner = owner
+            leases.append(lease)
+    return leases
+
+
+def test_which_leases_to_steal(local_eph):
+    manager = local_eph.partition_manager
+    to_steal = manager.which_leases_to_steal(_owned_leases({"a": 32}), 0)
+    assert len(to_steal) == 16
+
+    to_steal = manager.which_leases_to_steal(_owned_leases({"a": 10, "b": 10}), 0)
+    owners = [l.owner for l in to_steal]
+    assert len(owners) == 6
+    assert abs(owners.count("a") - owners.count("b")) <= 1
+
+    # Already balanced - stealing would only cause flapping.
+    assert manager.which_leases_to_steal(_owned_leases({"a": 4, "b": 3}), 3) == []
+    assert manager.which_lease_to_steal(_owned_leases({"a": 4}), 3) is None
+    assert manager.which_lease_to_steal(_owned_leases({"a": 5}), 3).owner == "a"
+
+
+def test_sticky_assignment(local_eph):
+    manager = local_eph.partition_manager
+    assert isinstance(local_eph.eph_options.assignment_strategy, StickyAssignment)
+    leases = _owned_leases({"a": 8})
+    # This host owned partitions 5 and 6 before they were taken by "a".
+    for partition_id in ["6", "5"]:
+        leases[int(partition_id)].owner = local_eph.host_name
+        local_eph.eph_options.assignment_strategy.update(local_eph.host_name, leases)
+        leases[int(partition_id)].owner = "a"
+    to_steal = manager.which_leases_to_steal(leases, 0)
+    assert [l.partition_id for l in to_steal] == ["5", "6", "0", "1"]
+
+    local_eph.eph_options.assignment_strategy.history_duration = 0
+    to_steal = manager.which_leases_to_steal(leases, 0)
+    assert [l.partition_id for l in to_steal] == ["0", "1", "2", "3"]
+
+
+def test_rendezvous_assignment(local_eph):
+    manager = local_eph.partition_manager
+    local_eph.eph_options.assignment_strategy = RendezvousAssignment()
+    leases = _owned_leases({"a": 8})
+    first = [l.partition_id for l in manager.which_leases_to_steal(leases, 0)]
+    # The choice depends on the host and partitions, not on the order of the leases.
+    second = [l.partition_id for l in manager.which_leases_to_steal(list(reversed(leases)), 0)]
+    assert len(first) == 4 and sorted(first) == sorted(second)
+
+
+def test_weighted_assignment(local_eph):
+    manager = local_eph.partition_manager
+    weights = {"0": 6, "1": 1, "2": 1, "3": 1, "4": 1}
+    local_eph.eph_options.assignment_strategy = WeightedAssignment(weights.get)
+    leases = _owned_leases({"a": 5})
+    # Taking the heaviest partition would leave "a" with less than this host.
+    to_steal = manager.which_leases_to_steal(leases, 0, owned_leases=[])
+    assert [l.partition_id for l in to_steal] == ["1", "2", "3", "4"]
+
+    owned = _owned_leases({local_eph.host_name: 1})
+    owned[0].partition_id = "9"
+    # Unknown partitions weigh 1.
+    assert len(manager.which_leases_to_steal(leases, 1, owned_leases=owned)) == 4
+    weights["9"] = 6
+    assert manager.which_leases_to_steal(leases, 1, owned_leases=owned) == leases[1:3]
+
+
+def test_pump_started_when_lease_acquired(local_eph):
+    manager = local_eph.partition_manager
+    storage = local_eph.storage_manager
+    local_eph.eph_options.max_concurrent_lease_operations = 2
+    started = []
+    state = {"active": 0, "max_active": 0}
+
+    async def create_new_pump_async(partition_id, lease):
+        started.append(partition_id)
+
+    async def get_lease(partition_id):
+        state["active"] += 1
+        state["max_active"] = max(state["max_active"], state["active"])
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        return await storage.get_lease_async(partition_id)
+
+    async def scan():
+        owned_by_others_q = Queue()
+        await asyncio.gather(*[
+            manager.attempt_renew_lease_async(get_lease(p), owned_by_others_q, storage, start_pump=True)
+            for p in manager.partition_ids])
+
+    manager.create_new_pump_async = create_new_pump_async
+    local_eph.loop.run_until_complete(scan())
+    assert sorted(started) == ["0", "1", "2", "3"]
+    assert state["max_active"] == 2
+
+
+class _FakePump(object):
+
+    def __init__(self, lease):
+        self.lease = lease
+        self.pump_status = "Running"
+        self.thread = threading.current_thread()
+        self.loop = None
+
+    def is_closing(self):
+        return self.pump_status != "Running"
+
+    def set_lease(self, lease):
+        self.lease = lease
+
+    async def close_async(self, reason):
+        self.pump_status = reason
+
+
+def test_dedicated_lease_loop(local_eph):
+    manager = local_eph.partition_manager
+    storage = local_eph.storage_manager
+    storage.lease_renew_interval = 0.05
+    local_eph.eph_options.dedicated_lease_loop = True
+    renewals = []
+    renew_lease_async = storage.renew_lease_async
+
+    async def record_renewal(lease):
+        renewals.append((time.time(), threading.current_thread()))
+        return await renew_lease_async(lease)
+
+    async def create_new_pump_async(partition_id, lease):
+        manager.partition_pumps[partition_id] = _FakePump(lease)
+
+    async def busy_processor():
+        await asyncio.sleep(0.2)
+        started = time.time()
+        time.sleep(0.5)  # Blocks the pump loop.
+        return started
+
+    storage.renew_lease_async = record_renewal
+    manager.create_new_pump_async = create_new_pump_async
+    loop = local_eph.loop
+    loop.run_until_complete(manager.start_async())
+    blocked = loop.run_until_complete(busy_processor())
+    pumps = dict(manager.partition_pumps)
+    loop.run_until_complete(manager.stop_async())
+
+    assert sorted(pumps) == ["0", "1", "2", "3"]
+    assert all(p.thread is threading.current_thread() for p in pumps.values())
+    assert all(p.pump_status == "Shutdown" for p in pumps.values())
+    assert all(t is not threading.current_thread() for _, t in renewals)
+    assert len([r for r, _ in renewals if blocked <= r <= blocked + 0.5]) >= 4
+    assert manager.lease_thread is None
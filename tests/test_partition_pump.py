@@ -3,7 +3,14 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # -----------------------------------------------------------------------------------
 
+import pickle
 import asyncio
+import threading
+
+from azure.eventhub import EventData
+from azure.eventhub.codecs import JsonCodec
+from azure.eventprocessorhost.partition_pump import PartitionPump
+from tests.stubs import received_message
 
 
 def test_open_async(partition_pump):
@@ -32,3 +39,122 @@ def test_close_async(partition_pump):
     _mock_events = ["event1", "event2"]  # Mock Events
     loop.run_until_complete(partition_pump.process_events_async(_mock_events))  # Simulate Process
     loop.run_until_complete(partition_pump.close_async("Finished"))  # Simulate Close
+
+
+class CheckpointingProcessor(object):
+
+    def __init__(self):
+        self.fail = False
+        self.errors = []
+
+    async def process_events_async(self, context, messages):
+        if self.fail:
+            raise ValueError("Processing failed")
+        await context.checkpoint_async()
+
+    async def process_error_async(self, context, error):
+        self.errors.append(error)
+
+    async def close_async(self, context, reason):
+        pass
+
+
+def test_graceful_shutdown(local_eph):
+    """
+    Test that on a graceful shutdown the pump releases its lease with the last checkpoint
+    of the processor, and does not checkpoint a batch that failed to process
+    """
+    loop = local_eph.loop
+    storage = local_eph.storage_manager
+    local_eph.eph_options.graceful_shutdown = True
+    lease = loop.run_until_complete(storage.get_lease_async("1"))
+    assert loop.run_until_complete(storage.acquire_lease_async(lease))
+    partition_pump = PartitionPump(local_eph, lease)
+    partition_pump.loop = loop
+    loop.run_until_complete(partition_pump.open_async())
+    partition_pump.processor = CheckpointingProcessor()
+    events = [EventData(message=received_message(i, b"event")) for i in range(1, 7)]
+    loop.run_until_complete(partition_pump.process_events_async(events[:3]))
+    partition_pump.processor.fail = True
+    loop.run_until_complete(partition_pump.process_events_async(events[3:]))
+    assert isinstance(partition_pump.processor.errors[0], ValueError)
+    local_eph.partition_manager.cancellation_token.cancel()
+    loop.run_until_complete(partition_pump.close_async("Shutdown"))
+
+    released = loop.run_until_complete(storage.get_lease_async("1"))
+    assert released.owner is None
+    assert released.sequence_number == 3
+    assert released.offset == events[2].offset.value
+    assert loop.run_until_complete(released.is_expired())
+
+
+class RecordingProcessor(object):
+
+    def __init__(self):
+        self.batches = []
+        self.errors = []
+
+    async def process_events_async(self, context, messages):
+        self.batches.append(messages)
+
+    async def process_error_async(self, context, error):
+        self.errors.append(error)
+
+
+def _open_pump(host):
+    lease = host.loop.run_until_complete(host.storage_manager.get_lease_async("0"))
+    partition_pump = PartitionPump(host, lease)
+    host.loop.run_until_complete(partition_pump.open_async())
+    partition_pump.processor = RecordingProcessor()
+    return partition_pump
+
+
+def test_batch_decoder_runs_in_executor(local_eph):
+    """
+    Test that the batch decoder runs off the event loop and sets the decoded bodies
+    """
+    threads = []
+    codec = JsonCodec()
+
+    def decode(bodies):
+        threads.append(threading.current_thread())
+        return codec.decode_batch(bodies)
+
+    local_eph.eph_options.batch_decoder = decode
+    partition_pump = _open_pump(local_eph)
+    events = [EventData(message=received_message(i, b'{"reading": %d}' % i)) for i in range(3)]
+    local_eph.loop.run_until_complete(partition_pump.process_events_async(events))
+
+    assert threads and threads[0] is not threading.current_thread()
+    assert partition_pump.processor.batches == [events]
+    assert [e.decoded for e in events] == [{"reading": i} for i in range(3)]
+    assert partition_pump.partition_context.sequence_number == 2
+
+
+def test_batch_decoder_errors(local_eph):
+    """
+    Test that a batch that fails to decode is still passed to the processor with the error
+    """
+    partition_pump = _open_pump(local_eph)
+    local_eph.eph_options.batch_decoder = lambda bodies: bodies[1:]
+    events = [EventData(message=received_message(i, b"1")) for i in range(3)]
+    local_eph.loop.run_until_complete(partition_pump.process_events_async(events))
+    assert partition_pump.processor.batches == [events]
+    assert all(isinstance(e.decoded, ValueError) for e in events)
+
+    local_eph.eph_options.batch_decoder = JsonCodec().decode_batch
+    events = [EventData(message=received_message(i, b"{")) for i in range(3, 5)]
+    local_eph.loop.run_until_complete(partition_pump.process_events_async(events))
+    assert partition_pump.processor.batches[1] == events
+    assert all(isinstance(e.decoded, ValueError) and e.decoded is events[0].decoded for e in events)
+    assert partition_pump.processor.errors == []
+    # The processor can checkpoint the batch as it has seen it.
+    assert partition_pump.partition_context.sequence_number == 4
+
+
+def test_codec_decoder_is_picklable():
+    """
+    Test that codec decoders can be run in a process pool
+    """
+    decode = pickle.loads(pickle.dumps(JsonCodec().decode_batch))
+    assert decode([b"[1]", b"2"]) == [[1], 2]
@@ -10,6 +10,7 @@ import time
 
 from azure import eventhub
 from azure.eventhub import EventData, EventHubClient
+from tests.stubs import received_message
 
 
 def test_send_with_partition_key(connection_str, receivers):
@@ -199,4 +200,30 @@ def test_send_multiple_clients(connection_str, receivers):
     partition_0 = receivers[0].receive(timeout=2)
     assert len(partition_0) == 1
     partition_1 = receivers[1].receive(timeout=2)
-    assert len(partition_1) == 1
\ No newline at end of file
+    assert len(partition_1) == 1
+
+def test_send_buffer_bodies():
+    payload = bytearray(b"D" * 1024)
+    assert list(EventData(payload).body) == [bytes(payload)]
+    assert list(EventData(memoryview(payload)[:10]).body) == [b"D" * 10]
+    assert list(EventData([b"A", bytearray(b"B"), memoryview(b"C")]).body) == [b"A", b"B", b"C"]
+
+    batch = EventData(batch=(bytearray(b"Data") for _ in range(3)))
+    for message in batch.message.gather():
+        sections = list(message.get_data())
+        assert len(sections) == 3
+        assert all(s.endswith(b"Data") for s in sections)
+
+
+def test_receive_body_memoryview():
+    message = received_message(1, b"\x00\x01" * 100)
+    event = EventData(message=message)
+    view = event.body_memoryview
+    assert isinstance(view, memoryview)
+    assert view.readonly
+    assert view[:4].tobytes() == b"\x00\x01\x00\x01"
+    assert len(view) == 200
+
+    event = EventData([b"multi ", b"section"])
+    assert event.body_memoryview.tobytes() == b"multi section"
+    assert event.body_as_str() == "multi section"
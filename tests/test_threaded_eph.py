@@ -0,0 +1,94 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# -----------------------------------------------------------------------------------
+
+import time
+import asyncio
+import threading
+
+import pytest
+
+from azure.eventhub import EventData, EventHubClientAsync
+from azure.eventprocessorhost import (
+    AbstractSyncEventProcessor,
+    AzureStorageCheckpointLeaseManager,
+    EventHubConfig,
+    EPHOptions,
+    ThreadedEventProcessorHost)
+from tests.stubs import InMemoryBlobService, received_message
+
+
+class OneBatchReceiver(object):
+
+    queue_size = 0
+    runtime_info = None
+
+    def __init__(self):
+        self.batches = [[EventData(message=received_message(i, b"event")) for i in range(1, 4)]]
+
+    async def receive(self, max_batch_size=None, timeout=None):
+        if self.batches:
+            return self.batches.pop()
+        await asyncio.sleep(0.01)
+        return []
+
+
+class RecordingSyncProcessor(AbstractSyncEventProcessor):
+
+    batches = []
+    closed = []
+
+    def open(self, context):
+        pass
+
+    def close(self, context, reason):
+        self.closed.append((context.partition_id, reason))
+
+    def process_events(self, context, messages):
+        self.batches.append((context.partition_id, threading.current_thread().name, len(messages)))
+        context.checkpoint(messages[1])
+
+    def process_error(self, context, error):
+        pass
+
+
+def test_threaded_host(monkeypatch):
+    monkeypatch.setattr(EventHubClientAsync, "add_async_epoch_receiver", lambda *args, **kwargs: OneBatchReceiver())
+    storage = AzureStorageCheckpointLeaseManager(
+        storage_account_name="local", storage_account_key="a2V5", lease_renew_interval=0.05)
+    eh_config = EventHubConfig("local", "local", "policy", "key", consumer_group="$default")
+    options = EPHOptions()
+    options.receive_timeout = 0.01
+    host = ThreadedEventProcessorHost(RecordingSyncProcessor, eh_config, storage, eph_options=options, worker_threads=2)
+    storage.storage_client = InMemoryBlobService()
+    host.host.partition_manager.partition_ids = ["0", "1", "2", "3"]
+
+    host.start()
+    deadline = time.time() + 5
+    while len(RecordingSyncProcessor.batches) < 4 and time.time() < deadline:
+        time.sleep(0.01)
+    host.stop()
+
+    assert sorted(b[0] for b in RecordingSyncProcessor.batches) == ["0", "1", "2", "3"]
+    # The partitions are shared by the two worker threads.
+    threads = [b[1] for b in RecordingSyncProcessor.batches]
+    assert len(set(threads)) == 2 and all(t.startswith("eph-worker-") for t in threads)
+    assert sorted(RecordingSyncProcessor.closed) == [(p, "Shutdown") for p in ["0", "1", "2", "3"]]
+    # The checkpoints requested by the processor were persisted.
+    loop = asyncio.new_event_loop()
+    try:
+        checkpoint = loop.run_until_complete(storage.get_checkpoint_async("2"))
+    finally:
+        loop.close()
+    assert checkpoint.sequence_number == 2
+    assert all(not t.is_alive() for t in host.threads)
+
+
+def test_threaded_host_rejects_shared_connection():
+    storage = AzureStorageCheckpointLeaseManager(storage_account_name="local", storage_account_key="a2V5")
+    eh_config = EventHubConfig("local", "local", "policy", "key")
+    options = EPHOptions()
+    options.shared_connection = True
+    with pytest.raises(ValueError):
+        ThreadedEventProcessorHost(RecordingSyncProcessor, eh_config, storage, eph_options=options)